@@ -1,11 +1,10 @@
 # backend/auth.py
 from fastapi import APIRouter, Form, Request, Depends
 from fastapi.responses import RedirectResponse, HTMLResponse
-from passlib.hash import bcrypt
 from datetime import date
-from sqlalchemy.orm import Session
-from .database import get_db
-from . import models, deps
+from sqlalchemy import select
+from .database import get_async_db
+from . import models, deps, passwords
 from fastapi.templating import Jinja2Templates
 
 router = APIRouter()
@@ -22,9 +21,9 @@ async def register_user(
     email: str = Form(...),
     password: str = Form(...),
     plan: str = Form("Basic"),
-    db: Session = Depends(get_db),
+    db=Depends(get_async_db),
 ):
-    existing = db.query(models.User).filter(models.User.email == email).first()
+    existing = await db.scalar(select(models.User).where(models.User.email == email))
     if existing:
         return templates.TemplateResponse(
             "register.html",
@@ -32,7 +31,7 @@ async def register_user(
             status_code=400,
         )
 
-    hashed = bcrypt.hash(password[:72])
+    hashed = await passwords.hash_password(password)
 
     from dateutil.relativedelta import relativedelta
 
@@ -51,7 +50,7 @@ async def register_user(
     )
 
     db.add(new_user)
-    db.commit()
+    await db.commit()
     return RedirectResponse("/login?success=1", status_code=303)
 
 
@@ -63,9 +62,9 @@ async def login_user(
     request: Request,
     email: str = Form(...),
     password: str = Form(...),
-    db: Session = Depends(get_db),
+    db=Depends(get_async_db),
 ):
-    user = db.query(models.User).filter(models.User.email == email).first()
+    user = await db.scalar(select(models.User).where(models.User.email == email))
 
     if not user:
         return templates.TemplateResponse(
@@ -74,12 +73,17 @@ async def login_user(
             status_code=400,
         )
 
-    if not bcrypt.verify(password, user.senha):
+    valid, new_hash = await passwords.verify_password(password, user.senha)
+    if not valid:
         return templates.TemplateResponse(
             "login.html",
             {"request": request, "error": "Senha incorreta. Tente novamente."},
             status_code=400,
         )
+    if new_hash:
+        # hash feito com outro custo (LABEL_BCRYPT_ROUNDS): regrava com o atual
+        user.senha = new_hash
+        await db.commit()
 
     token = deps.create_access_token(user.email)
     response = RedirectResponse("/dashboard", status_code=303)
@@ -91,7 +95,10 @@ async def login_user(
 # LOGOUT
 # ------------------------------
 @router.post("/logout")
-async def logout_user():
+async def logout_user(request: Request):
+    token = request.cookies.get("auth_token")
+    if token:
+        deps.user_cache.forget_token(token)
     response = RedirectResponse("/", status_code=303)
     response.delete_cookie("auth_token")
     return response
@@ -110,9 +117,9 @@ async def forgot_password(
     request: Request,
     email: str = Form(...),
     new_password: str = Form(...),
-    db: Session = Depends(get_db),
+    db=Depends(get_async_db),
 ):
-    user = db.query(models.User).filter(models.User.email == email).first()
+    user = await db.scalar(select(models.User).where(models.User.email == email))
     if not user:
         return templates.TemplateResponse(
             "forgot_password.html",
@@ -120,9 +127,10 @@ async def forgot_password(
             status_code=400,
         )
 
-    hashed = bcrypt.hash(new_password[:72])
+    hashed = await passwords.hash_password(new_password)
     user.senha = hashed
-    db.commit()
+    await db.commit()
+    deps.invalidate_user(user.email)
 
     return templates.TemplateResponse(
         "login.html",
@@ -0,0 +1,83 @@
+# backend/benchmarks/bench_batch.py
+"""
+Benchmark do modo lote: várias lojas pequenas numa chamada só.
+
+Gera --shops pares PDF/XLSX sintéticos de --labels etiquetas cada e compara,
+via TestClient (pool de workers de verdade, cache desligado):
+- uma chamada POST /upload por loja (fluxo atual: uma saída por loja)
+- uma única chamada POST /upload/batch com todos os arquivos
+
+Uso:
+    python -m backend.benchmarks.bench_batch
+    python -m backend.benchmarks.bench_batch --shops 10 --labels 8 20 --sort-by sku
+"""
+import argparse
+import os
+import tempfile
+import time
+import warnings
+from pathlib import Path
+
+from .fixtures import make_batch
+
+
+def post_files(client, route: str, files, data=None):
+    response = client.post(route, files=files, data=data or {})
+    if response.status_code != 200:
+        raise RuntimeError(f"{route} respondeu {response.status_code}: {response.text[:200]}")
+    return response
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--shops", type=int, default=10, help="lojas (pares PDF/XLSX) por lote")
+    parser.add_argument("--labels", type=int, nargs="+", default=[8, 40], help="etiquetas por loja")
+    parser.add_argument("--sort-by", default="none", choices=("none", "sku"))
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["LABEL_CACHE"] = "0"
+        os.environ["LABEL_LOG_LEVEL"] = "WARNING"
+        os.chdir(tmp)  # o app cria o labelconvert.db no diretório atual
+        warnings.simplefilter("ignore")
+        from fastapi.testclient import TestClient
+        from ..main import app
+
+        with TestClient(app) as client:
+            print(f"lojas={args.shops}  ordem={args.sort_by}  (melhor de {args.repeat})")
+            print(f"{'etiq./loja':>10} | {'N x /upload':>12} | {'/upload/batch':>13} | {'ganho':>6} | etiquetas")
+            for labels in args.labels:
+                shops = []
+                for shop in range(args.shops):
+                    directory = Path(tmp) / f"loja_{labels}_{shop}"
+                    directory.mkdir()
+                    pdf_path, xlsx_path, _ = make_batch(directory, labels, seed=shop + 1)
+                    shops.append((pdf_path.read_bytes(), xlsx_path.read_bytes()))
+
+                def per_shop():
+                    for pdf, xlsx in shops:
+                        post_files(client, "/upload", {"pdf": ("e.pdf", pdf), "xlsx": ("p.xlsx", xlsx)})
+
+                def batch():
+                    files = [("pdfs", (f"e{i}.pdf", pdf)) for i, (pdf, _) in enumerate(shops)]
+                    files += [("xlsxs", (f"p{i}.xlsx", xlsx)) for i, (_, xlsx) in enumerate(shops)]
+                    return post_files(client, "/upload/batch", files, {"sort_by": args.sort_by})
+
+                timings = {}
+                for name, fn in (("per_shop", per_shop), ("batch", batch)):
+                    fn()  # aquecimento: processos do pool e imports
+                    best = None
+                    for _ in range(args.repeat):
+                        t0 = time.perf_counter()
+                        fn()
+                        elapsed = time.perf_counter() - t0
+                        best = elapsed if best is None else min(best, elapsed)
+                    timings[name] = best
+                matched = batch().headers["X-Labels-Matched"]
+                print(f"{labels:>10} | {timings['per_shop']:11.3f}s | {timings['batch']:12.3f}s | "
+                      f"{timings['per_shop'] / timings['batch']:5.1f}x | {matched}/{labels * args.shops}")
+
+
+if __name__ == "__main__":
+    main()
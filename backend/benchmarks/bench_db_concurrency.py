@@ -0,0 +1,118 @@
+# backend/benchmarks/bench_db_concurrency.py
+"""
+Benchmark de concorrência do banco: leitores e escritores simultâneos no SQLite.
+
+Escritores fazem o que /register faz (INSERT em users + commit), leitores o que
+get_current_user faz (SELECT por e-mail). Cada modo roda num processo novo com
+um arquivo de banco novo, montado pelo database.make_engine:
+- journal: modo antigo (rollback journal, synchronous=FULL) — LABEL_SQLITE_WAL=0
+- wal: WAL + synchronous=NORMAL + mmap (padrão novo)
+
+Uso:
+    python -m backend.benchmarks.bench_db_concurrency
+    python -m backend.benchmarks.bench_db_concurrency --writers 4 --readers 16 --duration 5
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import statistics
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from .harness import percentile
+
+MODES = {"journal": "0", "wal": "1"}
+
+
+def run_mode(mode: str, db_path: str, writers: int, readers: int, duration: float, queue):
+    """Processo filho: configura o banco pelo ambiente e mede leituras/escritas concorrentes."""
+    os.environ["LABEL_SQLITE_WAL"] = MODES[mode]
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+    from sqlalchemy.exc import OperationalError
+    from sqlalchemy.orm import sessionmaker
+    from ..database import Base, make_engine
+    from .. import models
+
+    engine = make_engine(os.environ["DATABASE_URL"])
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine, autoflush=False)
+    with Session() as db:
+        db.add_all(models.User(nome="Seed", email=f"seed{i}@example.com", senha="x") for i in range(1000))
+        db.commit()
+
+    stop = threading.Event()
+    lock = threading.Lock()
+    stats = {"reads": [], "writes": [], "errors": 0}
+
+    def writer(n: int):
+        i = 0
+        while not stop.is_set():
+            t0 = time.perf_counter()
+            try:
+                with Session() as db:
+                    db.add(models.User(nome="Bench", email=f"w{n}-{i}@example.com", senha="x"))
+                    db.commit()
+                with lock:
+                    stats["writes"].append((time.perf_counter() - t0) * 1000)
+            except OperationalError:
+                with lock:
+                    stats["errors"] += 1
+            i += 1
+
+    def reader():
+        rnd = random.Random()
+        while not stop.is_set():
+            t0 = time.perf_counter()
+            try:
+                with Session() as db:
+                    email = f"seed{rnd.randrange(1000)}@example.com"
+                    db.query(models.User).filter(models.User.email == email).first()
+                with lock:
+                    stats["reads"].append((time.perf_counter() - t0) * 1000)
+            except OperationalError:
+                with lock:
+                    stats["errors"] += 1
+
+    threads = [threading.Thread(target=writer, args=(n,)) for n in range(writers)]
+    threads += [threading.Thread(target=reader) for _ in range(readers)]
+    for t in threads:
+        t.start()
+    time.sleep(duration)
+    stop.set()
+    for t in threads:
+        t.join()
+    engine.dispose()
+    queue.put(stats)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--modes", nargs="+", choices=list(MODES), default=list(MODES))
+    args = parser.parse_args()
+
+    ctx = multiprocessing.get_context("spawn")
+    print(f"escritores={args.writers}  leitores={args.readers}  duração={args.duration}s")
+    print(f"{'modo':<8} | {'leituras/s':>10} | {'leit. p50':>9} | {'leit. p95':>9} | {'escritas/s':>10} | "
+          f"{'escr. p95':>9} | erros")
+    with tempfile.TemporaryDirectory() as tmp:
+        for mode in args.modes:
+            queue = ctx.Queue()
+            proc = ctx.Process(target=run_mode, args=(mode, str(Path(tmp) / f"{mode}.db"), args.writers,
+                                                      args.readers, args.duration, queue))
+            proc.start()
+            stats = queue.get()
+            proc.join()
+            reads, writes = stats["reads"], stats["writes"]
+            print(f"{mode:<8} | {len(reads) / args.duration:10.0f} | {statistics.median(reads or [0]):7.2f}ms | "
+                  f"{percentile(reads, 0.95):7.2f}ms | {len(writes) / args.duration:10.0f} | "
+                  f"{percentile(writes, 0.95):7.2f}ms | {stats['errors']}")
+
+
+if __name__ == "__main__":
+    main()
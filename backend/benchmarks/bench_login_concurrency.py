@@ -0,0 +1,85 @@
+# backend/benchmarks/bench_login_concurrency.py
+"""
+Teste de carga: logins simultâneos (bcrypt) e a latência do resto do app.
+
+Sobe um uvicorn de verdade (subprocesso, banco SQLite numa pasta temporária),
+cadastra N usuários e dispara POST /login em paralelo enquanto mede uma rota
+leve (GET /workers/stats). Roda uma vez por valor de --hash-threads:
+0 = bcrypt no próprio event loop (comportamento antigo), >0 = pool de threads.
+
+Uso:
+    python -m backend.benchmarks.bench_login_concurrency
+    python -m backend.benchmarks.bench_login_concurrency --clients 8 --hash-threads 0 2 4 --rounds 12
+"""
+import argparse
+import tempfile
+import threading
+import time
+
+import requests
+
+from .harness import admin_cookies, sample_latency, summary, uvicorn_server
+
+PROBE = "/workers/stats"
+
+
+def login_loop(base: str, email: str, stop: threading.Event, results: list, lock: threading.Lock):
+    with requests.Session() as s:
+        while not stop.is_set():
+            t0 = time.perf_counter()
+            r = s.post(f"{base}/login", data={"email": email, "password": "senha-de-teste"},
+                       allow_redirects=False, timeout=60)
+            with lock:
+                results.append(((time.perf_counter() - t0) * 1000, r.status_code))
+
+
+def run_once(args, hash_threads: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {"LABEL_HASH_THREADS": str(hash_threads), "LABEL_BCRYPT_ROUNDS": str(args.rounds),
+               "LABEL_LOG_LEVEL": "WARNING"}
+        # labelconvert.db fica na pasta temporária
+        with uvicorn_server(args.port, env, cwd=tmp, probe=PROBE) as base:
+            emails = [f"bench{i}@example.com" for i in range(args.clients)]
+            for email in emails:
+                requests.post(f"{base}/register", data={"name": "Bench", "email": email, "password": "senha-de-teste"},
+                              allow_redirects=False, timeout=60)
+
+            cookies = admin_cookies(base)  # PROBE é rota de administrador
+            idle = sample_latency(base, PROBE, args.duration / 2, cookies=cookies)
+
+            stop, lock, results = threading.Event(), threading.Lock(), []
+            clients = [threading.Thread(target=login_loop, args=(base, email, stop, results, lock), daemon=True)
+                       for email in emails]
+            t0 = time.perf_counter()
+            for t in clients:
+                t.start()
+            loaded = sample_latency(base, PROBE, args.duration, cookies=cookies)
+            stop.set()
+            for t in clients:
+                t.join()
+            elapsed = time.perf_counter() - t0
+
+    logins = ([ms for ms, _ in results], {})
+    for _, status in results:
+        logins[1][status] = logins[1].get(status, 0) + 1
+    print(f"hash-threads={hash_threads}  clientes={args.clients}  custo={args.rounds}")
+    print(f"  {PROBE + ' ocioso':<28}: {summary(idle)}")
+    print(f"  {PROBE + ' com logins':<28}: {summary(loaded)}")
+    print(f"  {'POST /login':<28}: {summary(logins)}")
+    print(f"  {'logins/s':<28}: {len(results) / elapsed:.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=8, help="clientes fazendo login em paralelo")
+    parser.add_argument("--hash-threads", type=int, nargs="+", default=[0, 4], help="LABEL_HASH_THREADS do servidor")
+    parser.add_argument("--rounds", type=int, default=12, help="LABEL_BCRYPT_ROUNDS do servidor")
+    parser.add_argument("--duration", type=float, default=8.0, help="segundos de amostragem com carga")
+    parser.add_argument("--port", type=int, default=8798)
+    args = parser.parse_args()
+    for hash_threads in args.hash_threads:
+        run_once(args, hash_threads)
+
+
+if __name__ == "__main__":
+    main()
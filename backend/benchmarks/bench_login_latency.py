@@ -0,0 +1,99 @@
+# backend/benchmarks/bench_login_latency.py
+"""
+Teste de carga: latência de GET /login enquanto conversões ZPL rodam.
+
+Sobe um uvicorn de verdade (subprocesso), mede /login ocioso e depois com
+N clientes disparando conversões (padrão /generate_zpl_image/) sem parar.
+Com o pool de workers a latência de /login deve ficar na mesma faixa nas duas
+fases; conversões acima de LABEL_MAX_PENDING voltam 429.
+
+Uso:
+    python -m backend.benchmarks.bench_login_latency
+    python -m backend.benchmarks.bench_login_latency --workers 2 --clients 6 --pages 40 --duration 10
+"""
+import argparse
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import fitz
+import requests
+
+from .harness import admin_cookies, sample_latency, summary, uvicorn_server
+
+
+def make_pdf(path: Path, pages: int):
+    """PDF sintético 100x150 mm com texto e blocos (custo de render parecido com uma etiqueta)."""
+    doc = fitz.open()
+    for i in range(pages):
+        page = doc.new_page(width=283, height=425)
+        page.insert_text((20, 40), f"PEDIDO 251107TESTE{i:04}", fontsize=14)
+        for row in range(12):
+            page.draw_rect(fitz.Rect(20, 60 + row * 28, 20 + (row * 17) % 240, 80 + row * 28), fill=(0, 0, 0))
+    doc.save(path)
+    doc.close()
+
+
+def convert_loop(base: str, endpoint: str, pdf_bytes: bytes, stop: threading.Event, counts: dict, lock: threading.Lock):
+    with requests.Session() as s:
+        while not stop.is_set():
+            r = s.post(
+                f"{base}{endpoint}",
+                files={"file": ("bench.pdf", pdf_bytes, "application/pdf")},
+                data={"compression": "z64"},
+                timeout=300,
+            )
+            with lock:
+                counts[r.status_code] = counts.get(r.status_code, 0) + 1
+            if r.status_code == 429:
+                time.sleep(float(r.headers.get("Retry-After", "1")) / 10)
+
+
+def run(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf_path = Path(tmp) / "bench.pdf"
+        make_pdf(pdf_path, args.pages)
+        pdf_bytes = pdf_path.read_bytes()
+
+        env = {"LABEL_WORKERS": str(args.workers), "LABEL_CACHE": "0"}
+        with uvicorn_server(args.port, env) as base:
+            requests.post(f"{base}{args.endpoint}", files={"file": ("w.pdf", pdf_bytes)}, timeout=300)  # aquece o pool
+
+            idle = sample_latency(base, "/login", args.duration, timeout=30)
+
+            stop, lock, counts = threading.Event(), threading.Lock(), {}
+            clients = [
+                threading.Thread(target=convert_loop, args=(base, args.endpoint, pdf_bytes, stop, counts, lock), daemon=True)
+                for _ in range(args.clients)
+            ]
+            for t in clients:
+                t.start()
+            time.sleep(0.5)
+            loaded = sample_latency(base, "/login", args.duration, timeout=30)
+            stop.set()
+            for t in clients:
+                t.join()
+            r = requests.get(f"{base}/workers/stats", cookies=admin_cookies(base), timeout=5)
+            pool_stats = r.json() if r.ok else "indisponível"
+
+    print(f"workers={args.workers}  clientes={args.clients}  páginas/PDF={args.pages}  endpoint={args.endpoint}")
+    print(f"  /login ocioso     : {summary(idle)}")
+    print(f"  /login com carga  : {summary(loaded)}")
+    print(f"  conversões por status: {dict(sorted(counts.items()))}")
+    print(f"  pool: {pool_stats}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=2, help="LABEL_WORKERS do servidor (0 = thread)")
+    parser.add_argument("--clients", type=int, default=4, help="clientes convertendo em paralelo")
+    parser.add_argument("--pages", type=int, default=40)
+    parser.add_argument("--duration", type=float, default=8.0, help="segundos de amostragem por fase")
+    parser.add_argument("--endpoint", default="/generate_zpl_image/", help="rota de conversão usada na carga")
+    parser.add_argument("--port", type=int, default=8799)
+    run(parser.parse_args())
+
+
+if __name__ == "__main__":
+    main()
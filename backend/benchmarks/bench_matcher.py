@@ -0,0 +1,94 @@
+# backend/benchmarks/bench_matcher.py
+"""
+Benchmark do casamento order_sn -> etiqueta.
+
+Compara o loop antigo (substring de cada pedido restante em cada crop) com o
+OrderMatcher (token + dict, Aho–Corasick como fallback) até 10k pedidos.
+
+Uso:
+    python -m backend.benchmarks.bench_matcher
+    python -m backend.benchmarks.bench_matcher --sizes 100 1000 10000 --legacy-max 2000
+"""
+import argparse
+import random
+import string
+import time
+
+from ..label_matcher import OrderMatcher
+
+ALPHABET = string.ascii_uppercase + string.digits
+
+
+def fake_order_sns(n: int, seed: int = 42):
+    rnd = random.Random(seed)
+    sns = set()
+    while len(sns) < n:
+        sns.add("251107" + "".join(rnd.choice(ALPHABET) for _ in range(8)))
+    return sorted(sns)
+
+
+def fake_crop_text(sn: str, malformed: bool = False):
+    # texto típico de uma etiqueta Shopee (~400 caracteres)
+    pedido = f"{sn[:7]}\n{sn[7:]}" if malformed else sn
+    return (
+        "SHOPEE XPRESS\nREMETENTE: LOJA EXEMPLO LTDA\nRUA DAS FLORES, 123 - CENTRO\n"
+        "SAO PAULO - SP 01000-000\nDESTINATARIO: CLIENTE EXEMPLO\n"
+        "AV BRASIL, 4567 APTO 89\nRIO DE JANEIRO - RJ 20000-000\n"
+        f"PEDIDO: {pedido}\nBR2560000000000\nPESO: 0,300 KG\nDATA: 07/11/2025\n"
+        "DECLARACAO DE CONTEUDO EM ANEXO\n"
+    ).upper()
+
+
+def legacy_match(crop_texts, order_sns):
+    remaining = set(order_sns)
+    found = []
+    for crop_text in crop_texts:
+        found_sn = None
+        for sn in list(remaining):
+            if sn and sn.upper() in crop_text:
+                found_sn = sn
+                break
+        if found_sn:
+            remaining.remove(found_sn)
+        found.append(found_sn)
+    return found
+
+
+def matcher_match(crop_texts, order_sns):
+    matcher = OrderMatcher(order_sns)
+    return [matcher.match(t) for t in crop_texts]
+
+
+def run(sizes, legacy_max: int, malformed_ratio: float):
+    print(f"{'pedidos':>8} | {'legado (s)':>10} | {'matcher (s)':>11} | {'µs/crop':>8} | ganho")
+    for n in sizes:
+        sns = fake_order_sns(n)
+        rnd = random.Random(n)
+        crop_texts = [fake_crop_text(sn, rnd.random() < malformed_ratio) for sn in rnd.sample(sns, n)]
+
+        t0 = time.perf_counter()
+        result = matcher_match(crop_texts, sns)
+        t_matcher = time.perf_counter() - t0
+
+        if n <= legacy_max:
+            t0 = time.perf_counter()
+            legacy = legacy_match(crop_texts, sns)
+            t_legacy = time.perf_counter() - t0
+            # o legado não acha SN quebrado em linhas; nos demais o resultado é o mesmo
+            assert all(a == b for a, b in zip(legacy, result) if a), "matcher divergiu do legado"
+            legacy_col, gain = f"{t_legacy:10.3f}", f"{t_legacy / t_matcher:.1f}x"
+        else:
+            legacy_col, gain = f"{'(pulado)':>10}", "-"
+
+        print(f"{n:8d} | {legacy_col} | {t_matcher:11.3f} | {t_matcher / n * 1e6:8.1f} | {gain}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 5000, 10000])
+    parser.add_argument("--legacy-max", type=int, default=5000,
+                        help="maior tamanho em que o loop antigo (quadrático) também é medido")
+    parser.add_argument("--malformed", type=float, default=0.02,
+                        help="fração de crops com o order_sn quebrado em duas linhas")
+    args = parser.parse_args()
+    run(args.sizes, args.legacy_max, args.malformed)
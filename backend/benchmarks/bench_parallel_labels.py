@@ -0,0 +1,76 @@
+# backend/benchmarks/bench_parallel_labels.py
+"""
+Benchmark do modo paralelo do generate_combined_pdf.
+
+Para cada tamanho gera um lote sintético, roda o modo sequencial e o paralelo
+com N processos, confere que a saída é idêntica (atribuições + render de uma
+amostra de páginas) e mostra o ganho. O escalonamento depende dos núcleos
+livres: numa máquina de 1 núcleo o modo paralelo só paga o custo dos processos.
+
+Uso:
+    python -m backend.benchmarks.bench_parallel_labels
+    python -m backend.benchmarks.bench_parallel_labels --labels 1000 --workers 2 4 8
+"""
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+from pathlib import Path
+
+import fitz
+
+from .fixtures import make_batch
+from ..label_generator import generate_combined_pdf
+
+
+def same_render(path_a: Path, path_b: Path, sample: int = 20) -> bool:
+    a, b = fitz.open(path_a), fitz.open(path_b)
+    try:
+        if a.page_count != b.page_count:
+            return False
+        step = max(1, a.page_count // sample)
+        for n in range(0, a.page_count, step):
+            if a[n].get_pixmap(dpi=50).samples != b[n].get_pixmap(dpi=50).samples:
+                return False
+        return True
+    finally:
+        a.close()
+        b.close()
+
+
+def timed_run(pdf_path, xlsx_path, output_path, workers: int):
+    t0 = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        assignments = generate_combined_pdf(pdf_path, xlsx_path, output_path, workers=workers)
+    return time.perf_counter() - t0, assignments
+
+
+def run(labels_list, workers_list):
+    print(f"núcleos disponíveis: {os.cpu_count()}")
+    print(f"{'etiquetas':>9} | {'workers':>7} | {'tempo (s)':>9} | ganho | idêntico")
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        for labels in labels_list:
+            pdf_path, xlsx_path, _ = make_batch(tmp, labels)
+            seq_out = tmp / f"seq_{labels}.pdf"
+            t_seq, seq_assignments = timed_run(pdf_path, xlsx_path, seq_out, workers=1)
+            print(f"{labels:9} | {1:7} | {t_seq:9.2f} |  1.0x | -")
+            for workers in workers_list:
+                par_out = tmp / f"par_{labels}_{workers}.pdf"
+                t_par, par_assignments = timed_run(pdf_path, xlsx_path, par_out, workers=workers)
+                identical = par_assignments == seq_assignments and same_render(seq_out, par_out)
+                print(f"{labels:9} | {workers:7} | {t_par:9.2f} | {t_seq / t_par:4.1f}x | {'sim' if identical else 'NÃO'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--labels", type=int, nargs="+", default=[1000])
+    parser.add_argument("--workers", type=int, nargs="+", default=[2, 4, 8])
+    args = parser.parse_args()
+    run(args.labels, args.workers)
+
+
+if __name__ == "__main__":
+    main()
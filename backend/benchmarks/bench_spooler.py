@@ -0,0 +1,116 @@
+# backend/benchmarks/bench_spooler.py
+"""
+Benchmark do spooler de impressão contra a impressora falsa (fake_printer.py).
+
+Envia --labels etiquetas ZPL (imagem 100x150 mm a 203 dpi, compressão --compression) de três jeitos:
+- uma conexão TCP por etiqueta (como o navegador repassando uma a uma)
+- spooler: conexão persistente + lotes
+- spooler com a impressora derrubando a conexão no meio (reconexão; o lote em
+  voo não é reenviado e aparece como sem confirmação)
+- spooler com impressora que não responde ao ~HS (confirmação desligada depois
+  do primeiro lote, nada repetido)
+- spooler com impressora lenta (--print-rate etiquetas/s, só as 100 primeiras
+  etiquetas): o ~HS segura os lotes enquanto a memória da impressora está cheia,
+  e a vazão deve ficar perto do --print-rate
+
+A impressora falsa cobra --accept-delay por conexão nova, o que as impressoras
+de verdade fazem (e o motivo de travarem com uma conexão por etiqueta).
+
+Uso:
+    python -m backend.benchmarks.bench_spooler
+    python -m backend.benchmarks.bench_spooler --labels 2000 --accept-delay 0.05 --compression ascii
+"""
+import argparse
+import os
+import random
+import socket
+import time
+
+from PIL import Image, ImageDraw
+
+from ..spooler import Spooler
+from .fake_printer import FakePrinter
+
+
+def make_labels(count: int, compression: str):
+    """count etiquetas ZPL iguais na imagem, com o número no ^FD (como pedidos diferentes)."""
+    from ..zpl_encoder import pack_image, zpl_label
+
+    img = Image.new("1", (800, 1200), 1)
+    draw = ImageDraw.Draw(img)
+    draw.rectangle((40, 40, 760, 1160), outline=0, width=6)
+    for y in range(120, 800, 90):
+        draw.rectangle((80, y, 80 + (y * 7) % 600, y + 40), fill=0)
+    # "código de barras"/texto: trecho pouco compressível, como numa etiqueta real
+    rnd = random.Random(1)
+    for x in range(80, 720, 4):
+        draw.rectangle((x, 850, x + rnd.choice((0, 1, 2)), 1050), fill=0)
+    data, bytes_per_row, height = pack_image(img)
+    base = zpl_label(data, bytes_per_row, height, compression)
+    return [base.replace("^XZ", f"^FO60,1130^A0N,30,30^FDPEDIDO {i:06d}^FS^XZ") for i in range(count)]
+
+
+def connection_per_label(address, labels):
+    for label in labels:
+        with socket.create_connection(address) as sock:
+            sock.sendall(label.encode("utf-8"))
+
+
+def via_spooler(address, labels, timeout: float = 600):
+    spooler = Spooler()
+    spooler.register("bench", address[0], address[1])
+    job = spooler.submit("bench", labels)
+    deadline = time.time() + timeout
+    while job.status in ("queued", "printing") and time.time() < deadline:
+        time.sleep(0.01)
+    stats = spooler.get("bench").stats()
+    stats["unconfirmed"] = sum(last - first + 1 for first, last in job.unconfirmed)
+    spooler.stop()
+    if job.status != "done":
+        raise RuntimeError(f"impressão terminou em {job.status}: {job.error}")
+    return stats
+
+
+def run(name: str, labels, fn, printer: FakePrinter):
+    printer.start()
+    t0 = time.perf_counter()
+    extra = fn(printer.address, labels) or {}
+    # a impressora conta o que já chegou; espera o fim do recebimento
+    deadline = time.time() + (30 if fn is connection_per_label else 1)
+    while printer.snapshot()["labels"] < len(labels) and time.time() < deadline:
+        time.sleep(0.01)
+    elapsed = time.perf_counter() - t0
+    printer.stop()
+    stats = printer.snapshot()
+    print(f"{name:<30} | {elapsed:7.2f}s | {len(labels) / elapsed:8.1f} | {stats['connections']:>8} | "
+          f"{stats['labels']:>9} | {extra.get('send_errors', '-'):>6} | {extra.get('unconfirmed', '-'):>8} | "
+          f"{extra.get('waits', '-')}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--labels", type=int, default=500)
+    parser.add_argument("--compression", default="z64", choices=("none", "ascii", "z64"))
+    parser.add_argument("--accept-delay", type=float, default=0.02, help="segundos por conexão nova na impressora")
+    parser.add_argument("--rate", type=float, default=0.0, help="bytes/s consumidos pela impressora (0 = sem limite)")
+    parser.add_argument("--print-rate", type=float, default=20.0, help="etiquetas/s do caso da impressora lenta")
+    args = parser.parse_args()
+    os.environ.setdefault("LABEL_LOG_LEVEL", "WARNING")
+
+    labels = make_labels(args.labels, args.compression)
+    size_kb = sum(len(label) for label in labels) / len(labels) / 1024
+    print(f"etiquetas={args.labels}  ~{size_kb:.1f} KB cada  accept-delay={args.accept_delay}s  rate={args.rate or '∞'}")
+    print(f"{'modo':<30} | {'tempo':>8} | {'etiq./s':>8} | {'conexões':>8} | {'recebidas':>9} | {'erros':>6} | {'s/ conf.':>8} | esperas")
+
+    def printer(**kwargs):
+        return FakePrinter(accept_delay=args.accept_delay, rate=args.rate, recv_buffer=64 * 1024, **kwargs)
+
+    run("conexão por etiqueta", labels, connection_per_label, printer())
+    run("spooler", labels, via_spooler, printer())
+    run("spooler + queda no meio", labels, via_spooler, printer(drop_after=args.labels // 2))
+    run("spooler + sem resposta ao ~HS", labels, via_spooler, printer(answer_status=False))
+    run(f"spooler + impressora {args.print_rate:g}/s", labels[:100], via_spooler, printer(print_rate=args.print_rate))
+
+
+if __name__ == "__main__":
+    main()
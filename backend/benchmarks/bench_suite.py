@@ -0,0 +1,226 @@
+# backend/benchmarks/bench_suite.py
+"""
+Suíte de benchmarks do pipeline com lotes sintéticos (fixtures.py).
+
+Para cada tamanho (10 a 10.000 etiquetas) gera o PDF A4 2x2 e a planilha de
+pedidos e mede:
+- generate_combined_pdf e match_pdf_with_excel (PDF de origem + Excel)
+- pdf_to_zpl e as rotas /generate_zpl_* via TestClient, usando como entrada
+  o PDF final (uma etiqueta 100x150 por página), como na impressão
+
+Cada caso roda num processo novo (spawn), com LABEL_WORKERS=0 e cache
+desligado, para que o pico de memória (ru_maxrss) seja só daquele caso.
+O resultado (tempo, vazão e pico de RSS) pode ser gravado como baseline em JSON
+e comparado depois: vazão abaixo ou memória acima da tolerância = regressão
+(código de saída 1).
+
+Uso:
+    python -m backend.benchmarks.bench_suite
+    python -m backend.benchmarks.bench_suite --labels 10 100 1000 10000 --save baseline.json
+    python -m backend.benchmarks.bench_suite --compare baseline.json --tolerance 0.15
+"""
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import platform
+import sys
+import tempfile
+import time
+import warnings
+from datetime import datetime
+from pathlib import Path
+
+from .fixtures import make_batch
+
+try:
+    import resource
+except ImportError:  # Windows: sem ru_maxrss
+    resource = None
+
+ZPL_ROUTES = ("/generate_zpl_image/", "/generate_zpl_full/", "/generate_zpl_concat/")
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa em KiB, macOS em bytes
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+# ==============================================================
+# Casos (executados no processo filho)
+# Cada caso faz os imports/preparos e devolve a função medida.
+# ==============================================================
+
+def case_generate_combined_pdf(batch, tmp: Path):
+    from ..label_generator import generate_combined_pdf
+    return lambda: generate_combined_pdf(batch["pdf"], batch["xlsx"], tmp / "saida.pdf")
+
+
+def case_match_pdf_with_excel(batch, tmp: Path):
+    from ..label_matcher import match_pdf_with_excel
+    return lambda: match_pdf_with_excel(batch["pdf"], batch["xlsx"])
+
+
+def case_pdf_to_zpl(batch, tmp: Path):
+    from ..pdf_to_zpl import pdf_to_zpl
+    content = Path(batch["labels_pdf"]).read_bytes()
+    return lambda: pdf_to_zpl(content)
+
+
+def make_route_case(route: str):
+    def case(batch, tmp: Path):
+        from fastapi.testclient import TestClient
+        from ..main import app
+        client = TestClient(app)
+        content = Path(batch["labels_pdf"]).read_bytes()
+
+        def call():
+            response = client.post(route, files={"file": ("etiquetas.pdf", content, "application/pdf")})
+            if response.status_code != 200:
+                raise RuntimeError(f"{route} respondeu {response.status_code}: {response.text[:200]}")
+        return call
+    return case
+
+
+# nome -> preparo do caso (devolve a função medida)
+CASES = {
+    "generate_combined_pdf": case_generate_combined_pdf,
+    "match_pdf_with_excel": case_match_pdf_with_excel,
+    "pdf_to_zpl": case_pdf_to_zpl,
+    **{f"POST {route}": make_route_case(route) for route in ZPL_ROUTES},
+}
+ZPL_CASES = {"pdf_to_zpl", *(f"POST {route}" for route in ZPL_ROUTES)}
+
+
+def run_case(name: str, batch: dict, scratch: str, queue):
+    """Processo filho: isola cache, banco e pool e mede um único caso."""
+    os.environ["LABEL_WORKERS"] = "0"
+    os.environ["LABEL_CACHE"] = "0"
+    os.environ["LABEL_LOG_LEVEL"] = "WARNING"
+    os.chdir(scratch)  # o app cria o labelconvert.db no diretório atual
+    warnings.simplefilter("ignore")
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            call = CASES[name](batch, Path(scratch))
+            t0 = time.perf_counter()
+            call()
+        queue.put({"seconds": time.perf_counter() - t0, "peak_rss_mb": peak_rss_mb()})
+    except Exception as e:
+        queue.put({"error": f"{e.__class__.__name__}: {e}"})
+
+
+def measure(name: str, batch: dict, scratch: Path, repeat: int):
+    """Melhor tempo de `repeat` execuções, cada uma num processo novo; pico de RSS = maior entre elas."""
+    ctx = multiprocessing.get_context("spawn")
+    best, peak = None, None
+    for _ in range(repeat):
+        queue = ctx.Queue()
+        proc = ctx.Process(target=run_case, args=(name, batch, str(scratch), queue))
+        proc.start()
+        result = queue.get()
+        proc.join()
+        if "error" in result:
+            return result
+        best = result["seconds"] if best is None else min(best, result["seconds"])
+        if result["peak_rss_mb"] is not None:
+            peak = max(peak or 0, result["peak_rss_mb"])
+    return {"seconds": round(best, 4), "peak_rss_mb": peak}
+
+
+# ==============================================================
+# Execução, baseline e comparação
+# ==============================================================
+
+def prepare_batch(tmp: Path, labels: int):
+    """Lote sintético + PDF final correspondente (entrada dos casos de ZPL)."""
+    from ..label_generator import generate_combined_pdf
+    pdf_path, xlsx_path, _ = make_batch(tmp, labels)
+    labels_pdf = tmp / f"etiquetas_{labels}.pdf"
+    generate_combined_pdf(pdf_path, xlsx_path, labels_pdf)
+    return {"pdf": str(pdf_path), "xlsx": str(xlsx_path), "labels_pdf": str(labels_pdf)}
+
+
+def run(labels_list, cases, repeat: int, zpl_max: int):
+    results = {}
+    print(f"{'caso':<28} | {'etiquetas':>9} | {'tempo (s)':>9} | {'etiq./s':>9} | {'pico RSS (MB)':>13}")
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        for labels in labels_list:
+            batch = prepare_batch(tmp, labels)
+            for name in cases:
+                if name in ZPL_CASES and labels > zpl_max:
+                    continue
+                result = measure(name, batch, tmp, repeat)
+                key = f"{name}@{labels}"
+                if "error" in result:
+                    print(f"{name:<28} | {labels:9} | ERRO: {result['error']}")
+                    results[key] = result
+                    continue
+                result["labels"] = labels
+                result["throughput"] = round(labels / result["seconds"], 2)
+                results[key] = result
+                rss = result["peak_rss_mb"] if result["peak_rss_mb"] is not None else "-"
+                print(f"{name:<28} | {labels:9} | {result['seconds']:9.3f} | {result['throughput']:9.1f} | {rss:>13}")
+    return results
+
+
+def compare(baseline: dict, results: dict, tolerance: float):
+    """Lista de regressões (vazão caiu ou memória subiu além da tolerância)."""
+    regressions = []
+    print(f"\n{'caso':<36} | {'vazão base':>10} | {'atual':>10} | {'Δ vazão':>8} | {'Δ RSS':>8}")
+    for key, current in results.items():
+        old = baseline.get("results", {}).get(key)
+        if not old or "throughput" not in old or "throughput" not in current:
+            continue
+        speed = current["throughput"] / old["throughput"] - 1
+        rss = None
+        if old.get("peak_rss_mb") and current.get("peak_rss_mb"):
+            rss = current["peak_rss_mb"] / old["peak_rss_mb"] - 1
+        flag = ""
+        if speed < -tolerance or (rss is not None and rss > tolerance):
+            regressions.append(key)
+            flag = "  ⚠️  regressão"
+        rss_text = f"{rss:+8.1%}" if rss is not None else f"{'-':>8}"
+        print(f"{key:<36} | {old['throughput']:10.1f} | {current['throughput']:10.1f} | {speed:+8.1%} | {rss_text}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--labels", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--cases", nargs="+", choices=list(CASES), default=list(CASES))
+    parser.add_argument("--repeat", type=int, default=1, help="execuções por caso (vale a melhor)")
+    parser.add_argument("--zpl-max", type=int, default=1000,
+                        help="maior lote para os casos de ZPL (rasterização a 203 dpi é o caso mais lento)")
+    parser.add_argument("--save", type=Path, help="grava o resultado como baseline JSON")
+    parser.add_argument("--compare", type=Path, help="compara com um baseline JSON gravado antes")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="variação aceita antes de apontar regressão")
+    args = parser.parse_args()
+
+    results = run(args.labels, args.cases, args.repeat, args.zpl_max)
+
+    if args.save:
+        args.save.write_text(json.dumps({
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "results": results,
+        }, indent=2, ensure_ascii=False))
+        print(f"\n💾 Baseline gravado em {args.save}")
+
+    if args.compare:
+        regressions = compare(json.loads(args.compare.read_text()), results, args.tolerance)
+        if regressions:
+            print(f"\n❌ {len(regressions)} regressão(ões): {', '.join(regressions)}")
+            sys.exit(1)
+        print("\n✅ Sem regressões")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+# backend/benchmarks/bench_zpl_encoder.py
+"""
+Golden + microbenchmark do codificador ^GFA.
+
+1) confere que pdf_to_zpl.image_to_zpl_gfa e main.image_to_zpl produzem
+   exatamente os mesmos bytes que as implementações antigas (laço por pixel
+   e join por byte), em imagens aleatórias com larguras que não são múltiplas de 8
+2) mede o tempo de cada versão numa etiqueta 100x150 mm a 203 dpi
+
+Sai com código 1 (sem medir) se alguma saída divergir.
+
+Uso:
+    python -m backend.benchmarks.bench_zpl_encoder
+"""
+import argparse
+import sys
+import time
+
+import numpy as np
+from PIL import Image
+
+from ..pdf_to_zpl import image_to_zpl_gfa
+from ..zpl_encoder import pack_array, hex_payload
+
+# 100x150 mm a 203 dpi
+LABEL_SIZE = (799, 1199)
+
+
+# ---------- implementações antigas (referência) ----------
+
+def legacy_image_to_zpl_gfa(img):
+    w, h = img.size
+    bytes_per_row = (w + 7) // 8
+    total_bytes = bytes_per_row * h
+    pixels = img.load()
+    hex_lines = []
+    for y in range(h):
+        row_bytes = bytearray(bytes_per_row)
+        for x in range(w):
+            byte_index = x // 8
+            bit_index = 7 - (x % 8)
+            bit = 1 if pixels[x, y] == 0 else 0  # preto=1
+            if bit:
+                row_bytes[byte_index] |= (1 << bit_index)
+        hex_lines.append(row_bytes.hex().upper())
+    header = f"{total_bytes},{bytes_per_row},{bytes_per_row},"
+    return header + "".join(hex_lines)
+
+
+def legacy_image_to_zpl(image):
+    image = image.convert("1")
+    image = Image.eval(image, lambda x: 255 - x)
+    width, height = image.size
+    bytes_per_row = (width + 7) // 8
+    total_bytes = bytes_per_row * height
+    data = bytearray(image.tobytes())
+    hex_data = ''.join(f'{b:02X}' for b in data)
+    return f"^XA\n^FO0,0^GFA,{total_bytes},{total_bytes},{bytes_per_row},{hex_data}^XZ"
+
+
+# ---------- imagens de teste ----------
+
+def random_label(size, seed: int, density: float = 0.08):
+    """Etiqueta sintética: fundo branco, blocos pretos e ruído (imagem modo 'L')."""
+    rnd = np.random.default_rng(seed)
+    w, h = size
+    arr = np.full((h, w), 255, dtype=np.uint8)
+    for _ in range(40):
+        x0, y0 = rnd.integers(0, w - 10), rnd.integers(0, h - 10)
+        arr[y0:y0 + rnd.integers(2, 120), x0:x0 + rnd.integers(2, 300)] = 0
+    noise = rnd.random((h, w)) < density
+    arr[noise] = rnd.integers(0, 256, noise.sum(), dtype=np.uint8)
+    return Image.fromarray(arr, "L")
+
+
+def check_golden() -> list:
+    """Compara com as implementações antigas; devolve a lista de divergências (vazia = ok)."""
+    from ..main import image_to_zpl
+
+    sizes = [(1, 1), (7, 3), (8, 8), (9, 5), (17, 11), (203, 97), (640, 481)]
+    failures = []
+    for i, size in enumerate(sizes):
+        gray = random_label(size, seed=i) if min(size) > 10 else Image.fromarray(
+            np.random.default_rng(i).integers(0, 256, (size[1], size[0]), dtype=np.uint8), "L")
+        bw = gray.point(lambda p: 0 if p < 180 else 255, "1")
+        if image_to_zpl_gfa(bw) != legacy_image_to_zpl_gfa(bw):
+            failures.append(f"image_to_zpl_gfa divergiu em {size}")
+        for img in (gray, gray.convert("RGB"), bw):
+            if image_to_zpl(img) != legacy_image_to_zpl(img):
+                failures.append(f"image_to_zpl divergiu em {size}/{img.mode}")
+
+        # packbits sobre o limiar também bate com o caminho PIL
+        data, bpr, rows = pack_array(np.asarray(gray) < 180)
+        if f"{bpr * rows},{bpr},{bpr}," + hex_payload(data) != legacy_image_to_zpl_gfa(bw):
+            failures.append(f"pack_array + hex_payload divergiu em {size}")
+    if failures:
+        for failure in failures:
+            print(f"❌ golden: {failure}")
+    else:
+        print(f"✅ golden: saída idêntica às implementações antigas em {len(sizes)} tamanhos")
+    return failures
+
+
+def timeit(fn, repeat: int):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def run(repeat: int):
+    from ..main import image_to_zpl
+
+    gray = random_label(LABEL_SIZE, seed=99)
+    bw = gray.point(lambda p: 0 if p < 180 else 255, "1")
+    black = np.asarray(gray) < 180
+
+    rows = [
+        ("pdf_to_zpl legado (laço por pixel)", lambda: legacy_image_to_zpl_gfa(bw), 1),
+        ("pdf_to_zpl.image_to_zpl_gfa", lambda: image_to_zpl_gfa(bw), repeat),
+        ("main legado (join por byte)", lambda: legacy_image_to_zpl(gray), max(1, repeat // 4)),
+        ("main.image_to_zpl", lambda: image_to_zpl(gray), repeat),
+        ("pack_array + hex_payload", lambda: hex_payload(pack_array(black)[0]), repeat),
+    ]
+    print(f"\nEtiqueta {LABEL_SIZE[0]}x{LABEL_SIZE[1]} px (melhor de N execuções)")
+    for name, fn, n in rows:
+        print(f"  {name:38s} {timeit(fn, n) * 1000:9.2f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    if check_golden():
+        sys.exit(1)
+    run(args.repeat)
@@ -0,0 +1,100 @@
+# backend/benchmarks/check_layouts.py
+"""
+Verificações de regressão da detecção de layouts e dos recortes vazios (layouts.py),
+com páginas sintéticas que já deram problema (inclusive folhas escaneadas, só imagem). Sai com código 1 se alguma falhar.
+
+Uso:
+    python -m backend.benchmarks.check_layouts
+"""
+import sys
+import tempfile
+from pathlib import Path
+
+import fitz
+
+from ..layouts import LAYOUTS, detect_layout, iter_page_slots
+from .fixtures import make_raster_label_pdf
+
+
+def shopee_page(doc, addresses):
+    """Página A4 2x2 com "Pedido" duas vezes por etiqueta (cabeçalho e código de barras)."""
+    width, height = fitz.paper_size("a4")
+    page = doc.new_page(width=width, height=height)
+    for j, address in enumerate(addresses):
+        x, y = (j % 2) * width / 2, (j // 2) * height / 2
+        page.insert_text((x + 20, y + 40), "SHOPEE XPRESS", fontsize=12)
+        page.insert_text((x + 20, y + 80), f"Pedido: 2511{j:010d}", fontsize=10)
+        page.insert_text((x + 20, y + 120), address, fontsize=9)
+        page.insert_text((x + 20, y + 300), f"Pedido 2511{j:010d}", fontsize=8)
+    return page
+
+
+def check_detect_double_marker_and_amazonas():
+    doc = fitz.open()
+    page = shopee_page(doc, ["Av. B, 2 - Manaus - Amazonas", "Rua A, 1 - São Paulo", "Rua C, 3", "Rua D, 4"])
+    chosen = detect_layout(page)
+    assert chosen.name == "a4_2x2", f"esperado a4_2x2, veio {chosen.name}"
+
+
+def check_unverified_layouts_not_auto():
+    for name in ("mercado_livre_a4", "amazon_a4"):
+        assert not LAYOUTS[name].auto_detect, f"{name} não deveria participar da detecção automática"
+
+
+def check_marker_is_whole_word():
+    doc = fitz.open()
+    width, height = fitz.paper_size("a4")
+    page = doc.new_page(width=width, height=height)
+    page.insert_text((20, 40), "Entrega: Manaus - Amazonas", fontsize=10)
+    chosen = detect_layout(page)
+    assert chosen.name != "amazon_a4", "\"Amazonas\" não pode casar com o marcador \"Amazon\""
+
+
+def kept_slots(pdf_path):
+    with fitz.open(pdf_path) as doc:
+        return [sum(1 for _ in iter_page_slots(page, skip_empty=True)) for page in doc]
+
+
+def check_raster_sheets_keep_labels():
+    """Página escaneada (imagem inteira) ou uma imagem por quadrante: só o quadrante em branco sai."""
+    sns = [f"2511{k:010d}" for k in range(7)]  # 2 páginas: 4 + 3 etiquetas
+    with tempfile.TemporaryDirectory() as tmp:
+        for per_slot in (False, True):
+            pdf_path = Path(tmp) / f"raster_{per_slot}.pdf"
+            make_raster_label_pdf(pdf_path, sns, per_slot=per_slot)
+            kept = kept_slots(pdf_path)
+            assert kept == [4, 3], f"per_slot={per_slot}: recortes mantidos {kept}, esperado [4, 3]"
+
+
+def check_vector_background_is_not_content():
+    doc = fitz.open()
+    page = shopee_page(doc, ["Rua A, 1", "Rua B, 2", "Rua C, 3"])
+    page.draw_rect(page.rect, color=None, fill=(1, 1, 1), overlay=False)
+    kept = sum(1 for _ in iter_page_slots(page, skip_empty=True))
+    assert kept == 3, f"fundo vetorial da folha: {kept} recortes mantidos, esperado 3"
+
+
+CHECKS = [
+    check_detect_double_marker_and_amazonas,
+    check_unverified_layouts_not_auto,
+    check_marker_is_whole_word,
+    check_raster_sheets_keep_labels,
+    check_vector_background_is_not_content,
+]
+
+
+def main():
+    failed = 0
+    for check in CHECKS:
+        try:
+            check()
+            print(f"✅ {check.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {check.__name__}: {e}")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
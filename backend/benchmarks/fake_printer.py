@@ -0,0 +1,165 @@
+# backend/benchmarks/fake_printer.py
+"""
+Impressora falsa: servidor TCP "raw" (como a porta 9100) que conta as
+etiquetas ^XA...^XZ recebidas, para testar o spooler sem impressora.
+
+Simula o que trava as impressoras de verdade:
+- atende uma conexão por vez
+- accept_delay: custo de cada conexão nova (a impressora demora para aceitar)
+- rate: bytes/s consumidos (velocidade de impressão); com o buffer de
+  recepção pequeno, quem envia sente o controle de fluxo do TCP
+- drop_after: derruba a conexão (uma vez) depois de N etiquetas, para testar
+  reconexão e reenvio
+- print_rate: etiquetas/s impressas; o que chegou e ainda não saiu aparece como
+  "formatos no buffer" na resposta do ~HS (controle de fluxo do spooler)
+
+Responde ao ~HS (status Zebra) com as três linhas STX...ETX; com
+answer_status=False fica calada, como as impressoras que só emulam ZPL.
+
+Uso avulso (aponte LABEL_PRINTERS=teste=127.0.0.1:9100 para ela):
+    python -m backend.benchmarks.fake_printer --port 9100
+"""
+import argparse
+import re
+import socket
+import socketserver
+import threading
+import time
+
+MARKER_PATTERN = re.compile(rb"\^X[AZ]|~HS")
+
+
+class LabelCounter:
+    """Conta blocos ^XA...^XZ (e pedidos de ~HS) num fluxo de bytes que chega em pedaços arbitrários."""
+
+    def __init__(self):
+        self.labels = 0
+        self._open = False
+        self._pending = b""
+
+    def feed(self, data: bytes):
+        """Processa mais bytes; devolve (etiquetas que fecharam neles, pedidos de ~HS)."""
+        buf = self._pending + data.upper()
+        closed = queries = 0
+        for m in MARKER_PATTERN.finditer(buf):
+            if m.group() == b"~HS":
+                queries += 1
+            elif m.group() == b"^XA":
+                self._open = True
+            elif self._open:
+                self._open = False
+                closed += 1
+        # um marcador cortado no fim do pedaço ("^" ou "^X") fecha com o próximo
+        self._pending = buf[-2:]
+        self.labels += closed
+        return closed, queries
+
+
+class FakePrinter:
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, accept_delay: float = 0.0, rate: float = 0.0,
+                 drop_after: int = 0, recv_buffer: int = 0, print_rate: float = 0.0, answer_status: bool = True):
+        self.accept_delay = accept_delay
+        self.answer_status = answer_status
+        self.rate = rate
+        self.drop_after = drop_after
+        self.print_rate = print_rate
+        self.stats = {"connections": 0, "labels": 0, "bytes": 0, "drops": 0, "status_queries": 0}
+        self._printed = 0.0
+        self._clock = time.monotonic()
+        self._lock = threading.Lock()
+        printer = self
+
+        class Handler(socketserver.BaseRequestHandler):
+            def handle(self):
+                printer._handle(self.request)
+
+        # uma conexão por vez, como as impressoras: a próxima espera a anterior fechar
+        class Server(socketserver.TCPServer):
+            allow_reuse_address = True
+            # backlog folgado: o custo de conexão medido é só o accept_delay
+            request_queue_size = 128
+
+            def server_bind(self):
+                if recv_buffer:
+                    self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, recv_buffer)
+                super().server_bind()
+
+        self._server = Server((host, port), Handler)
+        self.address = self._server.server_address
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-printer", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return dict(self.stats)
+
+    def formats_buffered(self) -> int:
+        """Etiquetas recebidas e ainda não "impressas" (com print_rate; senão 0)."""
+        if not self.print_rate:
+            return 0
+        now = time.monotonic()
+        with self._lock:
+            self._printed = min(self.stats["labels"], self._printed + (now - self._clock) * self.print_rate)
+            self._clock = now
+            return int(self.stats["labels"] - self._printed)
+
+    def host_status(self) -> bytes:
+        line1 = f"030,0,0,1245,{self.formats_buffered():03d},0,0,0,000,0,0,0"
+        line2 = "000,0,0,0,0,2,4,0,00000000,1,000"
+        return b"".join(b"\x02" + line.encode() + b"\x03\r\n" for line in (line1, line2, "1234,0"))
+
+    def _handle(self, conn):
+        if self.accept_delay:
+            time.sleep(self.accept_delay)
+        with self._lock:
+            self.stats["connections"] += 1
+        counter = LabelCounter()
+        while True:
+            data = conn.recv(16384)
+            if not data:
+                return
+            closed, queries = counter.feed(data)
+            with self._lock:
+                self.stats["bytes"] += len(data)
+                self.stats["labels"] += closed
+                self.stats["status_queries"] += queries
+                drop = self.drop_after and self.stats["labels"] >= self.drop_after
+                if drop:
+                    self.drop_after = 0
+                    self.stats["drops"] += 1
+            if drop:
+                conn.close()
+                return
+            for _ in range(queries if self.answer_status else 0):
+                conn.sendall(self.host_status())
+            if self.rate:
+                time.sleep(len(data) / self.rate)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--accept-delay", type=float, default=0.0, help="segundos por conexão nova")
+    parser.add_argument("--rate", type=float, default=0.0, help="bytes/s consumidos (0 = sem limite)")
+    parser.add_argument("--print-rate", type=float, default=0.0, help="etiquetas/s impressas (0 = instantâneo)")
+    args = parser.parse_args()
+    printer = FakePrinter(args.host, args.port, args.accept_delay, args.rate, print_rate=args.print_rate).start()
+    print(f"🖨️  Impressora falsa em {printer.address[0]}:{printer.address[1]} (Ctrl+C para sair)")
+    try:
+        while True:
+            time.sleep(5)
+            print(printer.snapshot())
+    except KeyboardInterrupt:
+        printer.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+# backend/benchmarks/fixtures.py
+"""
+Entradas sintéticas para os benchmarks: PDF A4 com etiquetas 2x2 no formato
+Shopee (texto "Pedido: <order_sn>") e a planilha de pedidos correspondente.
+
+Também gera um par avulso para testes manuais (ex.: o exemplo.pdf dos __main__):
+    python -m backend.benchmarks.fixtures --labels 40 --out backend
+"""
+import argparse
+import random
+from pathlib import Path
+
+import fitz
+import pandas as pd
+
+
+def fake_order_sn(rnd: random.Random) -> str:
+    return f"2511{rnd.randint(10**9, 10**10 - 1)}"
+
+
+def make_label_pdf(path, order_sns):
+    """Uma página A4 para cada 4 pedidos, um quadrante por etiqueta."""
+    doc = fitz.open()
+    make_label_pdf_doc(doc, order_sns)
+    doc.save(path)
+    doc.close()
+
+
+def make_label_pdf_doc(doc, order_sns):
+    """Acrescenta ao documento aberto as páginas de make_label_pdf."""
+    width, height = fitz.paper_size("a4")
+    for i in range(0, len(order_sns), 4):
+        page = doc.new_page(width=width, height=height)
+        for j, sn in enumerate(order_sns[i:i + 4]):
+            x, y = (j % 2) * width / 2, (j // 2) * height / 2
+            page.insert_text((x + 20, y + 40), "SHOPEE XPRESS", fontsize=12)
+            page.insert_text((x + 20, y + 80), f"Pedido: {sn}", fontsize=10)
+            page.draw_rect(fitz.Rect(x + 20, y + 100, x + 200, y + 160), color=(0, 0, 0), fill=(0, 0, 0))
+
+
+def make_raster_label_pdf(path, order_sns, per_slot: bool = False, dpi: int = 100):
+    """
+    Como make_label_pdf, mas só com imagens (etiquetas escaneadas): cada página
+    vira uma imagem da página inteira, ou uma imagem por quadrante (per_slot).
+    """
+    vector = fitz.open()
+    make_label_pdf_doc(vector, order_sns)
+    doc = fitz.open()
+    for src in vector:
+        page = doc.new_page(width=src.rect.width, height=src.rect.height)
+        w, h = src.rect.width / 2, src.rect.height / 2
+        clips = [fitz.Rect(x, y, x + w, y + h) for y in (0, h) for x in (0, w)] if per_slot else [src.rect]
+        for clip in clips:
+            pix = src.get_pixmap(clip=clip, dpi=dpi, colorspace=fitz.csGRAY)
+            page.insert_image(clip, stream=pix.tobytes("png"))
+    doc.save(path)
+    doc.close()
+
+
+def make_orders_xlsx(path, order_sns, seed: int = 1):
+    """Planilha no layout da exportação Shopee (order_sn + product_info), em ordem embaralhada."""
+    rows = [
+        {
+            "tracking_number": f"BR{k}",
+            "order_sn": sn,
+            "product_info": (
+                f"[1] Product Name:Prod {k % 7}; Variation Name:X; Price: R$ 1.00; Quantity: {k % 3 + 1}; "
+                f"SKU Reference No.: [SKU{k % 7}]; Parent SKU Reference No.: [P{k % 7}]; "
+            ),
+        }
+        for k, sn in enumerate(order_sns)
+    ]
+    random.Random(seed).shuffle(rows)
+    pd.DataFrame(rows).to_excel(path, index=False)
+
+
+def make_batch(directory, labels: int, seed: int = 1):
+    """Gera <directory>/labels_<n>.pdf e orders_<n>.xlsx; devolve (pdf_path, xlsx_path, order_sns)."""
+    rnd = random.Random(seed)
+    order_sns = [fake_order_sn(rnd) for _ in range(labels)]
+    pdf_path = directory / f"labels_{labels}.pdf"
+    xlsx_path = directory / f"orders_{labels}.xlsx"
+    make_label_pdf(pdf_path, order_sns)
+    make_orders_xlsx(xlsx_path, order_sns, seed)
+    return pdf_path, xlsx_path, order_sns
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gera um PDF de etiquetas e a planilha de pedidos sintéticos.")
+    parser.add_argument("--labels", type=int, default=40)
+    parser.add_argument("--out", type=Path, default=Path("."))
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    args.out.mkdir(parents=True, exist_ok=True)
+    pdf_path, xlsx_path, _ = make_batch(args.out, args.labels, args.seed)
+    print(f"📄 {pdf_path}\n📊 {xlsx_path}")
@@ -0,0 +1,92 @@
+# backend/benchmarks/harness.py
+"""
+Peças comuns dos testes de carga: uvicorn de verdade num subprocesso,
+amostragem de latência de uma rota e resumo (p50/p95/máx) das amostras.
+"""
+import os
+import statistics
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+import requests
+
+ROOT = Path(__file__).resolve().parents[2]
+
+# rotas operacionais (/workers/stats...) exigem administrador: o servidor sobe com
+# este e-mail em LABEL_ADMIN_EMAILS e admin_cookies() faz o login dele
+ADMIN_EMAIL = "bench-admin@example.com"
+ADMIN_PASSWORD = "senha-de-teste"
+
+
+def percentile(values, q: float):
+    ordered = sorted(values)
+    return ordered[max(0, int(len(ordered) * q) - 1)] if ordered else 0.0
+
+
+def wait_ready(base: str, path: str, timeout: float = 30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            requests.get(f"{base}{path}", timeout=1)
+            return
+        except requests.RequestException:
+            time.sleep(0.2)
+    raise RuntimeError("uvicorn não subiu a tempo")
+
+
+@contextmanager
+def uvicorn_server(port: int, env: dict = None, cwd=None, probe: str = "/login"):
+    """
+    Sobe backend.main:app na porta pedida e espera `probe` responder; devolve a URL base.
+    cwd vira a pasta do labelconvert.db (SQLite padrão) — uma pasta temporária isola o banco.
+    """
+    base = f"http://127.0.0.1:{port}"
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "backend.main:app", "--app-dir", str(ROOT),
+         "--port", str(port), "--log-level", "critical"],
+        cwd=cwd or ROOT, env={**os.environ, "LABEL_ADMIN_EMAILS": ADMIN_EMAIL, **(env or {})},
+    )
+    try:
+        wait_ready(base, probe)
+        yield base
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def admin_cookies(base: str):
+    """Cadastra (se preciso) e loga o administrador do benchmark; devolve os cookies da sessão."""
+    with requests.Session() as s:
+        s.post(f"{base}/register", data={"name": "Bench", "email": ADMIN_EMAIL, "password": ADMIN_PASSWORD},
+               allow_redirects=False, timeout=60)
+        s.post(f"{base}/login", data={"email": ADMIN_EMAIL, "password": ADMIN_PASSWORD},
+               allow_redirects=False, timeout=60)
+        return s.cookies.get_dict()
+
+
+def sample_latency(base: str, path: str, duration: float, interval: float = 0.05, timeout: float = 60,
+                   cookies: dict = None):
+    """Latências (ms) de GET path e contagem por status — o que importa é o tempo, não o corpo."""
+    latencies, statuses = [], {}
+    end = time.time() + duration
+    with requests.Session() as s:
+        s.cookies.update(cookies or {})
+        while time.time() < end:
+            t0 = time.perf_counter()
+            r = s.get(f"{base}{path}", timeout=timeout)
+            latencies.append((time.perf_counter() - t0) * 1000)
+            statuses[r.status_code] = statuses.get(r.status_code, 0) + 1
+            time.sleep(interval)
+    return latencies, statuses
+
+
+def summary(sample):
+    latencies, statuses = sample
+    ordered = sorted(latencies)
+    return (
+        f"n={len(ordered):4}  p50={statistics.median(ordered or [0]):7.1f} ms  p95={percentile(ordered, 0.95):7.1f} ms  "
+        f"max={(ordered or [0])[-1]:7.1f} ms  status={dict(sorted(statuses.items()))}"
+    )
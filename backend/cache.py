@@ -0,0 +1,193 @@
+# backend/cache.py
+"""
+Cache endereçado por conteúdo (SHA-256 dos bytes) para o parse de Excel/PDF.
+
+Dois níveis:
+- memória: LRU com N entradas por processo
+- disco: um pickle por entrada em CACHE_DIR/<namespace>/<sha256>.pkl,
+  com expulsão dos menos usados quando o total passa de CACHE_DISK_BYTES
+
+Os valores devolvidos são compartilhados entre chamadas: trate-os como somente leitura.
+"""
+import hashlib
+import logging
+import os
+import pickle
+import tempfile
+import threading
+from collections import OrderedDict
+from functools import wraps
+from pathlib import Path
+
+CACHE_DIR = Path(os.getenv("LABEL_CACHE_DIR", Path(__file__).resolve().parent / "cache"))
+CACHE_MEMORY_ITEMS = int(os.getenv("LABEL_CACHE_MEMORY_ITEMS", "64"))
+CACHE_DISK_BYTES = int(os.getenv("LABEL_CACHE_DISK_MB", "256")) * 1024 * 1024
+CACHE_ENABLED = os.getenv("LABEL_CACHE", "1") != "0"
+
+CHUNK_SIZE = 1024 * 1024
+
+logger = logging.getLogger(__name__)
+
+
+def file_digest(path) -> str:
+    """SHA-256 (hex) do conteúdo do arquivo, lido em blocos."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def bytes_digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+class ContentCache:
+    def __init__(self, directory: Path, memory_items: int, disk_bytes: int):
+        self.directory = Path(directory)
+        self.memory_items = memory_items
+        self.disk_bytes = disk_bytes
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk_total = None  # calculado na primeira escrita
+        self._stats = {}
+
+    # ---------- contadores ----------
+
+    def _count(self, namespace: str, field: str):
+        ns = self._stats.setdefault(namespace, {"memory_hits": 0, "disk_hits": 0, "misses": 0})
+        ns[field] += 1
+
+    def stats(self):
+        """Contadores de hit/miss por namespace e totais."""
+        with self._lock:
+            namespaces = {ns: dict(v) for ns, v in self._stats.items()}
+            memory_entries = len(self._memory)
+            if self._disk_total is None:
+                self._disk_total = self._scan_disk()
+        totals = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+        for v in namespaces.values():
+            for k in totals:
+                totals[k] += v[k]
+        lookups = sum(totals.values())
+        totals["hit_ratio"] = round((totals["memory_hits"] + totals["disk_hits"]) / lookups, 4) if lookups else 0.0
+        return {
+            "enabled": CACHE_ENABLED,
+            "memory_entries": memory_entries,
+            "disk_bytes": self._disk_total,
+            "totals": totals,
+            "namespaces": namespaces,
+        }
+
+    # ---------- leitura/escrita ----------
+
+    def _disk_path(self, namespace: str, digest: str) -> Path:
+        return self.directory / namespace / f"{digest}.pkl"
+
+    def get(self, namespace: str, digest: str):
+        """Devolve (True, valor) em hit ou (False, None) em miss."""
+        key = (namespace, digest)
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self._count(namespace, "memory_hits")
+                return True, self._memory[key]
+
+        path = self._disk_path(namespace, digest)
+        try:
+            with open(path, "rb") as f:
+                value = pickle.load(f)
+            os.utime(path)  # mtime = último uso, base da expulsão em disco
+        except (OSError, pickle.UnpicklingError, EOFError):
+            with self._lock:
+                self._count(namespace, "misses")
+            return False, None
+
+        with self._lock:
+            self._count(namespace, "disk_hits")
+            self._remember(key, value)
+        return True, value
+
+    def set(self, namespace: str, digest: str, value):
+        with self._lock:
+            self._remember((namespace, digest), value)
+
+        path = self._disk_path(namespace, digest)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, path)
+            self._account_disk(path.stat().st_size)
+        except OSError as e:
+            logger.warning("⚠️  Cache em disco indisponível (%s); mantendo só em memória", e)
+
+    def get_or_compute(self, namespace: str, digest: str, compute):
+        if not CACHE_ENABLED:
+            return compute()
+        hit, value = self.get(namespace, digest)
+        if hit:
+            return value
+        value = compute()
+        self.set(namespace, digest, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self._stats.clear()
+        for path in self.directory.glob("*/*.pkl"):
+            path.unlink(missing_ok=True)
+        self._disk_total = 0
+
+    # ---------- expulsão ----------
+
+    def _remember(self, key, value):
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+    def _scan_disk(self):
+        return sum(p.stat().st_size for p in self.directory.glob("*/*.pkl"))
+
+    def _account_disk(self, added: int):
+        with self._lock:
+            if self._disk_total is None:
+                self._disk_total = self._scan_disk()
+            else:
+                self._disk_total += added
+            if self._disk_total <= self.disk_bytes:
+                return
+
+            # remove os menos usados até ficar em 90% do limite
+            files = sorted(self.directory.glob("*/*.pkl"), key=lambda p: p.stat().st_mtime)
+            total = sum(p.stat().st_size for p in files)
+            for p in files:
+                if total <= self.disk_bytes * 0.9:
+                    break
+                size = p.stat().st_size
+                p.unlink(missing_ok=True)
+                total -= size
+            self._disk_total = total
+
+
+cache = ContentCache(CACHE_DIR, CACHE_MEMORY_ITEMS, CACHE_DISK_BYTES)
+
+
+def cached_by_file(namespace: str):
+    """
+    Decorator para funções cujo primeiro argumento é o caminho de um arquivo:
+    o resultado fica em cache pelo SHA-256 do conteúdo, não pelo nome.
+    Mude o sufixo de versão do namespace ao alterar o formato do resultado.
+    """
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(path, *args, **kwargs):
+            if args or kwargs or not CACHE_ENABLED:
+                return fn(path, *args, **kwargs)
+            return cache.get_or_compute(namespace, file_digest(path), lambda: fn(path))
+        wrapper.uncached = fn
+        return wrapper
+    return decorator
@@ -0,0 +1,182 @@
+# backend/checkpoint.py
+"""
+Checkpoints da geração de etiquetas (jobs): um lote que morre no meio
+(reinício do worker, OOM) continua de onde parou em vez de recomeçar.
+
+Cada combinação de entradas (SHA-256 do PDF e do Excel + layout) tem a sua
+pasta em CHECKPOINT_DIR/<chave>/:
+- part_00000.pdf, part_00001.pdf...: etiquetas prontas de um bloco de páginas
+  de origem, cada uma um PDF completo (já pode ser baixado e impresso)
+- manifest.json: páginas concluídas, partes, order_sn já consumidos e contadores
+
+A parte é gravada antes do manifesto, e os dois por arquivo temporário +
+os.replace: um processo morto no meio deixa no máximo uma parte órfã, que é
+refeita na retomada. Reenviar as mesmas entradas cai na mesma pasta.
+Quem grava segura checkpoint_lock (trava de arquivo .lock na pasta, vale entre
+processos): dois jobs com as mesmas entradas nunca escrevem a pasta ao mesmo tempo.
+
+Variáveis de ambiente:
+- LABEL_CHECKPOINT_DIR: pasta dos checkpoints (padrão backend/checkpoints)
+- LABEL_CHECKPOINT_PAGES: páginas de origem por parte (padrão 50 = até 200 etiquetas A4 2x2)
+"""
+import contextlib
+import hashlib
+import json
+import os
+import shutil
+import time
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+from .cache import file_digest
+
+CHECKPOINT_DIR = Path(os.getenv("LABEL_CHECKPOINT_DIR", Path(__file__).resolve().parent / "checkpoints"))
+CHECKPOINT_PAGES = int(os.getenv("LABEL_CHECKPOINT_PAGES", "50"))
+
+# muda quando o formato do manifesto ou das partes muda (checkpoints antigos são refeitos)
+MANIFEST_VERSION = 1
+
+
+def checkpoint_key(pdf_path, xlsx_path, layout: str) -> str:
+    """Chave da pasta de checkpoint: mesmas entradas (conteúdo) e layout = mesma chave."""
+    raw = f"v{MANIFEST_VERSION}-{file_digest(pdf_path)}-{file_digest(xlsx_path)}-{layout}"
+    return hashlib.sha256(raw.encode()).hexdigest()[:32]
+
+
+def atomic_write(path: Path, data: bytes):
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def _lock_file(f):
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        return
+    while True:
+        try:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+            return
+        except OSError:
+            time.sleep(0.5)
+
+
+def _unlock_file(f):
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    else:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+@contextlib.contextmanager
+def checkpoint_lock(key: str, root: Path = None):
+    """Trava exclusiva da pasta de um checkpoint, entre processos; espera quem estiver com ela."""
+    directory = Path(root or CHECKPOINT_DIR) / key
+    directory.mkdir(parents=True, exist_ok=True)
+    with open(directory / ".lock", "a+b") as f:
+        _lock_file(f)
+        try:
+            yield
+        finally:
+            _unlock_file(f)
+
+
+class Checkpoint:
+    """Estado gravado de uma geração; retomado se a pasta já tiver um manifesto da mesma chave."""
+
+    def __init__(self, key: str, root: Path = None):
+        self.key = key
+        self.directory = Path(root or CHECKPOINT_DIR) / key
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.manifest = self._load()
+
+    @property
+    def manifest_path(self) -> Path:
+        return self.directory / "manifest.json"
+
+    def _load(self) -> dict:
+        try:
+            manifest = json.loads(self.manifest_path.read_text(encoding="utf-8"))
+            if manifest.get("version") == MANIFEST_VERSION and manifest.get("key") == self.key:
+                return manifest
+        except (OSError, ValueError):
+            pass
+        return {
+            "version": MANIFEST_VERSION,
+            "key": self.key,
+            "pages_done": 0,
+            "complete": False,
+            "parts": [],      # [{"file", "pages": [início, fim), "labels"}]
+            "consumed": [],   # order_sn já atribuídos (pré-carregados no matcher ao retomar)
+            "labels_total": 0,
+            "labels_matched": 0,
+            "empty_slots": 0,
+        }
+
+    @property
+    def pages_done(self) -> int:
+        return self.manifest["pages_done"]
+
+    @property
+    def consumed(self):
+        return self.manifest["consumed"]
+
+    @property
+    def complete(self) -> bool:
+        return self.manifest["complete"]
+
+    def part_paths(self):
+        return [self.directory / part["file"] for part in self.manifest["parts"]]
+
+    def next_part_path(self) -> Path:
+        return self.directory / f"part_{len(self.manifest['parts']):05d}.pdf"
+
+    def add_part(self, start: int, stop: int, part_path: Path, labels: int, matched: int, empty_slots: int,
+                 consumed):
+        """Registra as páginas [start, stop) como concluídas (part_path=None: bloco sem etiquetas)."""
+        m = self.manifest
+        if part_path is not None:
+            m["parts"].append({"file": part_path.name, "pages": [start, stop], "labels": labels})
+        m["pages_done"] = stop
+        m["consumed"].extend(consumed)
+        m["labels_total"] += labels
+        m["labels_matched"] += matched
+        m["empty_slots"] += empty_slots
+        self.save()
+
+    def mark_complete(self):
+        self.manifest["complete"] = True
+        self.save()
+
+    def save(self):
+        atomic_write(self.manifest_path, json.dumps(self.manifest).encode("utf-8"))
+
+
+def read_manifest(key: str, root: Path = None):
+    """Manifesto de uma chave (sem criar a pasta), ou None."""
+    try:
+        return json.loads((Path(root or CHECKPOINT_DIR) / key / "manifest.json").read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+
+def purge_checkpoints(keep, root: Path = None) -> int:
+    """Apaga as pastas de checkpoint cujas chaves não estão em keep; devolve quantas saíram."""
+    root = Path(root or CHECKPOINT_DIR)
+    removed = 0
+    if root.exists():
+        for directory in root.iterdir():
+            if directory.is_dir() and directory.name not in keep:
+                shutil.rmtree(directory, ignore_errors=True)
+                removed += 1
+    return removed
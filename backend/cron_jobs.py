@@ -1,20 +1,206 @@
 # backend/cron_jobs.py
-from datetime import date
-from .database import SessionLocal
-from .models import User
+"""
+Manutenção periódica do banco, em operações de conjunto (um UPDATE por regra,
+sem carregar usuários no Python):
 
+- expire_plans: plano vencido (data_expira < hoje) volta para "free"
+- expire_pending_subscriptions: assinatura "pendente" há mais de
+  LABEL_PENDING_DAYS dias vira "expirada"; as antigas sem data_inicio ganham
+  a data de hoje e contam o prazo a partir daí
 
-def expire_plans():
+start_scheduler() roda as duas no próprio processo do app (APScheduler), a cada
+LABEL_CRON_INTERVAL_MIN minutos e logo ao subir; `python -m backend.cron_jobs`
+roda uma vez (cron externo, se preferir). Com vários workers do uvicorn (ou
+réplicas), todos agendam, mas só quem segura a trava de líder executa: advisory
+lock no Postgres, trava de arquivo (LABEL_CRON_LOCK) nos demais bancos. Se o
+líder cair, o próximo a tentar assume.
+
+Variáveis de ambiente:
+- LABEL_CRON: 0 desliga o agendador embutido
+- LABEL_CRON_INTERVAL_MIN: intervalo entre execuções (padrão 60)
+- LABEL_PENDING_DAYS: prazo de uma assinatura pendente (padrão 3)
+- LABEL_CRON_LOCK: arquivo da trava de líder fora do Postgres
+  (padrão: labelconvert-cron.lock na pasta temporária)
+"""
+import logging
+import os
+import tempfile
+import threading
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import select, update
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+from .database import SessionLocal, engine, ensure_schema
+from .models import User, Assinatura
+from .deps import invalidate_user
+
+logger = logging.getLogger(__name__)
+
+CRON_ENABLED = os.getenv("LABEL_CRON", "1") != "0"
+CRON_INTERVAL_MIN = float(os.getenv("LABEL_CRON_INTERVAL_MIN", "60"))
+PENDING_DAYS = int(os.getenv("LABEL_PENDING_DAYS", "3"))
+CRON_LOCK_FILE = os.getenv("LABEL_CRON_LOCK") or os.path.join(tempfile.gettempdir(), "labelconvert-cron.lock")
+CRON_LOCK_KEY = 0x4C43524F  # pg_try_advisory_lock: mesmo número em todos os processos
+
+# totais desde que o processo subiu (expostos em /metrics)
+stats = {"runs": 0, "errors": 0, "plans_expired": 0, "subscriptions_expired": 0, "last_run": None}
+_stats_lock = threading.Lock()
+
+_leader = None  # conexão (Postgres) ou arquivo aberto que segura a trava de líder
+
+
+def expire_plans(today: date = None) -> int:
+    """Volta para "free" todo plano vencido; devolve quantos usuários mudaram."""
+    today = today or date.today()
+    stmt = (
+        update(User)
+        .where(User.data_expira < today)
+        .values(plano="free", data_expira=None)
+        .execution_options(synchronize_session=False)
+    )
     db = SessionLocal()
-    today = date.today()
-    users = db.query(User).filter(User.data_expira != None).all()
-    for user in users:
-        if user.data_expira and user.data_expira < today:
-            user.plano = "free"
-            user.data_expira = None
-    db.commit()
-    db.close()
+    try:
+        if engine.dialect.update_returning:
+            expired = db.scalars(stmt.returning(User.email)).all()
+        else:
+            expired = db.scalars(select(User.email).where(User.data_expira < today)).all()
+            db.execute(stmt)
+        db.commit()
+    finally:
+        db.close()
+    # depois do commit: quem buscar de novo já lê o plano "free"
+    for email in expired:
+        invalidate_user(email)
+    return len(expired)
+
+
+def expire_pending_subscriptions(today: date = None) -> int:
+    """Encerra assinaturas "pendente" antigas (PIX nunca pago); devolve quantas mudaram."""
+    today = today or date.today()
+    cutoff = today - timedelta(days=PENDING_DAYS)
+    db = SessionLocal()
+    try:
+        # criadas antes de a data ser gravada: a idade é desconhecida (pode ser um PIX
+        # de ontem), então o prazo começa a contar agora em vez de expirar de cara
+        db.execute(
+            update(Assinatura)
+            .where(Assinatura.status == "pendente", Assinatura.data_inicio.is_(None))
+            .values(data_inicio=today)
+            .execution_options(synchronize_session=False)
+        )
+        result = db.execute(
+            update(Assinatura)
+            .where(Assinatura.status == "pendente", Assinatura.data_inicio < cutoff)
+            .values(status="expirada")
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+        return result.rowcount
+    finally:
+        db.close()
+
+
+def run_maintenance() -> dict:
+    """Roda todas as regras e registra quantas linhas cada uma alterou."""
+    try:
+        changed = {"plans_expired": expire_plans(), "subscriptions_expired": expire_pending_subscriptions()}
+    except Exception as e:
+        with _stats_lock:
+            stats["errors"] += 1
+        logger.warning("⚠️  Manutenção do banco falhou: %s", e)
+        raise
+    with _stats_lock:
+        stats["runs"] += 1
+        stats["last_run"] = datetime.utcnow().isoformat()
+        for key, count in changed.items():
+            stats[key] += count
+    logger.info("🗓️  Manutenção: %d plano(s) expirado(s), %d assinatura(s) pendente(s) encerrada(s)",
+                changed["plans_expired"], changed["subscriptions_expired"])
+    return changed
+
+
+# ------------------------------------------------------------------
+# Trava de líder (um executor entre workers/réplicas)
+# ------------------------------------------------------------------
+def _try_pg_lock():
+    conn = engine.connect()
+    try:
+        got = conn.exec_driver_sql(f"SELECT pg_try_advisory_lock({CRON_LOCK_KEY})").scalar()
+        conn.commit()  # a trava é da sessão; não deixa a conexão "idle in transaction"
+    except Exception:
+        conn.close()
+        raise
+    if not got:
+        conn.close()
+        return None
+    return conn
+
+
+def _try_file_lock():
+    f = open(CRON_LOCK_FILE, "a+b")
+    try:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+    except OSError:
+        f.close()
+        return None
+    return f
+
+
+def hold_leader_lock() -> bool:
+    """True se este processo é (ou acabou de virar) o executor da manutenção."""
+    global _leader
+    if _leader is not None and engine.dialect.name == "postgresql":
+        try:
+            _leader.exec_driver_sql("SELECT 1")
+            _leader.commit()
+        except Exception:  # conexão caiu: a trava foi junto, disputa de novo
+            _leader.invalidate()
+            _leader = None
+    if _leader is None:
+        _leader = _try_pg_lock() if engine.dialect.name == "postgresql" else _try_file_lock()
+        if _leader is not None:
+            logger.info("🗓️  Este processo (pid %d) assumiu a manutenção do banco", os.getpid())
+    return _leader is not None
+
+
+def run_if_leader():
+    """Tarefa agendada em todos os workers; só o líder roda a manutenção."""
+    if hold_leader_lock():
+        run_maintenance()
+
+
+def start_scheduler():
+    """
+    Agenda run_if_leader neste processo; devolve o scheduler (ou None se desligado).
+    Todo worker agenda, mas só o que segura a trava de líder executa.
+    """
+    if not CRON_ENABLED:
+        return None
+    from apscheduler.schedulers.background import BackgroundScheduler
+
+    # fuso explícito: o APScheduler 3.6 só aceita pytz, e o tzlocal novo devolve zoneinfo
+    scheduler = BackgroundScheduler(daemon=True, timezone="UTC")
+    scheduler.add_job(run_if_leader, "interval", minutes=CRON_INTERVAL_MIN, id="maintenance",
+                      next_run_time=datetime.utcnow(), coalesce=True, max_instances=1)
+    scheduler.start()
+    return scheduler
+
+
+def get_stats():
+    with _stats_lock:
+        return dict(stats)
 
 
 if __name__ == "__main__":
-    expire_plans()
+    ensure_schema()
+    print(run_maintenance())
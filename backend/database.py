@@ -1,16 +1,144 @@
 # backend/database.py
-from sqlalchemy import create_engine
+"""
+Engine e sessões do banco, configurados por variável de ambiente.
+
+- DATABASE_URL: padrão SQLite local (sqlite:///./labelconvert.db); no Railway,
+  postgres://... (aceito e convertido para postgresql://).
+- SQLite: WAL (leitores não esperam escritores), synchronous=NORMAL, mmap e
+  busy_timeout, aplicados em cada conexão nova.
+- Postgres: QueuePool com pre-ping (conexões derrubadas pelo servidor são
+  trocadas antes do uso) e reciclagem periódica.
+
+Sessões assíncronas (get_async_db) para as rotas async: com o driver instalado
+(aiosqlite / asyncpg, mais greenlet) usam AsyncSession de verdade; sem ele,
+ThreadedSession oferece a mesma interface rodando a Session síncrona no
+threadpool — nos dois casos o event loop não fica esperando o banco.
+"""
+import importlib.util
+import logging
+import os
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import create_engine, event, inspect
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.schema import CreateColumn
+
+logger = logging.getLogger(__name__)
+
+# Banco SQLite local por padrão — em produção, DATABASE_URL do Postgres
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./labelconvert.db")
+
+SQLITE_WAL = os.getenv("LABEL_SQLITE_WAL", "1") != "0"
+SQLITE_MMAP_MB = int(os.getenv("LABEL_SQLITE_MMAP_MB", "256"))
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("LABEL_SQLITE_BUSY_TIMEOUT_MS", "5000"))
+
+DB_POOL_SIZE = int(os.getenv("LABEL_DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("LABEL_DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = int(os.getenv("LABEL_DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("LABEL_DB_POOL_RECYCLE", "1800"))
+
+DB_ASYNC = os.getenv("LABEL_DB_ASYNC", "1") != "0"
+
+ASYNC_DRIVERS = {"sqlite": ("aiosqlite", "sqlite+aiosqlite"), "postgresql": ("asyncpg", "postgresql+asyncpg")}
+
+
+def normalize_url(url: str) -> str:
+    if url.startswith("postgres://"):
+        return "postgresql://" + url[len("postgres://"):]
+    return url
+
+
+def sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    if SQLITE_WAL:
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_MB * 1024 * 1024}")
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.close()
+
+
+def engine_options(url: str) -> dict:
+    if make_url(url).get_backend_name() == "sqlite":
+        return {"connect_args": {"check_same_thread": False, "timeout": SQLITE_BUSY_TIMEOUT_MS / 1000}}
+    return {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": True,
+    }
+
+
+def make_engine(url: str = DATABASE_URL):
+    url = normalize_url(url)
+    engine = create_engine(url, **engine_options(url))
+    if engine.dialect.name == "sqlite":
+        event.listen(engine, "connect", sqlite_pragmas)
+    return engine
+
+
+def async_url(url: str):
+    """URL com o driver async equivalente, ou None se ele (ou o greenlet) não estiver instalado."""
+    parsed = make_url(normalize_url(url))
+    driver = ASYNC_DRIVERS.get(parsed.get_backend_name())
+    if driver is None or importlib.util.find_spec("greenlet") is None or importlib.util.find_spec(driver[0]) is None:
+        return None
+    return parsed.set(drivername=driver[1])
+
 
-# Banco SQLite local — depois troque por PostgreSQL no Railway
-DATABASE_URL = "sqlite:///./labelconvert.db"
+def make_async_engine(url: str = DATABASE_URL):
+    """AsyncEngine com as mesmas opções do síncrono; None = usar ThreadedSession."""
+    target = async_url(url) if DB_ASYNC else None
+    if target is None:
+        return None
+    from sqlalchemy.ext.asyncio import create_async_engine
+    engine = create_async_engine(target, **engine_options(normalize_url(url)))
+    if engine.dialect.name == "sqlite":
+        event.listen(engine.sync_engine, "connect", sqlite_pragmas)
+    return engine
 
-engine = create_engine(
-    DATABASE_URL, connect_args={"check_same_thread": False}
-)
+
+engine = make_engine()
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+async_engine = make_async_engine()
+if async_engine is not None:
+    from sqlalchemy.ext.asyncio import async_sessionmaker
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+else:
+    AsyncSessionLocal = None
+
+# objetos continuam legíveis depois do commit sem voltar ao banco (igual ao AsyncSession)
+_ThreadedSessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
+
+
+def ensure_schema(bind=None):
+    """
+    Completa um banco já existente com o que os modelos ganharam depois
+    (create_all não mexe em tabelas prontas): colunas anuláveis e índices que faltam.
+    """
+    bind = bind or engine
+    inspector = inspect(bind)
+    existing_tables = set(inspector.get_table_names())
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        columns = {col["name"] for col in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in columns and column.nullable:
+                ddl = CreateColumn(column).compile(dialect=bind.dialect)
+                with bind.begin() as conn:
+                    conn.exec_driver_sql(f"ALTER TABLE {table.name} ADD COLUMN {ddl}")
+                logger.info("🗂️  Coluna criada: %s.%s", table.name, column.name)
+        indexes = {ix["name"] for ix in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in indexes:
+                index.create(bind=bind)
+                logger.info("🗂️  Índice criado: %s", index.name)
+
 
 def get_db():
     db = SessionLocal()
@@ -18,3 +146,48 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+class ThreadedSession:
+    """Subconjunto assíncrono da API do AsyncSession sobre uma Session síncrona no threadpool."""
+
+    def __init__(self, session):
+        self.sync_session = session
+
+    def add(self, instance):
+        self.sync_session.add(instance)
+
+    async def scalar(self, statement, *args, **kwargs):
+        return await run_in_threadpool(self.sync_session.scalar, statement, *args, **kwargs)
+
+    async def get(self, entity, ident):
+        return await run_in_threadpool(self.sync_session.get, entity, ident)
+
+    async def execute(self, statement, *args, **kwargs):
+        def run():
+            result = self.sync_session.execute(statement, *args, **kwargs)
+            # linhas já bufferizadas: ler o resultado depois não toca o banco no event loop
+            return result.freeze()() if result.returns_rows else result
+        return await run_in_threadpool(run)
+
+    async def commit(self):
+        await run_in_threadpool(self.sync_session.commit)
+
+    async def rollback(self):
+        await run_in_threadpool(self.sync_session.rollback)
+
+    async def close(self):
+        await run_in_threadpool(self.sync_session.close)
+
+
+async def get_async_db():
+    """Dependência das rotas async: AsyncSession (driver async instalado) ou ThreadedSession."""
+    if AsyncSessionLocal is not None:
+        async with AsyncSessionLocal() as db:
+            yield db
+        return
+    db = ThreadedSession(_ThreadedSessionLocal())
+    try:
+        yield db
+    finally:
+        await db.close()
@@ -1,14 +1,29 @@
 # backend/deps.py
-from fastapi import Request
+import os
+import threading
+import time
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+
+from fastapi import Depends, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
 from jose import jwt, JWTError
-from datetime import datetime, timedelta
 from sqlalchemy.orm import Session
-from .database import get_db
+from .database import SessionLocal, get_db
 from . import models
 
 SECRET_KEY = "troque-por-uma-chave-muito-secreta"
 ALGORITHM = "HS256"
 
+# cache em processo: token -> usuário (cada worker do uvicorn tem o seu;
+# a invalidação é local, o TTL limita quanto um dado pode ficar velho nos outros)
+AUTH_CACHE_TTL = float(os.getenv("LABEL_AUTH_CACHE_TTL", "30"))
+AUTH_CACHE_ITEMS = int(os.getenv("LABEL_AUTH_CACHE_ITEMS", "10000"))
+
+# administradores: e-mails que podem mexer em configuração compartilhada (ex.: impressoras)
+# e ver as rotas operacionais (/cache/stats, /auth/cache/stats, /workers/stats)
+ADMIN_EMAILS = {email.strip().lower() for email in os.getenv("LABEL_ADMIN_EMAILS", "").split(",") if email.strip()}
+
 
 def create_access_token(subject: str, hours_valid=12):
     expire = datetime.utcnow() + timedelta(hours=hours_valid)
@@ -16,19 +31,171 @@ def create_access_token(subject: str, hours_valid=12):
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 
+# ------------------------------
+# CACHE DE USUÁRIOS POR TOKEN
+# ------------------------------
+
+@dataclass(frozen=True)
+class UserSnapshot:
+    """Cópia dos campos do usuário usados pelas páginas (sem sessão do banco)."""
+    id: int
+    nome: str
+    email: str
+    plano: str
+    data_inicio: date
+    data_expira: date
+    ativo: bool
+
+    @classmethod
+    def from_model(cls, user: models.User):
+        return cls(user.id, user.nome, user.email, user.plano, user.data_inicio, user.data_expira, user.ativo)
+
+
+class UserCache:
+    def __init__(self, ttl: float, max_items: int):
+        self.ttl = ttl
+        self.max_items = max_items
+        self._entries = {}    # token -> (expira em, snapshot)
+        self._by_email = {}   # email -> {tokens}
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0}
+
+    def get(self, token: str):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry and entry[0] > now:
+                self._stats["hits"] += 1
+                return entry[1]
+            if entry:
+                self._drop(token)
+            self._stats["misses"] += 1
+            return None
+
+    def set(self, token: str, snapshot: UserSnapshot, token_exp: float = None):
+        if self.ttl <= 0:
+            return
+        expires = time.monotonic() + self.ttl
+        if token_exp is not None:
+            # nunca além da validade do próprio JWT
+            expires = min(expires, time.monotonic() + token_exp - time.time())
+        with self._lock:
+            if len(self._entries) >= self.max_items and token not in self._entries:
+                self._drop(next(iter(self._entries)))
+            self._entries[token] = (expires, snapshot)
+            self._by_email.setdefault(snapshot.email, set()).add(token)
+
+    def _drop(self, token: str):
+        _, snapshot = self._entries.pop(token)
+        tokens = self._by_email.get(snapshot.email)
+        if tokens:
+            tokens.discard(token)
+            if not tokens:
+                del self._by_email[snapshot.email]
+
+    def forget_token(self, token: str):
+        with self._lock:
+            if token in self._entries:
+                self._drop(token)
+
+    def invalidate(self, email: str):
+        """Descarta todos os tokens em cache de um usuário (troca de senha, de plano...)."""
+        with self._lock:
+            for token in list(self._by_email.get(email, ())):
+                self._drop(token)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_email.clear()
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "ttl": self.ttl, **self._stats}
+
+
+user_cache = UserCache(AUTH_CACHE_TTL, AUTH_CACHE_ITEMS)
+
+
+def invalidate_user(email: str):
+    user_cache.invalidate(email)
+
+
+# ------------------------------
+# USUÁRIO ATUAL
+# ------------------------------
+
+def decode_token(token: str):
+    try:
+        return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        return None
+
+
 def get_current_user_email(request: Request):
     token = request.cookies.get("auth_token")
     if not token:
         return None
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        return payload.get("sub")
-    except JWTError:
+    snapshot = user_cache.get(token)
+    if snapshot:
+        return snapshot.email
+    payload = decode_token(token)
+    return payload.get("sub") if payload else None
+
+
+def load_user(token: str, db: Session):
+    """Decodifica o token e busca o usuário no banco, guardando o resultado no cache."""
+    payload = decode_token(token)
+    if not payload or not payload.get("sub"):
         return None
+    user = db.query(models.User).filter(models.User.email == payload["sub"]).first()
+    if not user:
+        return None
+    snapshot = UserSnapshot.from_model(user)
+    user_cache.set(token, snapshot, payload.get("exp"))
+    return snapshot
 
 
 def get_current_user(request: Request, db: Session):
-    email = get_current_user_email(request)
-    if not email:
+    token = request.cookies.get("auth_token")
+    if not token:
         return None
-    return db.query(models.User).filter(models.User.email == email).first()
+    return user_cache.get(token) or load_user(token, db)
+
+
+def _load_user_own_session(token: str):
+    db = SessionLocal()
+    try:
+        return load_user(token, db)
+    finally:
+        db.close()
+
+
+def is_admin(user) -> bool:
+    return bool(user) and (user.email or "").lower() in ADMIN_EMAILS
+
+
+async def current_user(request: Request):
+    """
+    Dependência FastAPI: usuário do cookie (UserSnapshot) ou None.
+    Com o token em cache não abre sessão no banco nem decodifica o JWT.
+    """
+    token = request.cookies.get("auth_token")
+    if not token:
+        return None
+    snapshot = user_cache.get(token)
+    if snapshot:
+        return snapshot
+    return await run_in_threadpool(_load_user_own_session, token)
+
+
+def require_user(user=Depends(current_user)):
+    if not user:
+        raise HTTPException(status_code=401, detail="Usuário não autenticado")
+    return user
+
+
+def require_admin(user=Depends(require_user)):
+    if not is_admin(user):
+        raise HTTPException(status_code=403, detail="Apenas administradores")
+    return user
@@ -0,0 +1,446 @@
+# backend/jobs.py
+"""
+Jobs de geração de etiquetas em segundo plano.
+
+POST /jobs salva o PDF e o Excel em JOBS_DIR/<id>/ e devolve o id na hora;
+uma fila local (threads do próprio processo, sem broker) entrega cada job ao
+pool de workers — cada job ocupa uma vaga do pool (como as rotas), esperando
+uma livre em vez de receber 429. O worker grava o progresso na tabela jobs, consultada por
+GET /jobs/{id}; GET /jobs/{id}/result devolve o PDF quando o job termina.
+Jobs e arquivos expiram LABEL_JOB_TTL_HOURS depois de concluídos (expires_at só
+é preenchido no fim; job na fila ou rodando nunca é apagado). Os uploads são
+gravados numa pasta temporária e só ganham o nome do job (renomeados) antes do
+registro ser criado; a limpeza só apaga pastas sem registro com mais de
+LABEL_JOB_ORPHAN_MINUTES, para não pegar um upload em andamento.
+
+Com checkpoints (LABEL_JOB_CHECKPOINTS=1, padrão) o job grava as etiquetas em
+partes à medida que avança (ver checkpoint.py): um job interrompido volta para a
+fila e continua de onde parou, reenviar as mesmas entradas reaproveita o que já
+foi feito, e GET /jobs/{id}/parts/{n} entrega cada parte pronta antes de o job terminar.
+
+Vários processos (workers do uvicorn, deploy em rodízio) dividem a mesma tabela:
+- um job só roda depois de "pego" com UPDATE ... WHERE status='queued' (claim_job),
+  que grava o processo em worker — o mesmo job em duas filas roda uma vez só
+- cada processo renova heartbeat_at dos seus jobs a cada LABEL_JOB_HEARTBEAT_SECONDS;
+  só job "running" sem heartbeat há 4 intervalos (processo morto) é recuperado —
+  volta para a fila se tem checkpoint, falha se não tem
+- a pasta do checkpoint tem trava de arquivo (checkpoint.checkpoint_lock)
+"""
+import contextlib
+import logging
+import os
+import queue
+import shutil
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from fastapi import APIRouter, Depends, HTTPException, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, JSONResponse
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+
+from .checkpoint import CHECKPOINT_DIR, checkpoint_key, purge_checkpoints, read_manifest
+from .database import SessionLocal, get_db
+from .label_generator import LAYOUT
+from . import metrics, models, tasks
+from .scratch import save_upload
+from .workers import LABEL_WORKERS, PoolBusy, pool
+
+logger = logging.getLogger(__name__)
+
+JOBS_DIR = Path(os.getenv("LABEL_JOBS_DIR", Path(__file__).resolve().parent / "jobs"))
+JOB_TTL = timedelta(hours=float(os.getenv("LABEL_JOB_TTL_HOURS", "24")))
+JOB_CONCURRENCY = int(os.getenv("LABEL_JOB_CONCURRENCY", str(max(1, LABEL_WORKERS))))
+JOB_QUEUE_SIZE = int(os.getenv("LABEL_JOB_QUEUE_SIZE", "100"))
+PURGE_INTERVAL = float(os.getenv("LABEL_JOB_PURGE_MINUTES", "30")) * 60
+ORPHAN_GRACE = float(os.getenv("LABEL_JOB_ORPHAN_MINUTES", "60")) * 60
+FINISHED_STATUSES = ("done", "error")
+JOB_CHECKPOINTS = os.getenv("LABEL_JOB_CHECKPOINTS", "1") != "0"
+HEARTBEAT_INTERVAL = float(os.getenv("LABEL_JOB_HEARTBEAT_SECONDS", "15"))
+STALE_AFTER = timedelta(seconds=HEARTBEAT_INTERVAL * 4)
+
+# identifica este processo nos jobs que ele pegou (pid se repete entre máquinas/reinícios)
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+router = APIRouter()
+
+
+def job_paths(job_id: str):
+    """(pdf, xlsx, saída) de um job — tudo dentro de JOBS_DIR/<id>/."""
+    directory = JOBS_DIR / job_id
+    return directory / "entrada.pdf", directory / "pedidos.xlsx", directory / "etiquetas_final.pdf"
+
+
+def update_job(job_id: str, **fields):
+    db = SessionLocal()
+    try:
+        db.query(models.Job).filter(models.Job.id == job_id).update(fields)
+        db.commit()
+    finally:
+        db.close()
+
+
+def claim_job(job_id: str) -> bool:
+    """Pega o job para este processo se ele ainda estiver na fila; atômico entre processos."""
+    now = datetime.utcnow()
+    db = SessionLocal()
+    try:
+        claimed = (db.query(models.Job).filter(models.Job.id == job_id, models.Job.status == "queued")
+                   .update({"status": "running", "worker": WORKER_ID, "started_at": now, "heartbeat_at": now},
+                           synchronize_session=False))
+        db.commit()
+        return claimed == 1
+    finally:
+        db.close()
+
+
+def finish_job(job_id: str, **fields) -> bool:
+    """Grava o fim do job, se ele ainda for deste processo (não foi recuperado por outro)."""
+    db = SessionLocal()
+    try:
+        updated = (db.query(models.Job).filter(models.Job.id == job_id, models.Job.worker == WORKER_ID)
+                   .update(fields, synchronize_session=False))
+        db.commit()
+        return updated == 1
+    finally:
+        db.close()
+
+
+def job_checkpoint(job_id: str):
+    db = SessionLocal()
+    try:
+        return db.query(models.Job.checkpoint).filter(models.Job.id == job_id).scalar()
+    finally:
+        db.close()
+
+
+def purge_expired_jobs(now: datetime = None) -> int:
+    """
+    Apaga jobs concluídos e vencidos (registro + pasta) e pastas órfãs antigas
+    (mais de ORPHAN_GRACE sem registro); devolve quantos jobs saíram.
+    """
+    now = now or datetime.utcnow()
+    db = SessionLocal()
+    try:
+        expired = (db.query(models.Job)
+                   .filter(models.Job.status.in_(FINISHED_STATUSES), models.Job.expires_at < now).all())
+        for job in expired:
+            shutil.rmtree(JOBS_DIR / job.id, ignore_errors=True)
+            db.delete(job)
+        db.commit()
+        known = {job_id for (job_id,) in db.query(models.Job.id).all()}
+        # checkpoint vive enquanto algum job com essas entradas existir
+        checkpoints = {key for (key,) in db.query(models.Job.checkpoint).filter(models.Job.checkpoint != None).all()}
+    finally:
+        db.close()
+    purge_checkpoints(checkpoints)
+
+    if JOBS_DIR.exists():
+        cutoff = time.time() - ORPHAN_GRACE
+        for directory in JOBS_DIR.iterdir():
+            if directory.is_dir() and directory.name not in known and directory.stat().st_mtime < cutoff:
+                shutil.rmtree(directory, ignore_errors=True)
+    if expired:
+        logger.info("🧹 Jobs expirados removidos: %d", len(expired))
+    return len(expired)
+
+
+class JobQueue:
+    """Fila em memória: JOB_CONCURRENCY threads despacham jobs para o pool, um de cada vez."""
+
+    def __init__(self, concurrency: int, maxsize: int):
+        self.concurrency = concurrency
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._threads = []
+        self._stop = threading.Event()
+        # jobs com as mesmas entradas (mesmo checkpoint) rodam um de cada vez
+        self._checkpoint_locks = {}
+        self._locks_guard = threading.Lock()
+
+    def put(self, job_id: str):
+        """Enfileira; queue.Full se a fila estiver cheia."""
+        self._queue.put_nowait(job_id)
+
+    def qsize(self) -> int:
+        return self._queue.qsize()
+
+    def start(self):
+        if self._threads:
+            return
+        JOBS_DIR.mkdir(parents=True, exist_ok=True)
+        self._stop.clear()
+        self._recover()
+        for n in range(self.concurrency):
+            t = threading.Thread(target=self._loop, name=f"job-dispatch-{n}", daemon=True)
+            t.start()
+            self._threads.append(t)
+        for target, name in ((self._janitor, "job-janitor"), (self._heartbeat, "job-heartbeat")):
+            t = threading.Thread(target=target, name=name, daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def stop(self):
+        """
+        Não bloqueia: os despachantes saem depois do job atual. O que ficou na fila
+        continua "queued" no banco e volta com _recover ao subir de novo.
+        """
+        self._stop.set()
+        for _ in range(self.concurrency):
+            try:
+                self._queue.put_nowait(None)  # só acorda quem espera numa fila vazia
+            except queue.Full:
+                break
+        self._threads = []
+
+    def _recover(self, startup: bool = True):
+        """
+        Jobs "running" cujo processo morreu (sem heartbeat há STALE_AFTER) voltam para a
+        fila se têm checkpoint (continuam de onde pararam) e falham se não têm. Jobs
+        rodando em outro processo vivo não são tocados. Ao subir (startup), também
+        enfileira os que já estavam na fila — se outro processo os tiver, claim_job decide.
+        """
+        now = datetime.utcnow()
+        db = SessionLocal()
+        try:
+            stale = db.query(models.Job).filter(
+                models.Job.status == "running",
+                or_(models.Job.heartbeat_at == None, models.Job.heartbeat_at < now - STALE_AFTER),
+            )
+            resumed = [job_id for (job_id,) in stale.filter(models.Job.checkpoint != None)
+                       .with_entities(models.Job.id).all()]
+            if resumed:
+                stale.filter(models.Job.id.in_(resumed)).update(
+                    {"status": "queued", "stage": "queued", "worker": None}, synchronize_session=False)
+            failed = stale.filter(models.Job.checkpoint == None).update(
+                {"status": "error", "error": "Interrompido: processo do servidor parou",
+                 "finished_at": now, "expires_at": now + JOB_TTL},
+                synchronize_session=False,
+            )
+            db.commit()
+            if startup:
+                pending = [job_id for (job_id,) in db.query(models.Job.id).filter(models.Job.status == "queued")
+                           .order_by(models.Job.created_at).all()]
+            else:
+                pending = resumed
+        finally:
+            db.close()
+        if resumed or failed:
+            logger.warning("♻️  Jobs de processos parados: %d de volta à fila, %d com erro", len(resumed), failed)
+        for job_id in pending:
+            try:
+                self.put(job_id)
+            except queue.Full:
+                finished = datetime.utcnow()
+                update_job(job_id, status="error", error="Fila cheia após reinício",
+                           finished_at=finished, expires_at=finished + JOB_TTL)
+
+    def _loop(self):
+        while not self._stop.is_set():
+            job_id = self._queue.get()
+            if job_id is None or self._stop.is_set():
+                return
+            self._run(job_id)
+
+    def _checkpoint_lock(self, key: str):
+        with self._locks_guard:
+            return self._checkpoint_locks.setdefault(key, threading.Lock())
+
+    def _run(self, job_id: str):
+        pdf_path, xlsx_path, output_path = job_paths(job_id)
+        key = job_checkpoint(job_id)
+        lock = self._checkpoint_lock(key) if key else contextlib.nullcontext()
+        try:
+            with lock:
+                lease = self._acquire_lease()
+                if lease is None:
+                    return  # parando: o job segue "queued" no banco
+                try:
+                    if not claim_job(job_id):
+                        return  # outro processo já pegou (ou o job não está mais na fila)
+                    # os tempos das etapas do job viram uma observação por etapa em /metrics
+                    with metrics.collect() as collector:
+                        _, spans = pool.call(tasks.run_label_job, job_id, str(pdf_path), str(xlsx_path),
+                                             str(output_path), key)
+                        collector.merge(spans)
+                    collector.flush()
+                finally:
+                    lease.release()
+        except Exception as e:
+            logger.error("❌ Job %s falhou: %s", job_id, e)
+            finished = datetime.utcnow()
+            finish_job(job_id, status="error", error=str(e) or e.__class__.__name__,
+                       finished_at=finished, expires_at=finished + JOB_TTL)
+            return
+        finished = datetime.utcnow()
+        if finish_job(job_id, status="done", stage="done", finished_at=finished, expires_at=finished + JOB_TTL,
+                      bytes_written=output_path.stat().st_size):
+            logger.info("✅ Job %s concluído", job_id)
+        else:
+            logger.warning("⚠️  Job %s terminou aqui, mas foi recuperado por outro processo", job_id)
+
+    def _acquire_lease(self):
+        """Vaga no pool, contada junto com as requisições; espera (sem 429). None se parando."""
+        while not self._stop.is_set():
+            try:
+                return pool.acquire(timeout=1.0)
+            except PoolBusy:
+                continue
+        return None
+
+    def _heartbeat(self):
+        """Renova heartbeat_at dos jobs deste processo e recupera os de processos parados."""
+        while not self._stop.wait(HEARTBEAT_INTERVAL):
+            try:
+                db = SessionLocal()
+                try:
+                    (db.query(models.Job).filter(models.Job.worker == WORKER_ID, models.Job.status == "running")
+                     .update({"heartbeat_at": datetime.utcnow()}, synchronize_session=False))
+                    db.commit()
+                finally:
+                    db.close()
+                self._recover(startup=False)
+            except Exception as e:
+                logger.warning("⚠️  Heartbeat dos jobs falhou: %s", e)
+
+    def _janitor(self):
+        while not self._stop.is_set():
+            try:
+                purge_expired_jobs()
+            except Exception as e:
+                logger.warning("⚠️  Limpeza de jobs falhou: %s", e)
+            self._stop.wait(PURGE_INTERVAL)
+
+
+job_queue = JobQueue(JOB_CONCURRENCY, JOB_QUEUE_SIZE)
+
+
+def job_to_dict(job: models.Job) -> dict:
+    if job.status == "done":
+        fraction = 1.0
+    elif job.pages_total:
+        fraction = round(job.pages_cropped / job.pages_total, 3)
+    else:
+        fraction = 0.0
+    manifest = read_manifest(job.checkpoint) if job.checkpoint else None
+    return {
+        "id": job.id,
+        "status": job.status,
+        "stage": job.stage,
+        "progress": fraction,
+        "pages_total": job.pages_total,
+        "pages_cropped": job.pages_cropped,
+        "labels_total": job.labels_total,
+        "labels_matched": job.labels_matched,
+        "empty_slots": job.empty_slots or 0,
+        "bytes_written": job.bytes_written,
+        "error": job.error,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+        "expires_at": job.expires_at.isoformat() if job.expires_at else None,
+        "result_url": f"/jobs/{job.id}/result" if job.status == "done" else None,
+        "parts_ready": len(manifest["parts"]) if manifest else 0,
+        "parts_url": f"/jobs/{job.id}/parts" if job.checkpoint else None,
+    }
+
+
+def get_job_or_404(job_id: str, db: Session) -> models.Job:
+    job = db.query(models.Job).filter(models.Job.id == job_id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Job não encontrado (ou já expirado)")
+    return job
+
+
+# ------------------------------
+# ROTAS
+# ------------------------------
+@router.post("/jobs", status_code=202)
+async def create_job(pdf: UploadFile, xlsx: UploadFile, db: Session = Depends(get_db)):
+    job_id = uuid.uuid4().hex
+    pdf_path, xlsx_path, _ = job_paths(job_id)
+    # upload numa pasta temporária; a pasta do job só aparece completa (rename)
+    upload_dir = JOBS_DIR / f".upload-{job_id}"
+    upload_dir.mkdir(parents=True, exist_ok=True)
+    try:
+        await run_in_threadpool(save_upload, pdf, upload_dir / pdf_path.name)
+        await run_in_threadpool(save_upload, xlsx, upload_dir / xlsx_path.name)
+        key = await run_in_threadpool(checkpoint_key, upload_dir / pdf_path.name, upload_dir / xlsx_path.name,
+                                      LAYOUT) if JOB_CHECKPOINTS else None
+        os.replace(upload_dir, pdf_path.parent)
+    except BaseException:
+        shutil.rmtree(upload_dir, ignore_errors=True)
+        raise
+
+    job = models.Job(id=job_id, status="queued", stage="queued", created_at=datetime.utcnow(), checkpoint=key)
+    db.add(job)
+    db.commit()
+
+    try:
+        job_queue.put(job_id)
+    except queue.Full:
+        db.delete(job)
+        db.commit()
+        shutil.rmtree(pdf_path.parent, ignore_errors=True)
+        raise HTTPException(status_code=429, detail="Fila de jobs cheia, tente novamente em instantes",
+                            headers={"Retry-After": "30"})
+
+    logger.info("📥 Job %s na fila (%s + %s)", job_id, pdf.filename, xlsx.filename)
+    return JSONResponse(
+        {"id": job_id, "status": "queued", "queue_position": job_queue.qsize(), "status_url": f"/jobs/{job_id}"},
+        status_code=202,
+    )
+
+
+@router.get("/jobs/{job_id}")
+async def job_status(job_id: str, db: Session = Depends(get_db)):
+    return job_to_dict(get_job_or_404(job_id, db))
+
+
+@router.get("/jobs/{job_id}/result")
+async def job_result(job_id: str, db: Session = Depends(get_db)):
+    job = get_job_or_404(job_id, db)
+    if job.status != "done":
+        raise HTTPException(status_code=409, detail=f"Job ainda não concluído (status: {job.status})")
+    _, _, output_path = job_paths(job_id)
+    if not output_path.exists():
+        raise HTTPException(status_code=410, detail="Resultado expirado")
+    return FileResponse(output_path, media_type="application/pdf", filename="etiquetas_final.pdf")
+
+
+def job_parts(job: models.Job):
+    manifest = read_manifest(job.checkpoint) if job.checkpoint else None
+    if manifest is None:
+        raise HTTPException(status_code=404, detail="Job sem checkpoint (ou ainda não começou)")
+    return manifest
+
+
+@router.get("/jobs/{job_id}/parts")
+async def job_parts_list(job_id: str, db: Session = Depends(get_db)):
+    """Partes já prontas do job, na ordem da saída final — podem ser baixadas antes de o job terminar."""
+    job = get_job_or_404(job_id, db)
+    manifest = job_parts(job)
+    return {
+        "id": job.id,
+        "status": job.status,
+        "complete": manifest["complete"],
+        "parts": [
+            {"index": i, "pages": part["pages"], "labels": part["labels"], "url": f"/jobs/{job.id}/parts/{i}"}
+            for i, part in enumerate(manifest["parts"])
+        ],
+    }
+
+
+@router.get("/jobs/{job_id}/parts/{index}")
+async def job_part(job_id: str, index: int, db: Session = Depends(get_db)):
+    job = get_job_or_404(job_id, db)
+    parts = job_parts(job)["parts"]
+    if not 0 <= index < len(parts):
+        raise HTTPException(status_code=404, detail="Parte ainda não pronta")
+    part_path = CHECKPOINT_DIR / job.checkpoint / parts[index]["file"]
+    if not part_path.exists():
+        raise HTTPException(status_code=410, detail="Parte expirada")
+    return FileResponse(part_path, media_type="application/pdf", filename=f"etiquetas_parte_{index + 1:03d}.pdf")
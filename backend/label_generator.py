@@ -1,5 +1,11 @@
 # label_generator.py — fallback agora não atribui dados (deixa em branco)
 
+import logging
+import math
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
 import fitz
 from PyPDF2 import PdfReader, PdfWriter
 from reportlab.pdfgen import canvas
@@ -7,50 +13,108 @@ from reportlab.lib.pagesizes import mm
 from reportlab.lib.colors import black, white
 from io import BytesIO
 from pathlib import Path
-from .label_matcher import match_pdf_with_excel, extract_products_from_excel
+from .cache import cache, file_digest
+from .checkpoint import CHECKPOINT_PAGES
+from .label_matcher import OrderMatcher, extract_orders_from_page, extract_orders_sequence_from_doc, extract_products_from_excel
+from . import workers as worker_pool
+from .workers import page_ranges
+from .layouts import detect_layout, get_layout, iter_page_slots, page_content_boxes, page_rects, slot_is_empty
+from .metrics import merge_spans, run_traced, setup_logging, span
 
+logger = logging.getLogger(__name__)
 
-DEBUG = True
+# uma linha por recorte ([FOUND BY TEXT], [FALLBACK-EMPTY], [MAP]) e a sequência
+# de fallback de referência só com o logger em DEBUG (LABEL_LOG_LEVEL=DEBUG)
 
+# "fitz" monta o PDF final direto num único documento PyMuPDF;
+# "pypdf2" mantém o fluxo antigo (reportlab + PyPDF2) para comparar saídas
+PDF_ENGINE = os.getenv("LABEL_PDF_ENGINE", "fitz")
+
+# modo paralelo: páginas divididas entre N processos (0/1 = sequencial);
+# só compensa a partir de PARALLEL_MIN_PAGES páginas. Os processos sobem uma vez
+# e ficam para as próximas chamadas. Dentro de um worker do pool (LABEL_WORKERS > 0)
+# o modo paralelo é ignorado — seriam LABEL_WORKERS x N processos; no servidor,
+# use LABEL_WORKERS=0 para ligá-lo.
+PARALLEL_WORKERS = int(os.getenv("LABEL_PARALLEL_WORKERS", "0"))
+PARALLEL_MIN_PAGES = int(os.getenv("LABEL_PARALLEL_MIN_PAGES", "25"))
+
+# o PDF final é montado em blocos de OUTPUT_CHUNK_PAGES páginas e juntado no fim:
+# new_page/insert_font do PyMuPDF ficam mais lentos conforme o documento cresce
+# (quadrático acima de alguns milhares de etiquetas). Cada bloco embute a fonte
+# do overlay uma vez (~34 KB). 0 = um documento só (comportamento anterior).
+OUTPUT_CHUNK_PAGES = int(os.getenv("LABEL_OUTPUT_CHUNK_PAGES", "500"))
+
+# lote (generate_batch_pdf): máximo de arquivos de cada tipo por chamada e
+# ordens aceitas para a saída ("none" = ordem dos PDFs, "sku" = agrupado por SKU)
+BATCH_MAX_FILES = int(os.getenv("LABEL_BATCH_MAX_FILES", "20"))
+BATCH_SORTS = ("none", "sku")
+
+# layout das páginas de origem: "auto" detecta por página (ver layouts.py) ou nome fixo
+LAYOUT = os.getenv("LABEL_LAYOUT", "auto")
+
+LABEL_WIDTH = 100 * mm
+LABEL_HEIGHT = 150 * mm
+OVERLAY_HEIGHT = 10 * mm
+
+# Helvetica-Bold embutida: a base-14 do PyMuPDF não tem o travessão "—"
+OVERLAY_FONT = fitz.Font("hebo")
 
-def crop_page_into_4_bytes(pdf_path: Path):
-    import io
-    doc = fitz.open(pdf_path)
-    pages_bytes = []
 
+def page_quadrants(page):
+    """Os 4 recortes (fitz.Rect) de uma página A4 2x2, na ordem do layout "a4_2x2"."""
+    return list(page_rects(page, "a4_2x2"))
+
+
+def iter_crops(doc, layout: str = None):
+    """Percorre o documento já aberto gerando (page, rect) de cada etiqueta (recortes vazios ficam de fora)."""
     for page in doc:
-        rect = page.rect
-        half_w = rect.width / 2
-        half_h = rect.height / 2
-
-        # ordem dos quadrantes (ajuste se necessário para seu layout)
-        quadrants = [
-            fitz.Rect(0, half_h, half_w, rect.height),            # top-left
-            fitz.Rect(half_w, half_h, rect.width, rect.height),   # top-right
-            fitz.Rect(0, 0, half_w, half_h),                      # bottom-left
-            fitz.Rect(half_w, 0, rect.width, half_h),             # bottom-right
-        ]
-
-        for q in quadrants:
-            buf = io.BytesIO()
-            single_doc = fitz.open()
-            single_page = single_doc.new_page(width=q.width, height=q.height)
-            single_page.show_pdf_page(fitz.Rect(0, 0, q.width, q.height), doc, page.number, clip=q)
-            single_doc.save(buf)
-            single_doc.close()
-            pages_bytes.append(buf.getvalue())
+        for _, q in iter_page_slots(page, layout or LAYOUT, skip_empty=True):
+            yield page, q
+
+
+def analyse_page(page, layout: str):
+    """
+    [(page_number, (x0, y0, x1, y1), texto em maiúsculas, nome do layout)] dos recortes da página.
+    Recorte vazio (sem texto, imagem nem vetor; ver layouts.slot_is_empty) vem com texto None.
+    """
+    with span("crop"):
+        chosen = detect_layout(page) if layout == "auto" else get_layout(layout)
+        boxes = page_content_boxes(page)
+        rects = [(q, slot_is_empty(q, boxes, page)) for q in page_rects(page, chosen)]
+    crops = []
+    with span("text_extract"):
+        for q, empty in rects:
+            text = None if empty else page.get_text("text", clip=q).upper()
+            crops.append((page.number, tuple(q), text, chosen.name))
+    return crops
+
+
+def analyse_crops(doc, progress=None, layout: str = None):
+    """Texto de cada recorte do documento (ver analyse_page)."""
+    crops_info = []
+    for page in doc:
+        crops_info.extend(analyse_page(page, layout or LAYOUT))
+        if progress:
+            progress(pages_cropped=page.number + 1)
+    return crops_info
 
-    doc.close()
-    return pages_bytes
 
+def crop_to_bytes(doc, page_number: int, q):
+    """Serializa um único recorte do documento aberto em um PDF de 1 página."""
+    buf = BytesIO()
+    single_doc = fitz.open()
+    single_page = single_doc.new_page(width=q.width, height=q.height)
+    single_page.show_pdf_page(fitz.Rect(0, 0, q.width, q.height), doc, page_number, clip=q)
+    single_doc.save(buf)
+    single_doc.close()
+    return buf.getvalue()
 
-def text_of_pdf_bytes(pdf_bytes: bytes):
-    doc = fitz.open(stream=pdf_bytes, filetype="pdf")
-    texts = []
-    for p in doc:
-        texts.append(p.get_text("text"))
+
+def crop_page_into_4_bytes(pdf_path: Path):
+    doc = fitz.open(pdf_path)
+    pages_bytes = [crop_to_bytes(doc, page.number, q) for page, q in iter_crops(doc)]
     doc.close()
-    return "\n".join(texts).strip()
+    return pages_bytes
 
 
 def make_overlay_bytes(product_name: str, quantity: str, width_pts, height_pts):
@@ -68,9 +132,13 @@ def make_overlay_bytes(product_name: str, quantity: str, width_pts, height_pts):
     return buffer.getvalue()
 
 
-def scale_and_merge_bytes(base_pdf_bytes: bytes, overlay_pdf_bytes: bytes, width_pts, height_pts):
+def scale_and_merge_bytes(base_pdf_bytes: bytes, overlay_pdf_bytes: bytes, width_pts, height_pts, readers=None):
     base_reader = PdfReader(BytesIO(base_pdf_bytes))
     overlay_reader = PdfReader(BytesIO(overlay_pdf_bytes))
+    # o PdfWriter identifica leitores por id(); mantê-los vivos até o write
+    # evita que um id reaproveitado troque o conteúdo de páginas
+    if readers is not None:
+        readers.extend((base_reader, overlay_reader))
     base_page = base_reader.pages[0]
     overlay_page = overlay_reader.pages[0]
 
@@ -84,90 +152,515 @@ def scale_and_merge_bytes(base_pdf_bytes: bytes, overlay_pdf_bytes: bytes, width
     return base_page
 
 
-def generate_combined_pdf(pdf_path: Path, xlsx_path: Path, output_path: Path):
+def place_crop(out_page, doc, page_number: int, q):
+    """Desenha o recorte q da página de origem na página de saída (fluxo fitz)."""
+    # mesma geometria do fluxo PyPDF2: recorte em tamanho natural,
+    # ancorado no canto inferior esquerdo da etiqueta 100x150 mm
+    height = out_page.rect.height
+    out_page.show_pdf_page(fitz.Rect(0, height - q.height, q.width, height), doc, page_number, clip=q)
+
+
+def draw_overlay(out_page, product_name: str, quantity: str):
+    """Faixa branca inferior com produto e quantidade (equivalente ao make_overlay_bytes)."""
+    width, height = out_page.rect.width, out_page.rect.height
+    name = (product_name or "")[:80]
+    if name:
+        out_page.insert_font(fontname="etiq", fontbuffer=OVERLAY_FONT.buffer)
+
+    # um único shape = um único append no content stream da página
+    shape = out_page.new_shape()
+    shape.draw_rect(fitz.Rect(0, height - OVERLAY_HEIGHT, width, height))
+    shape.finish(color=None, fill=(1, 1, 1))
+    if name:
+        shape.insert_text((4 * mm, height - 3 * mm), f"{name} — QTD: {quantity}",
+                          fontname="etiq", fontsize=10, color=(0, 0, 0))
+    shape.commit()
+
+
+def write_output_fitz(doc, crops, assignments, output_path, chunk_pages: int = None):
+    """Etiquetas de um único documento: crops[i] = (página, recorte) (ver write_labels_fitz)."""
+    write_labels_fitz([(doc, page_number, q) for page_number, q in crops], assignments, output_path, chunk_pages)
+
+
+def write_labels_fitz(sources, assignments, output_path, chunk_pages: int = None):
+    """
+    Escreve todas as etiquetas em documentos fitz de até chunk_pages páginas
+    (OUTPUT_CHUNK_PAGES; 0 = documento único) e junta os blocos num único PDF,
+    sem serializações intermediárias.
+    sources[i] = (documento de origem, página, recorte) da etiqueta i — o lote
+    (generate_batch_pdf) mistura recortes de vários PDFs na mesma saída.
+    """
+    chunk_pages = OUTPUT_CHUNK_PAGES if chunk_pages is None else chunk_pages
+    chunk_pages = chunk_pages if chunk_pages > 0 else max(1, len(assignments))
+    out = fitz.open()
+    for start in range(0, len(assignments), chunk_pages):
+        # com um bloco só, escreve direto na saída (sem o insert_pdf)
+        part = out if chunk_pages >= len(assignments) else fitz.open()
+        for a in assignments[start:start + chunk_pages]:
+            doc, page_number, q = sources[a["index"]]
+            out_page = part.new_page(width=LABEL_WIDTH, height=LABEL_HEIGHT)
+            with span("merge"):
+                place_crop(out_page, doc, page_number, q)
+            with span("overlay"):
+                draw_overlay(out_page, a["product_name"], a["quantity"])
+        if part is not out:
+            with span("merge"):
+                out.insert_pdf(part)
+            part.close()
+    with span("write"):
+        out.save(output_path, garbage=1, deflate=True)
+    out.close()
+
+
+def render_shard(pdf_path: str, start: int, stop: int, with_orders: bool = False, layout: str = None):
+    """
+    Executado num processo do modo paralelo: abre o PDF pelo caminho e, para as
+    páginas [start, stop), devolve (crops_info, orders, fragmento). O fragmento é
+    um PDF (bytes) com uma página 100x150 por recorte, já posicionado e sem overlay.
+    """
+    with span("pdf_open"):
+        doc = fitz.open(pdf_path)
+    fragment = fitz.open()
+    crops_info, orders = [], []
+    try:
+        for page in doc.pages(start, stop):
+            if with_orders:
+                with span("fallback_scan"):
+                    orders.extend(extract_orders_from_page(page))
+            page_crops = analyse_page(page, layout or LAYOUT)
+            for _, rect, text, _ in page_crops:
+                if text is None:
+                    continue
+                with span("merge"):
+                    place_crop(fragment.new_page(width=LABEL_WIDTH, height=LABEL_HEIGHT), doc, page.number, fitz.Rect(rect))
+            crops_info.extend(page_crops)
+        with span("write"):
+            return crops_info, orders, fragment.tobytes(garbage=1)
+    finally:
+        fragment.close()
+        doc.close()
+
+
+_parallel_executor = None
+_parallel_lock = threading.Lock()
+
+
+def parallel_executor(workers: int) -> ProcessPoolExecutor:
+    """Processos do modo paralelo, criados na primeira chamada e reaproveitados (recriados se workers mudar)."""
+    global _parallel_executor
+    with _parallel_lock:
+        if _parallel_executor is not None and _parallel_executor._max_workers != workers:
+            _parallel_executor.shutdown(wait=True)
+            _parallel_executor = None
+        if _parallel_executor is None:
+            _parallel_executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                                                     initializer=setup_logging)
+        return _parallel_executor
+
+
+def shutdown_parallel():
+    global _parallel_executor
+    with _parallel_lock:
+        executor, _parallel_executor = _parallel_executor, None
+    if executor is not None:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def analyse_parallel(pdf_path: Path, page_count: int, workers: int, with_orders: bool, progress=None,
+                     layout: str = None):
+    """
+    Divide as páginas em faixas contíguas (2 por worker, para balancear) e junta
+    os resultados na ordem das páginas: (crops_info, orders, [fragmentos]).
+    Os spans medidos nos processos entram nas métricas de quem chamou.
+    """
+    ranges = page_ranges(page_count, math.ceil(page_count / (workers * 2)))
+    crops_info, orders, fragments = [], [], []
+    executor = parallel_executor(workers)
+    futures = [executor.submit(run_traced, render_shard, str(pdf_path), start, stop, with_orders, layout)
+               for start, stop in ranges]
+    try:
+        for future in futures:
+            (shard_crops, shard_orders, fragment), spans = future.result()
+            merge_spans(spans)
+            crops_info.extend(shard_crops)
+            orders.extend(shard_orders)
+            fragments.append(fragment)
+            if progress:
+                progress(pages_cropped=shard_crops[-1][0] + 1 if shard_crops else 0)
+    finally:
+        for future in futures:
+            future.cancel()
+    return crops_info, orders, fragments
+
+
+def write_output_fragments(fragments, assignments, output_path):
+    """Junta os fragmentos dos workers (um recorte por página) e aplica os overlays."""
+    out = fitz.open()
+    with span("merge"):
+        for fragment in fragments:
+            with fitz.open("pdf", fragment) as part:
+                out.insert_pdf(part)
+    with span("overlay"):
+        for a in assignments:
+            draw_overlay(out[a["index"]], a["product_name"], a["quantity"])
+    with span("write"):
+        if len(assignments) != out.page_count:
+            out.select([a["index"] for a in assignments])
+        out.save(output_path, garbage=1, deflate=True)
+    out.close()
+
+
+def write_output_pypdf2(doc, crops, assignments, output_path):
+    """Fluxo antigo: crop serializado + overlay reportlab + merge PyPDF2."""
+    writer = PdfWriter()
+    readers = []
+    for a in assignments:
+        page_number, q = crops[a["index"]]
+        with span("overlay"):
+            overlay_bytes = make_overlay_bytes(a["product_name"], a["quantity"], LABEL_WIDTH, LABEL_HEIGHT)
+        with span("merge"):
+            page_obj = scale_and_merge_bytes(crop_to_bytes(doc, page_number, q), overlay_bytes,
+                                             LABEL_WIDTH, LABEL_HEIGHT, readers)
+        writer.add_page(page_obj)
+
+    with span("write"):
+        if hasattr(output_path, "write"):
+            writer.write(output_path)
+            return
+        with open(output_path, "wb") as f:
+            writer.write(f)
+
+
+def match_crop(matcher, products_dict, index: int, crop_text: str):
+    """
+    Atribuição de um recorte: produto e quantidade do order_sn achado no texto
+    (o matcher consome o order_sn, evitando duplicatas) ou, sem pedido, em branco —
+    NÃO usar fallback para preencher.
+    """
+    found_sn = matcher.match(crop_text)
+    if found_sn:
+        product = products_dict.get(found_sn, {})
+        return {"index": index, "order_sn": found_sn, "product_name": product.get("product", "❌ Nome não encontrado"),
+                "quantity": product.get("quantity", "?"), "source": "crop_text"}
+    return {"index": index, "order_sn": None, "product_name": "", "quantity": "", "source": "fallback-empty"}
+
+
+def output_size(output_path) -> int:
+    """Bytes gravados em output_path (caminho ou objeto de arquivo), com o log de conclusão."""
+    if hasattr(output_path, "write"):
+        size = output_path.tell()
+        logger.info("🎉 PDF gerado em memória: %d bytes", size)
+    else:
+        size = Path(output_path).stat().st_size
+        logger.info("🎉 Arquivo gerado: %s", output_path)
+    return size
+
+
+def generate_combined_pdf(pdf_path: Path, xlsx_path: Path, output_path, engine: str = None, workers: int = None,
+                          progress=None, layout: str = None):
     """
     Novo fluxo:
     - lẽ Excel (dict)
-    - obtém fallback sequence (match_pdf_with_excel) apenas como referência
+    - abre o PDF uma única vez (texto de cada crop via get_text(clip=...))
+    - obtém fallback sequence apenas como referência (somente com o log em DEBUG)
     - corta PDF em crops
     - para cada crop tenta encontrar order_sn no texto do crop (melhor)
       -> se encontrar: atribui produto (e remove do pool remaining)
       -> se não encontrar: NÃO atribui nada (fallback = vazio), e NÃO consome ordem
-    - escreve PDF final
-    """
-    print("\n🧩 Lendo produtos do Excel...")
-    products_dict = extract_products_from_excel(xlsx_path)
-    print(f"📦 Produtos no Excel: {len(products_dict)}")
-
-    print("🧩 Obtendo sequência de fallback (somente referência)...")
-    fallback_matches = match_pdf_with_excel(pdf_path, xlsx_path)
-    fallback_order_sn_list = [m["order_sn"] for m in fallback_matches if m.get("order_sn")]
-
-    print("📦 Recortando PDF (em memória)...")
-    cropped_bytes = crop_page_into_4_bytes(pdf_path)
-    print(f"✂️  Total de cortes: {len(cropped_bytes)}")
-
-    remaining_order_sns = set(products_dict.keys())
-    assignments = []
-
-    # 1) buscar por texto do crop (detecção robusta)
-    for i, cb in enumerate(cropped_bytes):
-        crop_text = text_of_pdf_bytes(cb).upper() if cb else ""
-        found_sn = None
-
-        # procurar dentro dos remaining_order_sns para evitar duplicatas
-        for sn in list(remaining_order_sns):
-            if sn and sn.upper() in crop_text:
-                found_sn = sn
-                break
-
-        if found_sn:
-            product_name = products_dict.get(found_sn, {}).get("product", "❌ Nome não encontrado")
-            quantity = products_dict.get(found_sn, {}).get("quantity", "?")
-            assignments.append({"index": i, "order_sn": found_sn, "product_name": product_name, "quantity": quantity, "source": "crop_text"})
-            remaining_order_sns.remove(found_sn)
-            if DEBUG:
-                print(f"[FOUND BY TEXT] crop={i} -> {found_sn} | {product_name} | q={quantity}")
-            continue
-
-        # NÃO USAR fallback para preencher: mark as no match (leave blank)
-        assignments.append({"index": i, "order_sn": None, "product_name": "", "quantity": "", "source": "fallback-empty"})
-        if DEBUG:
-            # mostrar qual seria o fallback (apenas informativo), mas não usar/consumir
-            fb_sn = fallback_order_sn_list[i] if i < len(fallback_order_sn_list) else None
-            print(f"[FALLBACK-EMPTY] crop={i} -> would-be {fb_sn} (not assigned)")
-
-    # relatório resumido
-    found_by_text = sum(1 for a in assignments if a["source"] == "crop_text")
-    empty_fallbacks = sum(1 for a in assignments if a["source"] == "fallback-empty")
-    print(f"\n🔎 Resumo: found_by_text={found_by_text}, fallback_empty={empty_fallbacks}")
-
-    # montar PDF final
-    writer = PdfWriter()
-    width_pts = 100 * mm
-    height_pts = 150 * mm
+    - escreve PDF final (engine "fitz" por padrão; "pypdf2" = fluxo antigo)
+      em output_path: caminho ou objeto de arquivo gravável (ex.: BytesIO)
 
-    for a in assignments:
-        idx = a["index"]
-        product_name = a["product_name"]
-        quantity = a["quantity"]
-        if DEBUG:
-            print(f"[MAP] crop={idx} -> order_sn={a['order_sn']} | product='{(product_name or '')[:40]}' | q={quantity} | src={a['source']}")
-        overlay_bytes = make_overlay_bytes(product_name, quantity, width_pts, height_pts)
-        page_obj = scale_and_merge_bytes(cropped_bytes[idx], overlay_bytes, width_pts, height_pts)
-        writer.add_page(page_obj)
+    workers > 1 (ou LABEL_PARALLEL_WORKERS) liga o modo paralelo na engine fitz:
+    texto e posicionamento dos recortes saem de processos separados, e a
+    atribuição dos pedidos continua aqui, na ordem dos crops — saída idêntica.
+    Ignorado (sequencial) dentro de um worker do pool de workers.py.
+
+    layout: "auto" (padrão, LABEL_LAYOUT) detecta o layout de cada página; ou o nome de um layout de layouts.py.
+
+    progress (opcional) é chamado com contadores nomeados à medida que o lote
+    avança: stage, pages_total, pages_cropped, labels_total, labels_matched, bytes_written.
+    O tempo de cada etapa é medido com metrics.span (ver /metrics).
+    """
+    report = progress or (lambda **fields: None)
+    engine = engine or PDF_ENGINE
+    if engine not in ("fitz", "pypdf2"):
+        raise ValueError(f"engine inválida: {engine}")
+    workers = PARALLEL_WORKERS if workers is None else workers
+    if workers > 1 and worker_pool.IN_POOL_WORKER:
+        logger.debug("📦 Modo paralelo ignorado dentro do pool de workers (use LABEL_WORKERS=0)")
+        workers = 0
+    layout = layout or LAYOUT
+    if layout != "auto":
+        get_layout(layout)  # ValueError se não existir
+
+    debug = logger.isEnabledFor(logging.DEBUG)
+
+    logger.info("🧩 Lendo produtos do Excel...")
+    with span("excel_parse"):
+        products_dict = extract_products_from_excel(xlsx_path)
+    logger.info("📦 Produtos no Excel: %d", len(products_dict))
+
+    # o PDF é aberto uma única vez; texto e recortes saem do mesmo documento
+    with span("pdf_open"):
+        doc = fitz.open(pdf_path)
+    try:
+        report(stage="cropping", pages_total=doc.page_count, pages_cropped=0)
+        # reenvio do mesmo PDF reaproveita a análise (cache por SHA-256 do conteúdo)
+        pdf_digest = file_digest(pdf_path)
+
+        fragments = None
+        parallel = engine == "fitz" and workers > 1 and doc.page_count >= PARALLEL_MIN_PAGES
+        if parallel:
+            logger.info("📦 Recortando PDF em %d processos (%d páginas)...", workers, doc.page_count)
+            crops_info, orders, fragments = analyse_parallel(pdf_path, doc.page_count, workers, with_orders=debug,
+                                                             progress=report, layout=layout)
+            cache.set("crops-v5", f"{pdf_digest}-{layout}", crops_info)
+            if debug:
+                cache.set("orders-v1", pdf_digest, orders)
+
+        fallback_order_sn_list = []
+        if debug:
+            logger.debug("🧩 Obtendo sequência de fallback (somente referência)...")
+            if not parallel:
+                with span("fallback_scan"):
+                    orders = cache.get_or_compute("orders-v1", pdf_digest, lambda: extract_orders_sequence_from_doc(doc))
+            fallback_order_sn_list = [sn for sn in orders if sn]
+
+        if not parallel:
+            logger.info("📦 Recortando PDF (em memória)...")
+            crops_info = cache.get_or_compute("crops-v5", f"{pdf_digest}-{layout}",
+                                              lambda: analyse_crops(doc, report, layout))
+        empty_slots = sum(1 for _, _, text, _ in crops_info if text is None)
+        report(stage="matching", pages_cropped=doc.page_count, labels_total=len(crops_info) - empty_slots,
+               empty_slots=empty_slots)
+        matcher = OrderMatcher(products_dict)
+        assignments = []
+        crops = []
+
+        # 1) buscar por texto do crop (detecção robusta)
+        with span("match"):
+            for page_number, rect, crop_text, _ in crops_info:
+                if crop_text is None:
+                    continue  # recorte vazio: nem texto, nem overlay, nem página na saída
+                i = len(crops)
+                crops.append((page_number, fitz.Rect(rect)))
+                a = match_crop(matcher, products_dict, i, crop_text)
+                assignments.append(a)
+                if debug and a["order_sn"]:
+                    logger.debug("[FOUND BY TEXT] crop=%d -> %s | %s | q=%s", i, a["order_sn"], a["product_name"], a["quantity"])
+                elif debug:
+                    # mostrar qual seria o fallback (apenas informativo), mas não usar/consumir
+                    fb_sn = fallback_order_sn_list[i] if i < len(fallback_order_sn_list) else None
+                    logger.debug("[FALLBACK-EMPTY] crop=%d -> would-be %s (not assigned)", i, fb_sn)
+
+        logger.info("✂️  Total de cortes: %d (vazios ignorados: %d)", len(crops), empty_slots)
+        layout_pages = {}
+        for page_number, _, _, layout_name in crops_info:
+            layout_pages.setdefault(layout_name, set()).add(page_number)
+        logger.info("📐 Layouts: %s", ", ".join(f"{name}={len(pages)} pág." for name, pages in layout_pages.items()))
+
+        # relatório resumido
+        found_by_text = sum(1 for a in assignments if a["source"] == "crop_text")
+        empty_fallbacks = sum(1 for a in assignments if a["source"] == "fallback-empty")
+        logger.info("🔎 Resumo: found_by_text=%d, fallback_empty=%d, empty_slots=%d",
+                    found_by_text, empty_fallbacks, empty_slots)
+        report(stage="writing", labels_matched=found_by_text)
+
+        if debug:
+            for a in assignments:
+                logger.debug("[MAP] crop=%d -> order_sn=%s | product='%s' | q=%s | src=%s",
+                             a["index"], a["order_sn"], (a["product_name"] or "")[:40], a["quantity"], a["source"])
+
+        # montar PDF final
+        if engine == "pypdf2":
+            write_output_pypdf2(doc, crops, assignments, output_path)
+        elif fragments is not None:
+            write_output_fragments(fragments, assignments, output_path)
+        else:
+            write_output_fitz(doc, crops, assignments, output_path)
+    finally:
+        doc.close()
+
+    report(stage="done", bytes_written=output_size(output_path))
+    return assignments
+
+
+def sku_sort_key(a: dict):
+    """Etiquetas com pedido primeiro, agrupadas por SKU (produto do Excel); sem pedido no fim."""
+    return (a["order_sn"] is None, (a["product_name"] or "").casefold())
 
-    with open(output_path, "wb") as f:
-        writer.write(f)
 
-    print(f"\n🎉 Arquivo gerado: {output_path}")
+def generate_batch_pdf(pdf_paths, xlsx_paths, output_path, sort_by: str = "none", progress=None,
+                       layout: str = None):
+    """
+    Lote de várias lojas numa chamada só: N PDFs de etiquetas e N exports de pedidos.
+
+    - um único índice de pedidos (OrderMatcher) com os order_sn de todos os Excel
+      (order_sn repetido entre arquivos: vale o último)
+    - todos os PDFs passam pelo mesmo recorte/match (cache por PDF, como no
+      generate_combined_pdf), na ordem recebida — um pedido pode estar em qualquer PDF
+    - uma única saída; sort_by="sku" agrupa as etiquetas por SKU (ordem estável,
+      etiquetas sem pedido no fim) para a separação seguir a ordem do PDF
+
+    Só a engine fitz, sem modo paralelo. progress recebe os mesmos contadores do
+    generate_combined_pdf, somados sobre todos os PDFs. Devolve as atribuições
+    (cada uma com "pdf" = índice do PDF de origem), na ordem da saída.
+    """
+    report = progress or (lambda **fields: None)
+    if sort_by not in BATCH_SORTS:
+        raise ValueError(f"Ordenação inválida: {sort_by}. Use: {', '.join(BATCH_SORTS)}")
+    if not pdf_paths or not xlsx_paths:
+        raise ValueError("Envie ao menos um PDF e um Excel")
+    layout = layout or LAYOUT
+    if layout != "auto":
+        get_layout(layout)
+
+    logger.info("🧩 Lendo produtos de %d Excel...", len(xlsx_paths))
+    products_dict = {}
+    duplicated = 0
+    with span("excel_parse"):
+        for xlsx_path in xlsx_paths:
+            products = extract_products_from_excel(xlsx_path)
+            duplicated += len(products.keys() & products_dict.keys())
+            products_dict.update(products)
+    logger.info("📦 Produtos no lote: %d (order_sn repetidos: %d)", len(products_dict), duplicated)
+
+    docs = []
+    try:
+        with span("pdf_open"):
+            for pdf_path in pdf_paths:
+                docs.append(fitz.open(pdf_path))
+        pages_total = sum(doc.page_count for doc in docs)
+        report(stage="cropping", pages_total=pages_total, pages_cropped=0)
+
+        crops_by_pdf = []
+        pages_done = 0
+        for pdf_path, doc in zip(pdf_paths, docs):
+            def doc_progress(pages_cropped, offset=pages_done):
+                report(pages_cropped=offset + pages_cropped)
+            crops_by_pdf.append(cache.get_or_compute("crops-v5", f"{file_digest(pdf_path)}-{layout}",
+                                                     lambda: analyse_crops(doc, doc_progress, layout)))
+            pages_done += doc.page_count
+        empty_slots = sum(1 for crops_info in crops_by_pdf for *_, text, _ in crops_info if text is None)
+        labels_total = sum(len(crops_info) for crops_info in crops_by_pdf) - empty_slots
+        report(stage="matching", pages_cropped=pages_total, labels_total=labels_total, empty_slots=empty_slots)
+
+        matcher = OrderMatcher(products_dict)
+        sources, assignments = [], []
+        with span("match"):
+            for pdf_index, (doc, crops_info) in enumerate(zip(docs, crops_by_pdf)):
+                for page_number, rect, crop_text, _ in crops_info:
+                    if crop_text is None:
+                        continue
+                    a = match_crop(matcher, products_dict, len(sources), crop_text)
+                    a["pdf"] = pdf_index
+                    sources.append((doc, page_number, fitz.Rect(rect)))
+                    assignments.append(a)
+        if sort_by == "sku":
+            assignments.sort(key=sku_sort_key)
+
+        found_by_text = sum(1 for a in assignments if a["order_sn"])
+        logger.info("🔎 Lote: %d PDF(s), %d etiquetas, found_by_text=%d, empty_slots=%d, ordem=%s",
+                    len(docs), len(assignments), found_by_text, empty_slots, sort_by)
+        report(stage="writing", labels_matched=found_by_text)
+        write_labels_fitz(sources, assignments, output_path)
+    finally:
+        for doc in docs:
+            doc.close()
+
+    report(stage="done", bytes_written=output_size(output_path))
     return assignments
 
 
+def join_parts(part_paths, output_path):
+    """Junta as partes (PDFs de etiquetas prontas) num único PDF, na ordem."""
+    out = fitz.open()
+    with span("merge"):
+        for part_path in part_paths:
+            with fitz.open(part_path) as part:
+                out.insert_pdf(part)
+    with span("write"):
+        out.save(output_path, garbage=1, deflate=True)
+    out.close()
+
+
+def generate_checkpointed_pdf(pdf_path: Path, xlsx_path: Path, output_path, checkpoint, progress=None,
+                              layout: str = None, chunk_pages: int = None):
+    """
+    Mesma saída do generate_combined_pdf, processada em blocos de chunk_pages
+    páginas de origem (LABEL_CHECKPOINT_PAGES) com estado salvo em checkpoint
+    (checkpoint.Checkpoint):
+    - cada bloco recorta, casa e grava as suas etiquetas numa parte própria, e o
+      manifesto registra as páginas concluídas e os order_sn consumidos
+    - retomando, os order_sn do manifesto são consumidos no matcher antes de
+      continuar da primeira página não concluída — nenhuma etiqueta repetida
+    - no fim as partes são juntadas em output_path (checkpoint já completo só junta)
+
+    Só a engine fitz, sem modo paralelo e sem a sequência de fallback do DEBUG.
+    """
+    report = progress or (lambda **fields: None)
+    chunk_pages = max(1, chunk_pages or CHECKPOINT_PAGES)
+    layout = layout or LAYOUT
+    if layout != "auto":
+        get_layout(layout)
+
+    with span("excel_parse"):
+        products_dict = extract_products_from_excel(xlsx_path)
+    with span("pdf_open"):
+        doc = fitz.open(pdf_path)
+    try:
+        m = checkpoint.manifest
+        if checkpoint.pages_done:
+            logger.info("♻️  Retomando do checkpoint: %d/%d páginas, %d etiquetas prontas",
+                        checkpoint.pages_done, doc.page_count, m["labels_total"])
+        report(stage="cropping", pages_total=doc.page_count, pages_cropped=checkpoint.pages_done,
+               labels_total=m["labels_total"], labels_matched=m["labels_matched"], empty_slots=m["empty_slots"])
+
+        matcher = OrderMatcher(products_dict)
+        for order_sn in checkpoint.consumed:
+            matcher.consume(order_sn)
+
+        for start in range(checkpoint.pages_done, doc.page_count, chunk_pages):
+            stop = min(start + chunk_pages, doc.page_count)
+            sources, assignments, consumed, empty_slots = [], [], [], 0
+            for page in doc.pages(start, stop):
+                for page_number, rect, crop_text, _ in analyse_page(page, layout):
+                    if crop_text is None:
+                        empty_slots += 1
+                        continue
+                    with span("match"):
+                        a = match_crop(matcher, products_dict, len(sources), crop_text)
+                    sources.append((doc, page_number, fitz.Rect(rect)))
+                    assignments.append(a)
+                    if a["order_sn"]:
+                        consumed.append(a["order_sn"])
+
+            part_path = None
+            if assignments:
+                part_path = checkpoint.next_part_path()
+                tmp_path = part_path.with_name(part_path.name + ".tmp")
+                write_labels_fitz(sources, assignments, tmp_path)
+                os.replace(tmp_path, part_path)
+            checkpoint.add_part(start, stop, part_path, len(assignments), len(consumed), empty_slots, consumed)
+            report(pages_cropped=stop, labels_total=m["labels_total"], labels_matched=m["labels_matched"],
+                   empty_slots=m["empty_slots"])
+
+        logger.info("🔎 Resumo: etiquetas=%d, found_by_text=%d, empty_slots=%d, partes=%d",
+                    m["labels_total"], m["labels_matched"], m["empty_slots"], len(m["parts"]))
+    finally:
+        doc.close()
+
+    report(stage="writing")
+    join_parts(checkpoint.part_paths(), output_path)
+    checkpoint.mark_complete()
+    report(stage="done", bytes_written=output_size(output_path))
+    return m["labels_total"]
+
 if __name__ == "__main__":
     base_dir = Path(r"C:\Projetos\labelconvertv2\backend")
     pdf_path = base_dir / "exemplo.pdf"
     xlsx_path = base_dir / "exemplo.xlsx"
     output_path = base_dir / "etiquetas_final.pdf"
 
+    setup_logging()
     generate_combined_pdf(pdf_path, xlsx_path, output_path)
@@ -2,11 +2,24 @@ import fitz
 import pandas as pd
 import re
 from pathlib import Path
+from .cache import cached_by_file
+
+SHOPEE_ORDER_PATTERN = re.compile(r"\b25[A-Z0-9]{8,15}\b")  # mais tolerante
+PEDIDO_SPLIT_PATTERN = re.compile(r"Pedido\s*[:\n]", flags=re.IGNORECASE)
+WHITESPACE_PATTERN = re.compile(r"\s+")
+
+# colunas usadas do export de pedidos e padrões do campo product_info
+EXCEL_COLUMNS = ("order_sn", "product_info")
+ITEM_SPLIT_PATTERN = re.compile(r"(?=\[\d+\]\s*Product Name)", flags=re.IGNORECASE)
+PARENT_SKU_PATTERN = re.compile(r"Parent SKU Reference No.:\s*(.*?)(?:;|$)", flags=re.IGNORECASE)
+REFERENCE_PATTERN = re.compile(r"Reference No.:\s*(.*?)(?:;|$)", flags=re.IGNORECASE)
+QUANTITY_PATTERN = re.compile(r"Quantity:\s*(\d+)", flags=re.IGNORECASE)
 
 # ==============================================================
 # 1️⃣ Extrai sequência de pedidos do PDF (1 pedido por etiqueta)
 # ==============================================================
 
+@cached_by_file("orders-v1")
 def extract_orders_sequence_from_pdf(pdf_path: Path):
     """
     Retorna uma lista na ordem de leitura contendo todos os order_sn encontrados
@@ -15,25 +28,36 @@ def extract_orders_sequence_from_pdf(pdf_path: Path):
     acompanha top-left, top-right, bottom-left, bottom-right.
     """
     doc = fitz.open(pdf_path)
-    orders = []
-    shopee_pattern = re.compile(r"\b25[A-Z0-9]{8,15}\b")  # mais tolerante
+    try:
+        return extract_orders_sequence_from_doc(doc)
+    finally:
+        doc.close()
 
+
+def extract_orders_sequence_from_doc(doc):
+    """Igual a extract_orders_sequence_from_pdf, mas sobre um documento fitz já aberto."""
+    orders = []
     for page in doc:
-        text = page.get_text("text")
-        parts = re.split(r"Pedido\s*[:\n]", text, flags=re.IGNORECASE)
-        # parts[0] = tudo antes do primeiro 'Pedido:' na página
-        # cada parts[i>0] corresponde a um bloco *após* cada ocorrência de 'Pedido:'
-        for part in parts[1:]:
-            # procurar o primeiro código shopee no trecho
-            m = shopee_pattern.search(part.upper())
-            if m:
-                orders.append(m.group(0))
-            else:
-                # fallback: pegar primeira sequência alfanumérica longa
-                alt = re.search(r"[A-Z0-9]{6,}", part.upper())
-                orders.append(alt.group(0) if alt else None)
-
-    doc.close()
+        orders.extend(extract_orders_from_page(page))
+    return orders
+
+
+def extract_orders_from_page(page):
+    """Sequência de order_sn de uma única página (ordem em que 'Pedido:' aparece)."""
+    orders = []
+    text = page.get_text("text")
+    parts = PEDIDO_SPLIT_PATTERN.split(text)
+    # parts[0] = tudo antes do primeiro 'Pedido:' na página
+    # cada parts[i>0] corresponde a um bloco *após* cada ocorrência de 'Pedido:'
+    for part in parts[1:]:
+        # procurar o primeiro código shopee no trecho
+        m = SHOPEE_ORDER_PATTERN.search(part.upper())
+        if m:
+            orders.append(m.group(0))
+        else:
+            # fallback: pegar primeira sequência alfanumérica longa
+            alt = re.search(r"[A-Z0-9]{6,}", part.upper())
+            orders.append(alt.group(0) if alt else None)
     return orders
 
 
@@ -41,26 +65,62 @@ def extract_orders_sequence_from_pdf(pdf_path: Path):
 # 2️⃣ Extrai produtos e quantidades do Excel
 # ==============================================================
 
+def excel_engine():
+    """calamine (Rust, bem mais rápido) quando instalado; senão openpyxl (read-only)."""
+    try:
+        import python_calamine  # noqa: F401
+        return "calamine"
+    except ImportError:
+        return "openpyxl"
+
+
+@cached_by_file("excel-v1")
 def extract_products_from_excel(xlsx_path: Path):
-    """Lê o Excel e cria dicionário {order_sn: {"product": nome, "quantity": qtd}}"""
-    df = pd.read_excel(xlsx_path)
-    products = {}
+    """
+    Lê o Excel e cria dicionário {order_sn: {"product": nome, "quantity": qtd, "items": [...]}}
+
+    Só as colunas order_sn/product_info são lidas e o parse é vetorizado
+    (Series.str.extract). Pedidos com vários itens ("[1] ...; [2] ...") têm
+    cada item em "items"; "product"/"quantity" juntam os itens com " + "/"+".
+    """
+    df = pd.read_excel(xlsx_path, usecols=lambda c: c in EXCEL_COLUMNS, dtype=str, engine=excel_engine())
+    if "order_sn" not in df:
+        return {}
 
-    for _, row in df.iterrows():
-        order_sn = str(row.get("order_sn", "")).strip()
-        info = str(row.get("product_info", ""))
+    order_sns = df["order_sn"].fillna("").str.strip()
+    info = df["product_info"].fillna("") if "product_info" in df else pd.Series("", index=df.index)
 
-        name_match = re.search(r"Parent SKU Reference No.:\s*(.*?)(;|$)", info, flags=re.IGNORECASE)
-        if not name_match:
-            name_match = re.search(r"Reference No.:\s*(.*?)(;|$)", info, flags=re.IGNORECASE)
+    # um item por linha; o split deixa um pedaço vazio antes do "[1]"
+    items = info.str.split(ITEM_SPLIT_PATTERN).explode()
+    filled = items.ne("")
+    items = items[filled | ~filled.groupby(level=0).transform("any")]
 
-        qty_match = re.search(r"Quantity:\s*(\d+)", info, flags=re.IGNORECASE)
+    # "Parent SKU Reference No." vazio (produto sem variação) cai para o SKU do item
+    names = items.str.extract(PARENT_SKU_PATTERN)[0].str.strip()
+    names = names.mask(names.eq("")).fillna(items.str.extract(REFERENCE_PATTERN)[0].str.strip())
+    names = names.fillna("❌ Nome não encontrado")
+    quantities = items.str.extract(QUANTITY_PATTERN)[0].fillna("?")
 
-        product_name = name_match.group(1).strip() if name_match else "❌ Nome não encontrado"
-        quantity = qty_match.group(1).strip() if qty_match else "?"
+    multi = items.index.duplicated(keep=False)
+    product_col = names[~multi]
+    quantity_col = quantities[~multi]
+    multi_items = {}
+    if multi.any():
+        grouped = pd.DataFrame({"product": names[multi], "quantity": quantities[multi]}).groupby(level=0, sort=False)
+        product_col = pd.concat([product_col, grouped["product"].agg(" + ".join)]).sort_index()
+        quantity_col = pd.concat([quantity_col, grouped["quantity"].agg("+".join)]).sort_index()
+        multi_items = {idx: group.to_dict("records") for idx, group in grouped}
 
+    products = {}
+    for idx, order_sn, product_name, quantity in zip(
+        product_col.index, order_sns.loc[product_col.index], product_col, quantity_col
+    ):
         if order_sn:
-            products[order_sn] = {"product": product_name, "quantity": quantity}
+            products[order_sn] = {
+                "product": product_name,
+                "quantity": quantity,
+                "items": multi_items.get(idx) or [{"product": product_name, "quantity": quantity}],
+            }
 
     return products
 
@@ -91,7 +151,107 @@ def match_pdf_with_excel(pdf_path: Path, xlsx_path: Path):
 
 
 # ==============================================================
-# 4️⃣ Teste local (debug)
+# 4️⃣ Índice de order_sn para localizar pedidos no texto dos crops
+# ==============================================================
+
+class AhoCorasick:
+    """Autômato multi-padrão (Aho–Corasick): acha todos os padrões num único passe."""
+
+    def __init__(self, patterns):
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [None]
+
+        for pattern in patterns:
+            node = 0
+            for ch in pattern:
+                nxt = self._goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[node][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append(None)
+                node = nxt
+            self._out[node] = (self._out[node] or ()) + (pattern,)
+
+        # links de falha em BFS; as saídas do sufixo são herdadas
+        queue = list(self._goto[0].values())
+        for node in queue:
+            for ch, nxt in self._goto[node].items():
+                fail = self._fail[node]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(ch, 0)
+                if self._out[self._fail[nxt]]:
+                    self._out[nxt] = (self._out[nxt] or ()) + self._out[self._fail[nxt]]
+                queue.append(nxt)
+
+    def iter_matches(self, text: str):
+        """Gera (posição_final, padrão) na ordem em que os padrões terminam no texto."""
+        goto, fail, out = self._goto, self._fail, self._out
+        node = 0
+        for pos, ch in enumerate(text):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if out[node]:
+                for pattern in out[node]:
+                    yield pos, pattern
+
+
+class OrderMatcher:
+    """
+    Localiza order_sn no texto de cada etiqueta, consumindo cada pedido uma única vez.
+
+    Construído uma vez a partir do dict de extract_products_from_excel:
+    - caminho rápido: tokeniza o texto com SHOPEE_ORDER_PATTERN e consulta um dict
+    - fallback (texto malformado, SN quebrado em linhas, formato fora do padrão):
+      autômato Aho–Corasick sobre o texto sem espaços, montado sob demanda
+    """
+
+    def __init__(self, order_sns):
+        # SN em maiúsculas -> SN original (chave do dict de produtos)
+        self._remaining = {}
+        for sn in order_sns:
+            if sn:
+                self._remaining.setdefault(sn.upper(), sn)
+        self._all = list(self._remaining)
+        self._automaton = None
+
+    def __len__(self):
+        return len(self._remaining)
+
+    @property
+    def remaining(self):
+        """order_sn ainda não atribuídos (chaves originais do Excel)."""
+        return set(self._remaining.values())
+
+    def consume(self, order_sn: str):
+        """Marca o order_sn como usado; devolve a chave original ou None."""
+        return self._remaining.pop(order_sn.upper(), None) if order_sn else None
+
+    def match(self, text: str):
+        """Devolve (e consome) o primeiro order_sn disponível presente no texto, ou None."""
+        if not text or not self._remaining:
+            return None
+        text = text.upper()
+
+        for token in SHOPEE_ORDER_PATTERN.findall(text):
+            if token in self._remaining:
+                return self._remaining.pop(token)
+
+        if self._automaton is None:
+            self._automaton = AhoCorasick(self._all)
+        compact = WHITESPACE_PATTERN.sub("", text)
+        for _, pattern in self._automaton.iter_matches(compact):
+            if pattern in self._remaining:
+                return self._remaining.pop(pattern)
+        return None
+
+
+# ==============================================================
+# 5️⃣ Teste local (debug)
 # ==============================================================
 
 if __name__ == "__main__":
@@ -0,0 +1,253 @@
+# backend/layouts.py
+"""
+Layouts de etiquetas: como cada página de origem é dividida em recortes.
+
+Cada layout é declarativo — uma lista de células em frações da página
+(x0, y0, x1, y1), origem no canto superior esquerdo, na ordem de saída —
+mais o tamanho de página esperado e o texto que aparece uma vez por etiqueta
+("Pedido" na Shopee), usado na detecção automática.
+
+A detecção é feita por página, sem renderizar: pega os blocos de texto, acha
+as posições do marcador (palavra inteira, sem diferenciar maiúsculas) e escolhe
+o primeiro layout (na ordem de registro) do tamanho certo em que todo marcador
+cai numa célula e as células ocupadas têm o mesmo número de marcadores (o mesmo
+texto pode aparecer mais de uma vez por etiqueta).
+Só participam da detecção os layouts com auto_detect=True; os que ainda não
+foram conferidos com etiquetas reais ficam disponíveis apenas pelo nome
+(LABEL_LAYOUT ou parâmetro layout).
+Os retângulos são calculados uma vez por (layout, tamanho de página) e reaproveitados.
+"""
+import logging
+import re
+from collections import Counter
+from dataclasses import dataclass
+from functools import lru_cache
+
+import fitz
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+MM = 72 / 25.4
+A4 = fitz.paper_size("a4")                   # retrato, em pt
+A4_LANDSCAPE = fitz.paper_size("a4-l")
+LABEL_100x150 = (100 * MM, 150 * MM)
+SIZE_TOLERANCE = 0.03                         # 3% de folga no tamanho da página
+
+DEFAULT_LAYOUT = "a4_2x2"                     # usado quando nada é detectado
+
+# o que conta como conteúdo num recorte (entradas do page.get_bboxlog())
+CONTENT_KINDS = ("fill-text", "stroke-text", "fill-image", "fill-imgmask", "fill-shade", "fill-path", "stroke-path")
+IMAGE_KINDS = ("fill-image", "fill-imgmask")
+SLOT_MARGIN = 0.02                            # borda ignorada (linhas de corte entre etiquetas)
+# imagem que cobre o recorte inteiro (página escaneada, uma imagem por etiqueta) só
+# conta como vazia se a amostra renderizada for lisa: menos de INK_FRACTION dos pixels
+# a mais de INK_LEVEL tons de cinza da cor de fundo (mediana)
+SAMPLE_DPI = 36
+INK_LEVEL = 48
+INK_FRACTION = 0.002
+
+
+@dataclass(frozen=True)
+class Layout:
+    name: str
+    cells: tuple                  # ((x0, y0, x1, y1), ...) em frações da página
+    marker: str = None            # texto presente uma vez por etiqueta; None = não confere
+    page_size: tuple = None       # (largura, altura) em pt; None = qualquer página
+    description: str = ""
+    auto_detect: bool = True      # False = só quando escolhido pelo nome
+
+
+def grid(cols: int, rows: int, order=None, area=(0.0, 0.0, 1.0, 1.0)):
+    """
+    Células de uma grade cols x rows dentro de `area` (frações da página).
+    order: sequência de (coluna, linha), linha 0 = topo; padrão = ordem de leitura.
+    """
+    ax0, ay0, ax1, ay1 = area
+    cell_w, cell_h = (ax1 - ax0) / cols, (ay1 - ay0) / rows
+    order = order or [(col, row) for row in range(rows) for col in range(cols)]
+    return tuple(
+        (ax0 + col * cell_w, ay0 + row * cell_h, ax0 + (col + 1) * cell_w, ay0 + (row + 1) * cell_h)
+        for col, row in order
+    )
+
+
+LAYOUTS = {}  # ordem de registro = prioridade na detecção
+
+
+def register(layout: Layout) -> Layout:
+    LAYOUTS[layout.name] = layout
+    return layout
+
+
+register(Layout(
+    "a4_2x2",
+    # ordem histórica do label_generator: linha de baixo (esq., dir.), depois a de cima
+    grid(2, 2, order=[(0, 1), (1, 1), (0, 0), (1, 0)]),
+    marker="Pedido", page_size=A4,
+    description="Shopee: A4 retrato com 4 etiquetas 2x2",
+))
+register(Layout(
+    "label_1up",
+    grid(1, 1),
+    page_size=LABEL_100x150,
+    description="Uma etiqueta 100x150 mm por página",
+))
+register(Layout(
+    "a4_3x1",
+    grid(3, 1),
+    marker="Pedido", page_size=A4_LANDSCAPE,
+    description="A4 paisagem com 3 etiquetas lado a lado",
+))
+register(Layout(
+    "mercado_livre_a4",
+    grid(2, 2),
+    marker="Venda", page_size=A4,
+    description="Mercado Livre: A4 retrato com até 4 etiquetas, em ordem de leitura",
+    # frações estimadas, ainda não conferidas com etiquetas reais
+    auto_detect=False,
+))
+register(Layout(
+    "amazon_a4",
+    ((0.0, 0.0, 0.5, 0.5),),
+    marker="Amazon", page_size=A4,
+    description="Amazon: A4 retrato com a etiqueta no quarto superior esquerdo",
+    # frações estimadas, ainda não conferidas com etiquetas reais
+    auto_detect=False,
+))
+
+
+def grid_layout(cols: int, rows: int) -> Layout:
+    """Layout avulso (não registrado) de uma grade em ordem de leitura, para qualquer página."""
+    return Layout(f"grid_{cols}x{rows}", grid(cols, rows))
+
+
+def get_layout(layout) -> Layout:
+    if isinstance(layout, Layout):
+        return layout
+    try:
+        return LAYOUTS[layout]
+    except KeyError:
+        raise ValueError(f"Layout desconhecido: {layout} (use auto ou {', '.join(LAYOUTS)})")
+
+
+@lru_cache(maxsize=256)
+def _rects(layout: Layout, width: float, height: float):
+    return tuple(fitz.Rect(x0 * width, y0 * height, x1 * width, y1 * height) for x0, y0, x1, y1 in layout.cells)
+
+
+def layout_rects(layout, width: float, height: float):
+    """Retângulos (fitz, origem no topo) do layout numa página width x height. Não altere os Rects devolvidos."""
+    return _rects(get_layout(layout), round(width, 2), round(height, 2))
+
+
+def page_rects(page, layout):
+    return layout_rects(layout, page.rect.width, page.rect.height)
+
+
+def same_size(size, expected) -> bool:
+    return all(abs(a - b) <= b * SIZE_TOLERANCE for a, b in zip(size, expected))
+
+
+@lru_cache(maxsize=32)
+def _marker_pattern(marker: str):
+    return re.compile(rf"(?<!\w){re.escape(marker)}(?!\w)", re.IGNORECASE)
+
+
+def marker_points(blocks, marker: str):
+    """
+    Canto superior esquerdo (levemente para dentro) de cada ocorrência do marcador
+    como palavra inteira ("Amazon" não casa com "Amazonas"), um ponto por ocorrência.
+    """
+    pattern = _marker_pattern(marker)
+    return [(b[0] + 1, b[1] + 1) for b in blocks if b[6] == 0 for _ in pattern.finditer(b[4])]
+
+
+def markers_fit(cells, points) -> bool:
+    """Todo marcador cai numa célula e as células ocupadas têm o mesmo número de marcadores."""
+    hits = [next((i for i, r in enumerate(cells) if r.contains(p)), None) for p in points]
+    if None in hits:
+        return False
+    return len(set(Counter(hits).values())) == 1
+
+
+def detect_layout(page, blocks=None, default: str = DEFAULT_LAYOUT) -> Layout:
+    """
+    Primeiro layout de detecção automática compatível com o tamanho da página e com
+    as posições dos marcadores. Sem nenhum compatível, cai no `default` — ou, se ele
+    tiver menos recortes do que marcadores na página, no layout do tamanho da página
+    com mais recortes (com aviso no log, para não perder etiquetas em silêncio).
+    """
+    blocks = page.get_text("blocks") if blocks is None else blocks
+    size = (page.rect.width, page.rect.height)
+    markers = 0
+    candidates = []
+    for layout in LAYOUTS.values():
+        if not layout.auto_detect or (layout.page_size and not same_size(size, layout.page_size)):
+            continue
+        candidates.append(layout)
+        if layout.marker is None:
+            return layout
+        points = marker_points(blocks, layout.marker)
+        if not points:
+            continue
+        markers = max(markers, len(points))
+        if markers_fit(page_rects(page, layout), points):
+            return layout
+    fallback = LAYOUTS[default]
+    if len(fallback.cells) < markers:
+        fallback = max(candidates + [fallback], key=lambda layout: len(layout.cells))
+        if len(fallback.cells) < markers:
+            logger.warning("⚠️ Página %d: %d marcadores e nenhum layout compatível; usando %s (%d recortes)",
+                           page.number + 1, markers, fallback.name, len(fallback.cells))
+    return fallback
+
+
+def page_content_boxes(page):
+    """
+    (tipo, Rect) de tudo o que a página desenha — texto, imagens e vetores — numa única
+    passada pelo get_bboxlog() (mesmas caixas de get_text("blocks")/get_drawings, sem renderizar).
+    """
+    return [(kind, fitz.Rect(bbox)) for kind, bbox in page.get_bboxlog() if kind in CONTENT_KINDS]
+
+
+def area_has_ink(page, rect) -> bool:
+    """Renderiza `rect` em baixa resolução e diz se há algo além da cor de fundo."""
+    pix = page.get_pixmap(clip=rect, dpi=SAMPLE_DPI, colorspace=fitz.csGRAY, alpha=False)
+    if not pix.samples:
+        return False
+    gray = np.frombuffer(pix.samples, dtype=np.uint8).astype(np.int16)
+    ink = np.count_nonzero(np.abs(gray - int(np.median(gray))) > INK_LEVEL)
+    return ink > gray.size * INK_FRACTION
+
+
+def slot_is_empty(rect, boxes, page=None, margin: float = SLOT_MARGIN) -> bool:
+    """
+    Recorte vazio = nenhuma caixa de conteúdo entra na área útil (sem a borda).
+    Vetores que cobrem toda a área útil (fundo, moldura da folha) não contam; uma
+    imagem que a cobre (página escaneada/raster) é conteúdo, a menos que a amostra
+    renderizada da área seja lisa (fundo em branco). Sem `page` não dá para
+    amostrar, e a imagem conta como conteúdo.
+    """
+    dx, dy = rect.width * margin, rect.height * margin
+    inner = fitz.Rect(rect.x0 + dx, rect.y0 + dy, rect.x1 - dx, rect.y1 - dy)
+    covering_image = False
+    for kind, box in boxes:
+        if box.contains(inner):
+            covering_image = covering_image or kind in IMAGE_KINDS
+            continue
+        if box.intersects(inner):
+            return False
+    if covering_image:
+        return page is not None and not area_has_ink(page, inner)
+    return True
+
+
+def iter_page_slots(page, layout="auto", skip_empty: bool = False):
+    """(Layout, Rect) de cada recorte da página; layout "auto" detecta página a página."""
+    chosen = detect_layout(page) if layout == "auto" else get_layout(layout)
+    boxes = page_content_boxes(page) if skip_empty else None
+    for rect in page_rects(page, chosen):
+        if skip_empty and slot_is_empty(rect, boxes, page):
+            continue
+        yield chosen, rect
@@ -1,40 +1,52 @@
 # main.py — FastAPI WebApp para gerar etiquetas
-import shutil
 from pathlib import Path
-from fastapi import FastAPI, UploadFile, Form, HTTPException, Request, Depends
-from fastapi.responses import FileResponse, HTMLResponse, JSONResponse, StreamingResponse, RedirectResponse
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Request, Depends
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import HTMLResponse, JSONResponse, StreamingResponse, RedirectResponse, Response
 from fastapi.staticfiles import StaticFiles
+from starlette.background import BackgroundTask
 from fastapi.templating import Jinja2Templates
-from pdf2image import convert_from_bytes
 from PIL import Image
 import base64
-from io import BytesIO
-import tempfile
-import os
+import io
 import zipfile
+import json
+import logging
+import time
 
 # ====== IMPORTS INTERNOS ======
-from .label_generator import generate_combined_pdf
 from .label_matcher import match_pdf_with_excel
-from .database import Base, engine, SessionLocal
-from . import auth, plans
-from .deps import get_current_user
+from .label_generator import BATCH_MAX_FILES, BATCH_SORTS, PARALLEL_WORKERS, shutdown_parallel
+from .cache import CACHE_ENABLED, cache, bytes_digest
+from .zpl_encoder import COMPRESSION_MODES, pack_image, zpl_label
+from .renderer import PREVIEW_FORMATS, PREVIEW_MAX_SIZE, PREVIEW_SIZE_LIMIT, open_pdf
+from .workers import pool, page_ranges, PoolBusy
+from .scratch import make_scratch_dir, remove_scratch_dir, save_upload
+from . import metrics, tasks
+from .database import Base, engine, ensure_schema
+from . import auth, plans, jobs, cron_jobs, spooler
+from .deps import current_user, require_admin, user_cache
 
 
+metrics.setup_logging()
+logger = logging.getLogger(__name__)
+
 # 🚀 1. Cria o app primeiro
 app = FastAPI(title="Conversor de Etiquetas Shopee")
 
 # 🚀 2. Cria o banco e inclui routers
 Base.metadata.create_all(bind=engine)
+ensure_schema()
 app.include_router(auth.router)
 app.include_router(plans.router)
+app.include_router(jobs.router)
+app.include_router(spooler.router)
 
 # =====================
 # CONFIGURAÇÕES DE DIRETÓRIO
 # =====================
 
 BASE_DIR = Path(__file__).resolve().parent
-UPLOAD_DIR = BASE_DIR / "uploads"
 
 # Detecta automaticamente o caminho correto do frontend
 possible_paths = [
@@ -51,9 +63,6 @@ else:
 
 print(f"🧭 Usando TEMPLATE_DIR = {TEMPLATE_DIR}")
 
-OUTPUT_FILE = BASE_DIR / "etiquetas_final.pdf"
-
-UPLOAD_DIR.mkdir(exist_ok=True)
 TEMPLATE_DIR.mkdir(exist_ok=True)
 
 templates = Jinja2Templates(directory=str(TEMPLATE_DIR))
@@ -86,15 +95,8 @@ async def login_page(request: Request):
 async def register_page(request: Request):
     return templates.TemplateResponse("register.html", {"request": request})
 
-from .deps import get_current_user
-from .database import SessionLocal
-
 @app.get("/dashboard", response_class=HTMLResponse)
-async def dashboard_page(request: Request):
-    db = SessionLocal()
-    user = get_current_user(request, db)
-    db.close()
-
+async def dashboard_page(request: Request, user=Depends(current_user)):
     if not user:
         return RedirectResponse("/login", status_code=303)
 
@@ -123,10 +125,7 @@ async def dashboard_page(request: Request):
 # ROTA PROTEGIDA (LOGIN NECESSÁRIO)
 # =====================
 @app.get("/teste", response_class=HTMLResponse)
-async def test_page(request: Request):
-    db = SessionLocal()
-    user = get_current_user(request, db)
-    db.close()
+async def test_page(request: Request, user=Depends(current_user)):
     if not user:
         return RedirectResponse("/login", status_code=303)
     return templates.TemplateResponse("teste.html", {"request": request, "user": user.nome})
@@ -138,91 +137,473 @@ async def test_page(request: Request):
 
 @app.post("/upload")
 async def upload_files(pdf: UploadFile, xlsx: UploadFile):
-    """Recebe PDF e Excel, salva localmente, gera etiquetas_final.pdf e retorna para download."""
-    pdf_path = UPLOAD_DIR / pdf.filename
-    xlsx_path = UPLOAD_DIR / xlsx.filename
+    """
+    Recebe PDF e Excel, gera as etiquetas e devolve o PDF final.
+    Cada requisição usa a própria pasta temporária (apagada no fim) e o resultado
+    volta da memória do worker direto para a resposta.
+    """
+    scratch = make_scratch_dir()
+    try:
+        pdf_path, xlsx_path = scratch / "entrada.pdf", scratch / "pedidos.xlsx"
+        # uploads copiados em blocos, fora do event loop
+        await run_in_threadpool(save_upload, pdf, pdf_path)
+        await run_in_threadpool(save_upload, xlsx, xlsx_path)
+
+        logger.info("📥 PDF recebido: %s", pdf.filename)
+        logger.info("📥 XLSX recebido: %s", xlsx.filename)
+
+        # gera PDF final num processo do pool (o event loop segue livre)
+        pdf_bytes, summary = await run_in_pool(tasks.generate_labels, str(pdf_path), str(xlsx_path))
+    finally:
+        await run_in_threadpool(remove_scratch_dir, scratch)
+
+    return labels_response(pdf_bytes, summary)
+
+
+def labels_response(pdf_bytes: bytes, summary: dict, **headers):
+    return Response(
+        pdf_bytes,
+        media_type="application/pdf",
+        headers={
+            "Content-Disposition": 'attachment; filename="etiquetas_final.pdf"',
+            "X-Labels-Total": str(summary.get("labels_total", 0)),
+            "X-Labels-Matched": str(summary.get("labels_matched", 0)),
+            "X-Empty-Slots": str(summary.get("empty_slots", 0)),
+            **headers,
+        },
+    )
 
-    # salva os uploads
-    with pdf_path.open("wb") as f:
-        shutil.copyfileobj(pdf.file, f)
-    with xlsx_path.open("wb") as f:
-        shutil.copyfileobj(xlsx.file, f)
 
-    print(f"📥 PDF recebido: {pdf_path.name}")
-    print(f"📥 XLSX recebido: {xlsx_path.name}")
+@app.post("/upload/batch")
+async def upload_batch(
+    pdfs: list[UploadFile] = File(...),
+    xlsxs: list[UploadFile] = File(...),
+    sort_by: str = Form("none"),
+):
+    """
+    Lote de várias lojas: N PDFs e N Excel viram um único PDF final, numa só
+    tarefa do pool (um índice de pedidos para todos os Excel, uma passada de
+    recorte/match, uma saída). sort_by="sku" agrupa as etiquetas por SKU.
+    """
+    if sort_by not in BATCH_SORTS:
+        raise HTTPException(status_code=400, detail=f"Ordenação inválida. Use: {', '.join(BATCH_SORTS)}")
+    if len(pdfs) > BATCH_MAX_FILES or len(xlsxs) > BATCH_MAX_FILES:
+        raise HTTPException(status_code=400, detail=f"Máximo de {BATCH_MAX_FILES} arquivos de cada tipo por lote")
 
-    # gera PDF final
-    generate_combined_pdf(pdf_path, xlsx_path, OUTPUT_FILE)
+    scratch = make_scratch_dir()
+    try:
+        pdf_paths = [scratch / f"entrada_{i}.pdf" for i in range(len(pdfs))]
+        xlsx_paths = [scratch / f"pedidos_{i}.xlsx" for i in range(len(xlsxs))]
+        for upload, path in zip(pdfs + xlsxs, pdf_paths + xlsx_paths):
+            await run_in_threadpool(save_upload, upload, path)
+        logger.info("📥 Lote recebido: %d PDF(s), %d XLSX", len(pdfs), len(xlsxs))
 
-    return FileResponse(
-        OUTPUT_FILE,
-        media_type="application/pdf",
-        filename="etiquetas_final.pdf",
+        pdf_bytes, summary = await run_in_pool(tasks.generate_batch_labels, [str(p) for p in pdf_paths],
+                                               [str(p) for p in xlsx_paths], sort_by)
+    finally:
+        await run_in_threadpool(remove_scratch_dir, scratch)
+
+    return labels_response(pdf_bytes, summary, **{"X-Batch-Files": str(len(pdfs))})
+
+
+@app.get("/cache/stats")
+async def cache_stats(user=Depends(require_admin)):
+    """Contadores de hit/miss do cache de análise de Excel/PDF (por processo; só administradores)."""
+    # a primeira chamada varre o cache em disco: fora do event loop
+    return JSONResponse(await run_in_threadpool(cache.stats))
+
+
+@app.get("/auth/cache/stats")
+async def auth_cache_stats(user=Depends(require_admin)):
+    """Contadores do cache token -> usuário (por processo; só administradores)."""
+    return JSONResponse(user_cache.stats())
+
+
+# =====================
+# POOL DE WORKERS (CPU fora do event loop)
+# =====================
+
+def busy_response(e: PoolBusy):
+    return HTTPException(
+        status_code=429,
+        detail=f"{e} — tente novamente em {e.retry_after}s",
+        headers={"Retry-After": str(e.retry_after)},
     )
 
 
+def acquire_or_429():
+    try:
+        return pool.acquire()
+    except PoolBusy as e:
+        raise busy_response(e)
+
+
+async def run_in_pool(fn, *args):
+    """Roda fn no pool; fila cheia -> 429, ValueError do worker -> 400."""
+    try:
+        return await pool.run(fn, *args)
+    except PoolBusy as e:
+        raise busy_response(e)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.get("/workers/stats")
+async def workers_stats(user=Depends(require_admin)):
+    """Estado do pool: workers, requisições em andamento e recusadas (429); só administradores."""
+    return JSONResponse(pool.stats())
+
+
+# =====================
+# MÉTRICAS (Prometheus em /metrics; Server-Timing com LABEL_SERVER_TIMING=1)
+# =====================
+
+@app.middleware("http")
+async def stage_timing(request: Request, call_next):
+    """Soma os spans da requisição (inclusive os dos workers) e registra a duração da rota."""
+    start = time.perf_counter()
+    with metrics.collect() as collector:
+        try:
+            response = await call_next(request)
+        finally:
+            # spans de um StreamingResponse, depois daqui, são observados um a um
+            collector.flush()
+    route = request.scope.get("route")
+    metrics.REQUEST_SECONDS.observe(
+        time.perf_counter() - start,
+        method=request.method,
+        route=route.path if route is not None else "unmatched",
+        status=response.status_code,
+    )
+    if metrics.SERVER_TIMING and collector.stages:
+        response.headers["Server-Timing"] = collector.server_timing()
+    return response
+
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    """Histogramas por etapa e por rota, mais os contadores do pool, da fila de jobs e do cache."""
+    pool_stats = pool.stats()
+    cache_stats = await run_in_threadpool(cache.stats)
+    extra = []
+    extra += metrics.sample_lines("labelconvert_pool_workers", "Processos do pool de conversão.",
+                                  [({}, pool_stats["workers"])])
+    extra += metrics.sample_lines("labelconvert_pool_pending", "Requisições pesadas em andamento (rodando + na fila).",
+                                  [({}, pool_stats["pending"])])
+    extra += metrics.sample_lines("labelconvert_pool_requests_total", "Requisições pesadas aceitas e recusadas (429).",
+                                  [({"result": "accepted"}, pool_stats["accepted"]),
+                                   ({"result": "rejected"}, pool_stats["rejected"])], kind="counter")
+    extra += metrics.sample_lines("labelconvert_pool_tasks_total", "Tarefas enviadas aos workers.",
+                                  [({}, pool_stats["tasks"])], kind="counter")
+    extra += metrics.sample_lines("labelconvert_jobs_queued", "Jobs aguardando na fila.",
+                                  [({}, jobs.job_queue.qsize())])
+    extra += metrics.sample_lines(
+        "labelconvert_cache_lookups_total", "Consultas ao cache de análise por namespace e resultado.",
+        [({"namespace": ns, "result": result}, counts[result])
+         for ns, counts in sorted(cache_stats["namespaces"].items())
+         for result in ("memory_hits", "disk_hits", "misses")],
+        kind="counter",
+    )
+    extra += metrics.sample_lines("labelconvert_cache_memory_entries", "Entradas no cache em memória.",
+                                  [({}, cache_stats["memory_entries"])])
+    extra += metrics.sample_lines("labelconvert_cache_disk_bytes", "Bytes do cache em disco.",
+                                  [({}, cache_stats["disk_bytes"])])
+    cron_stats = cron_jobs.get_stats()
+    extra += metrics.sample_lines("labelconvert_cron_runs_total", "Execuções da manutenção do banco.",
+                                  [({"result": "ok"}, cron_stats["runs"]), ({"result": "error"}, cron_stats["errors"])],
+                                  kind="counter")
+    extra += metrics.sample_lines(
+        "labelconvert_cron_rows_total", "Linhas alteradas pela manutenção do banco, por regra.",
+        [({"rule": rule}, cron_stats[rule]) for rule in ("plans_expired", "subscriptions_expired")],
+        kind="counter",
+    )
+    printers = [p.stats() for p in spooler.spooler.printers()]
+    for name, doc, key, kind in (
+        ("labelconvert_printer_labels_total", "Etiquetas enviadas por impressora.", "labels_sent", "counter"),
+        ("labelconvert_printer_bytes_total", "Bytes de ZPL enviados por impressora.", "bytes_sent", "counter"),
+        ("labelconvert_printer_send_errors_total", "Falhas de envio (antes das novas tentativas).", "send_errors", "counter"),
+        ("labelconvert_printer_connects_total", "Conexões TCP abertas por impressora.", "connects", "counter"),
+        ("labelconvert_printer_queued", "Impressões na fila por impressora.", "queued", "gauge"),
+    ):
+        extra += metrics.sample_lines(name, doc, [({"printer": p["name"]}, p[key]) for p in printers], kind=kind)
+    return Response(metrics.exposition(extra), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+scheduler = None
+
+
+@app.on_event("startup")
+def start_job_queue():
+    global scheduler
+    if PARALLEL_WORKERS > 1 and pool.workers > 0:
+        logger.warning("⚠️  LABEL_PARALLEL_WORKERS=%d ignorado: com LABEL_WORKERS=%d o pool já divide o trabalho "
+                       "(use LABEL_WORKERS=0 para o modo paralelo)", PARALLEL_WORKERS, pool.workers)
+    jobs.job_queue.start()
+    scheduler = cron_jobs.start_scheduler()
+    spooler.spooler.start()
+
+
+@app.on_event("shutdown")
+def shutdown_pool():
+    if scheduler is not None:
+        scheduler.shutdown(wait=False)
+    jobs.job_queue.stop()
+    spooler.spooler.stop()
+    pool.shutdown()
+    shutdown_parallel()
+
+
 # =====================
 # FUNÇÕES DE CONVERSÃO ZPL
 # =====================
 
-def image_to_zpl(image: Image.Image) -> str:
-    """Converte PIL Image para ZPL GFA."""
-    image = image.convert("1")
-    image = Image.eval(image, lambda x: 255 - x)
-    width, height = image.size
-    bytes_per_row = (width + 7) // 8
-    total_bytes = bytes_per_row * height
-    data = bytearray(image.tobytes())
-    hex_data = ''.join(f'{b:02X}' for b in data)
-    return f"^XA\n^FO0,0^GFA,{total_bytes},{total_bytes},{bytes_per_row},{hex_data}^XZ"
+def image_to_zpl(image: Image.Image, compression: str = "none") -> str:
+    """Converte PIL Image para ZPL GFA (hex puro, ASCII comprimido ou Z64)."""
+    data, bytes_per_row, height = pack_image(image.convert("1"))
+    return zpl_label(data, bytes_per_row, height, compression)
+
+
+def check_compression(compression: str) -> str:
+    compression = (compression or "none").lower()
+    if compression not in COMPRESSION_MODES:
+        raise HTTPException(status_code=400, detail=f"Compressão inválida. Use: {', '.join(COMPRESSION_MODES)}")
+    return compression
+
+
+def open_pdf_or_400(source):
+    try:
+        return open_pdf(source)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def count_pages_or_400(source) -> int:
+    """Valida o PDF (bytes ou caminho) e devolve o nº de páginas (o render fica com os workers)."""
+    doc = open_pdf_or_400(source)
+    page_count = doc.page_count
+    doc.close()
+    return page_count
+
+
+async def spool_pdf_or_400(file: UploadFile):
+    """
+    Copia o PDF enviado para uma pasta temporária e conta as páginas, tudo no
+    threadpool. Os workers recebem o caminho, não os bytes (um PDF de 50 MB em
+    250 faixas seriam 12 GB de pickle). Devolve (pasta, caminho, nº de páginas);
+    quem chama apaga a pasta (remove_scratch_dir).
+    """
+    scratch = make_scratch_dir()
+    try:
+        pdf_path = scratch / "entrada.pdf"
+        await run_in_threadpool(save_upload, file, pdf_path)
+        page_count = await run_in_threadpool(count_pages_or_400, pdf_path)
+    except BaseException:
+        await run_in_threadpool(remove_scratch_dir, scratch)
+        raise
+    return scratch, pdf_path, page_count
+
+
+def acquire_or_cleanup(scratch):
+    """acquire_or_429 que apaga a pasta temporária se o pool recusar."""
+    try:
+        return acquire_or_429()
+    except HTTPException:
+        remove_scratch_dir(scratch)
+        raise
+
+
+def release_and_cleanup(lease, scratch):
+    lease.release()
+    remove_scratch_dir(scratch)
+
+
+async def iter_zpl_pages(pdf_path, compression: str, page_count: int):
+    """(zpl, stats) de cada página, na ordem, com as faixas de páginas divididas entre os workers."""
+    ranges = [(str(pdf_path), start, stop, compression) for start, stop in page_ranges(page_count)]
+    async for chunk in pool.map_ordered(tasks.zpl_page_range, ranges):
+        for item in chunk:
+            yield item
 
 
 @app.post("/generate_zpl_image/")
-async def generate_zpl_image(file: UploadFile):
-    content = await file.read()
-    images = convert_from_bytes(content, dpi=203)
-    zpl_list = [image_to_zpl(img) for img in images]
-    return JSONResponse({"zpl": zpl_list})
+async def generate_zpl_image(file: UploadFile, compression: str = Form("none")):
+    compression = check_compression(compression)
+    scratch, pdf_path, page_count = await spool_pdf_or_400(file)
+    lease = acquire_or_cleanup(scratch)
+    try:
+        zpl_list, stats = [], []
+        async for zpl, page_stats in iter_zpl_pages(pdf_path, compression, page_count):
+            zpl_list.append(zpl)
+            stats.append(page_stats)
+    finally:
+        await run_in_threadpool(release_and_cleanup, lease, scratch)
+    return JSONResponse({"zpl": zpl_list, "compression": compression, "stats": stats})
 
 
 @app.post("/preview_zpl/")
-async def preview_zpl(file: UploadFile):
+async def preview_zpl(
+    file: UploadFile,
+    page: int = Form(1),
+    grid: int = Form(0),
+    max_width: int = Form(PREVIEW_MAX_SIZE[0]),
+    max_height: int = Form(PREVIEW_MAX_SIZE[1]),
+    format: str = Form("png"),
+):
+    """
+    Preview de uma página (page, 1-based) ou grade com miniaturas de `grid` páginas
+    a partir dela. Só as páginas pedidas são renderizadas, limitadas a max_width x
+    max_height, e o resultado fica em cache pelo SHA-256 do PDF + parâmetros (LABEL_CACHE=0 desliga).
+    """
+    fmt = (format or "png").lower()
+    if fmt not in PREVIEW_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Formato inválido. Use: {', '.join(PREVIEW_FORMATS)}")
+    if page < 1 or grid < 0 or max_width < 16 or max_height < 16:
+        raise HTTPException(status_code=400, detail="Parâmetros de preview inválidos")
+    max_size = (min(max_width, PREVIEW_SIZE_LIMIT), min(max_height, PREVIEW_SIZE_LIMIT))
+    grid = min(grid, 64)
+
     content = await file.read()
-    images = convert_from_bytes(content, dpi=100)
-    if not images:
-        raise HTTPException(status_code=400, detail="PDF sem páginas")
+    hit, image_bytes = False, None
+    if CACHE_ENABLED:
+        # hash e camada em disco (pickle) fora do event loop
+        key = await run_in_threadpool(
+            lambda: f"{bytes_digest(content)}-p{page}-g{grid}-{max_size[0]}x{max_size[1]}-{fmt}")
+        hit, image_bytes = await run_in_threadpool(cache.get, "preview-v1", key)
+    if not hit:
+        image_bytes = await run_in_pool(tasks.preview_image, content, page, grid, max_size, fmt)
+        if CACHE_ENABLED:
+            await run_in_threadpool(cache.set, "preview-v1", key, image_bytes)
+
+    return Response(
+        image_bytes,
+        media_type=f"image/{fmt}",
+        headers={"X-Cache": "HIT" if hit else ("MISS" if CACHE_ENABLED else "OFF")},
+    )
 
-    first_image = images[0]
-    img_byte_arr = BytesIO()
-    first_image.save(img_byte_arr, format="PNG")
-    img_byte_arr.seek(0)
-    return StreamingResponse(img_byte_arr, media_type="image/png")
 
+class ZipStreamBuffer(io.RawIOBase):
+    """Destino não-seekable para o ZipFile: acumula os bytes até o próximo drain()."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self._chunks.append(bytes(b))
+        return len(b)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+async def stream_zpl_zip(pdf_path, compression: str, page_count: int, lease, scratch):
+    """Emite uma entrada do ZIP por etiqueta, à medida que os workers devolvem as páginas."""
+    buf = ZipStreamBuffer()
+    stats = []
+    try:
+        with zipfile.ZipFile(buf, "w") as zf:
+            async for zpl_code, page_stats in iter_zpl_pages(pdf_path, compression, page_count):
+                stats.append(page_stats)
+                zf.writestr(f"etiqueta_{page_stats['label']:03}.zpl", zpl_code)
+                yield buf.drain()
+            # tamanho de cada etiqueta vs. hex puro
+            zf.writestr("resumo.json", json.dumps({"compression": compression, "stats": stats}, indent=2))
+        yield buf.drain()  # diretório central, escrito no close()
+    finally:
+        await run_in_threadpool(release_and_cleanup, lease, scratch)
+
+
+def zpl_totals_comment(compression: str, stats: list) -> str:
+    """Resumo de tamanho do lote como comentário ZPL (^FX; sem ^ nem ~ no texto)."""
+    size = sum(s["bytes"] for s in stats)
+    raw = sum(s["raw_bytes"] for s in stats)
+    ratio = round(raw / size, 1) if size else 0.0
+    return f"^FX labelconvert: {len(stats)} etiquetas, compressao {compression}, {size} bytes, hex puro {raw} ({ratio}x)"
+
+
+async def stream_zpl_concat(pdf_path, compression: str, page_count: int, lease, scratch):
+    """
+    Uma etiqueta ZPL por vez, separadas por quebra de linha. A última sai com o
+    resumo de tamanho (zpl_totals_comment) antes do ^XZ — o relatório do
+    /generate_zpl_image/ em forma de comentário, que a impressora ignora.
+    """
+    try:
+        stats, pending = [], None
+        async for zpl_code, page_stats in iter_zpl_pages(pdf_path, compression, page_count):
+            if pending is not None:
+                yield pending.encode("utf-8")
+            pending = (zpl_code if not stats else "\n" + zpl_code)
+            stats.append(page_stats)
+        if pending is not None:
+            body, end = pending[:-len("^XZ")], pending[-len("^XZ"):]
+            yield (body + zpl_totals_comment(compression, stats) + end).encode("utf-8")
+    finally:
+        await run_in_threadpool(release_and_cleanup, lease, scratch)
 
-@app.post("/generate_zpl_full/")
-async def generate_zpl_full(file: UploadFile):
-    content = await file.read()
-    images = convert_from_bytes(content, dpi=203)
-    temp_dir = tempfile.mkdtemp()
-    zip_path = os.path.join(temp_dir, "etiquetas_zpl.zip")
 
-    with zipfile.ZipFile(zip_path, "w") as zf:
-        for i, img in enumerate(images):
-            zpl_code = image_to_zpl(img)
-            zf.writestr(f"etiqueta_{i+1:03}.zpl", zpl_code)
-    return FileResponse(zip_path, filename="etiquetas_zpl.zip")
+@app.post("/generate_zpl_full/")
+async def generate_zpl_full(file: UploadFile, compression: str = Form("none")):
+    compression = check_compression(compression)
+    scratch, pdf_path, page_count = await spool_pdf_or_400(file)
+    lease = acquire_or_cleanup(scratch)
+    return StreamingResponse(
+        stream_zpl_zip(pdf_path, compression, page_count, lease, scratch),
+        media_type="application/zip",
+        headers={
+            "Content-Disposition": 'attachment; filename="etiquetas_zpl.zip"',
+            "X-ZPL-Compression": compression,
+            "X-Queue-Position": str(lease.position),
+        },
+        # garante a vaga de volta (e a pasta apagada) se o stream nem começar
+        background=BackgroundTask(release_and_cleanup, lease, scratch),
+    )
 
 
 @app.post("/generate_zpl_concat/")
-async def generate_zpl_concat(file: UploadFile):
-    content = await file.read()
-    images = convert_from_bytes(content, dpi=203)
-    zpl_all = "\n".join(image_to_zpl(img) for img in images)
-    temp_dir = tempfile.mkdtemp()
-    path = os.path.join(temp_dir, "etiquetas_todas.zpl")
-    with open(path, "w", encoding="utf-8") as f:
-        f.write(zpl_all)
-    return FileResponse(path, filename="etiquetas_todas.zpl")
+async def generate_zpl_concat(file: UploadFile, compression: str = Form("none")):
+    compression = check_compression(compression)
+    scratch, pdf_path, page_count = await spool_pdf_or_400(file)
+    lease = acquire_or_cleanup(scratch)
+    return StreamingResponse(
+        stream_zpl_concat(pdf_path, compression, page_count, lease, scratch),
+        media_type="application/octet-stream",
+        headers={
+            "Content-Disposition": 'attachment; filename="etiquetas_todas.zpl"',
+            "X-ZPL-Compression": compression,
+            "X-Queue-Position": str(lease.position),
+        },
+        background=BackgroundTask(release_and_cleanup, lease, scratch),
+    )
+
+
+@app.post("/printers/{name}/print", status_code=202)
+async def print_labels(name: str, file: UploadFile, compression: str = Form("none"),
+                       user=Depends(spooler.require_user)):
+    """
+    Manda etiquetas direto para a impressora (spooler.py): ZPL pronto (ex.: saída
+    do /generate_zpl_concat/) vai como está; PDF é convertido antes, no pool.
+    Devolve o job de impressão (GET /print_jobs/{id}).
+    """
+    spooler.printer_for(name, user)
+    head = await file.read(1024)
+    await file.seek(0)
+    if head.lstrip()[:4] == b"%PDF":
+        compression = check_compression(compression)
+        scratch, pdf_path, page_count = await spool_pdf_or_400(file)
+        lease = acquire_or_cleanup(scratch)
+        try:
+            labels = [zpl_code async for zpl_code, _ in iter_zpl_pages(pdf_path, compression, page_count)]
+        finally:
+            await run_in_threadpool(release_and_cleanup, lease, scratch)
+    else:
+        content = await file.read()
+        labels = spooler.split_labels(content.decode("utf-8", errors="replace"))
+    job = spooler.submit_or_error(name, labels, user)
+    return JSONResponse(job.to_dict(), status_code=202)
 
 
 # =====================
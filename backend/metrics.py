@@ -0,0 +1,198 @@
+# backend/metrics.py
+"""
+Métricas do pipeline: tempo por etapa (spans) exportado em /metrics no formato
+texto do Prometheus e, opcionalmente, no header Server-Timing.
+
+Uso:
+    with span("match"):
+        ...
+
+Dentro de uma requisição (middleware) ou de um job, os spans são somados por
+etapa num Collector e cada total vira uma observação do histograma no fim
+— ou seja, o histograma mede "quanto a etapa custou por requisição/job".
+Fora disso (scripts, streaming depois da resposta) cada span é observado direto.
+Nos processos do pool, run_traced() devolve os spans junto com o resultado
+e o processo principal os soma com merge_spans().
+"""
+import bisect
+import contextvars
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+SERVER_TIMING = os.getenv("LABEL_SERVER_TIMING", "0") == "1"
+LOG_LEVEL = os.getenv("LABEL_LOG_LEVEL", "INFO").upper()
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+
+def setup_logging():
+    """Configura o logging do pacote (processo principal e workers do pool)."""
+    logging.basicConfig(level=LOG_LEVEL, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+
+# ==============================================================
+# Histograma (exposição texto do Prometheus)
+# ==============================================================
+
+def _format_labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    body = ",".join(f'{k}="{str(v)}"' for k, v in labels.items())
+    return "{" + body + "}"
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if value != float("inf") else "+Inf"
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # valores dos labels -> [contagens por bucket, soma, total]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+            if index < len(self.buckets):
+                series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def expose(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((k, (list(v[0]), v[1], v[2])) for k, v in self._series.items())
+        for key, (counts, total, count) in items:
+            labels = dict(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, n in zip(self.buckets, counts):
+                cumulative += n
+                lines.append(f"{self.name}_bucket{_format_labels({**labels, 'le': _format_value(bound)})} {cumulative}")
+            lines.append(f"{self.name}_bucket{_format_labels({**labels, 'le': '+Inf'})} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {count}")
+        return lines
+
+
+def sample_lines(name: str, documentation: str, samples, kind: str = "gauge"):
+    """Linhas de um gauge/counter lido na hora da coleta: samples = [(labels, valor)]."""
+    lines = [f"# HELP {name} {documentation}", f"# TYPE {name} {kind}"]
+    lines.extend(f"{name}{_format_labels(labels)} {value}" for labels, value in samples)
+    return lines
+
+
+STAGE_SECONDS = Histogram(
+    "labelconvert_stage_seconds",
+    "Tempo gasto em cada etapa do pipeline, por requisição ou job.",
+    labelnames=("stage",),
+)
+REQUEST_SECONDS = Histogram(
+    "labelconvert_request_seconds",
+    "Duração das requisições HTTP (até o início da resposta).",
+    labelnames=("method", "route", "status"),
+)
+
+
+# ==============================================================
+# Spans
+# ==============================================================
+
+class Collector:
+    """Soma os spans de uma requisição/job por etapa: {stage: [segundos, chamadas]}."""
+
+    def __init__(self):
+        self.stages = {}
+        self.closed = False
+        self._lock = threading.Lock()
+
+    def add(self, stage: str, seconds: float, calls: int = 1):
+        if self.closed:
+            STAGE_SECONDS.observe(seconds, stage=stage)
+            return
+        with self._lock:
+            entry = self.stages.setdefault(stage, [0.0, 0])
+            entry[0] += seconds
+            entry[1] += calls
+
+    def merge(self, spans: dict):
+        for stage, (seconds, calls) in spans.items():
+            self.add(stage, seconds, calls)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {stage: tuple(v) for stage, v in self.stages.items()}
+
+    def flush(self):
+        """Observa o total de cada etapa no histograma; spans posteriores vão direto."""
+        with self._lock:
+            self.closed = True
+            stages = dict(self.stages)
+        for stage, (seconds, _) in stages.items():
+            STAGE_SECONDS.observe(seconds, stage=stage)
+
+    def server_timing(self) -> str:
+        return ", ".join(f"{stage};dur={seconds * 1000:.1f}" for stage, (seconds, _) in self.snapshot().items())
+
+
+_current = contextvars.ContextVar("labelconvert_metrics_collector", default=None)
+
+
+def record(stage: str, seconds: float):
+    collector = _current.get()
+    if collector is None:
+        STAGE_SECONDS.observe(seconds, stage=stage)
+    else:
+        collector.add(stage, seconds)
+
+
+@contextmanager
+def span(stage: str):
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(stage, time.perf_counter() - t0)
+
+
+@contextmanager
+def collect():
+    """Ativa um Collector no contexto atual (requisição, job ou tarefa de worker)."""
+    collector = Collector()
+    token = _current.set(collector)
+    try:
+        yield collector
+    finally:
+        _current.reset(token)
+
+
+def merge_spans(spans: dict):
+    """Soma spans vindos de outro processo no Collector atual (ou direto no histograma)."""
+    collector = _current.get()
+    if collector is not None:
+        collector.merge(spans)
+        return
+    for stage, (seconds, _) in spans.items():
+        STAGE_SECONDS.observe(seconds, stage=stage)
+
+
+def run_traced(fn, *args):
+    """Executado no worker: roda fn e devolve (resultado, spans) para o processo principal."""
+    with collect() as collector:
+        result = fn(*args)
+    return result, collector.snapshot()
+
+
+def exposition(extra_lines=()) -> str:
+    lines = STAGE_SECONDS.expose() + REQUEST_SECONDS.expose() + list(extra_lines)
+    return "\n".join(lines) + "\n"
@@ -1,5 +1,5 @@
 # backend/models.py
-from sqlalchemy import Column, Integer, String, Date, Float, Boolean, ForeignKey
+from sqlalchemy import Column, Integer, String, Date, DateTime, Float, Boolean, ForeignKey, Text
 from sqlalchemy.orm import relationship
 from datetime import date
 from .database import Base
@@ -13,7 +13,7 @@ class User(Base):
     senha = Column(String)
     plano = Column(String, default="free")
     data_inicio = Column(Date, nullable=True)
-    data_expira = Column(Date, nullable=True)
+    data_expira = Column(Date, nullable=True, index=True)  # varrido pelo cron_jobs
     ativo = Column(Boolean, default=True)
 
 
@@ -33,7 +33,29 @@ class Assinatura(Base):
     plano_id = Column(Integer, ForeignKey("planos.id"))
     data_inicio = Column(Date)
     data_expira = Column(Date)
-    status = Column(String, default="pendente")
+    status = Column(String, default="pendente", index=True)  # "pendente" não paga vira "expirada" (cron_jobs)
     txid = Column(String)
     user = relationship("User")
     plano = relationship("Plano")
+
+
+class Job(Base):
+    """Lote de etiquetas processado em segundo plano (POST /jobs)."""
+    __tablename__ = "jobs"
+    id = Column(String, primary_key=True)
+    status = Column(String, default="queued", index=True)  # queued | running | done | error
+    stage = Column(String, nullable=True)
+    pages_total = Column(Integer, default=0)
+    pages_cropped = Column(Integer, default=0)
+    labels_total = Column(Integer, default=0)
+    labels_matched = Column(Integer, default=0)
+    empty_slots = Column(Integer, default=0, server_default="0")  # adicionada depois: ensure_schema cria com 0
+    bytes_written = Column(Integer, default=0)
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    expires_at = Column(DateTime, nullable=True, index=True)
+    checkpoint = Column(String, nullable=True, index=True)  # chave em checkpoint.py (mesmas entradas = mesma chave)
+    worker = Column(String, nullable=True)                  # processo que pegou o job (jobs.WORKER_ID)
+    heartbeat_at = Column(DateTime, nullable=True)          # renovado enquanto o processo está vivo
@@ -0,0 +1,68 @@
+# backend/passwords.py
+"""
+Hash e verificação de senhas (bcrypt) fora do event loop.
+
+Cada hash/verify custa ~250 ms de CPU no custo 12; feito direto numa rota
+async, uma rajada de logins trava todas as outras requisições do worker.
+Aqui o trabalho roda num ThreadPoolExecutor limitado — a extensão C do bcrypt
+solta o GIL, então as threads rodam de fato em paralelo.
+
+O custo vem de LABEL_BCRYPT_ROUNDS; hashes com outro custo são refeitos no
+próximo login certo (verify_password devolve o hash novo para gravar).
+
+Variáveis de ambiente:
+- LABEL_BCRYPT_ROUNDS: custo do bcrypt (padrão 12, o mesmo do passlib)
+- LABEL_HASH_THREADS: threads de hash (0 = no próprio event loop; só para comparar)
+"""
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from passlib.context import CryptContext
+
+BCRYPT_ROUNDS = int(os.getenv("LABEL_BCRYPT_ROUNDS", "12"))
+HASH_THREADS = int(os.getenv("LABEL_HASH_THREADS", str(max(1, min(4, os.cpu_count() or 1)))))
+
+# min = max = padrão: hash com qualquer outro custo "precisa de atualização"
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    bcrypt__default_rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+    bcrypt__max_rounds=BCRYPT_ROUNDS,
+)
+
+_executor = ThreadPoolExecutor(max_workers=HASH_THREADS, thread_name_prefix="bcrypt") if HASH_THREADS > 0 else None
+
+
+def _secret(password: str) -> bytes:
+    # o bcrypt só usa os primeiros 72 bytes; cortando aqui hash e verify
+    # batem com os hashes antigos (password[:72]) e com bcrypt que recusa > 72
+    return password.encode("utf-8")[:72]
+
+
+def hash_password_sync(password: str) -> str:
+    return pwd_context.hash(_secret(password))
+
+
+def verify_password_sync(password: str, hashed: str):
+    """(senha confere, hash novo ou None) — hash novo quando o custo mudou."""
+    if not hashed:
+        return False, None
+    try:
+        return pwd_context.verify_and_update(_secret(password), hashed)
+    except ValueError:  # hash salvo inválido
+        return False, None
+
+
+async def _run(fn, *args):
+    if _executor is None:
+        return fn(*args)
+    return await asyncio.get_running_loop().run_in_executor(_executor, fn, *args)
+
+
+async def hash_password(password: str) -> str:
+    return await _run(hash_password_sync, password)
+
+
+async def verify_password(password: str, hashed: str):
+    return await _run(verify_password_sync, password, hashed)
@@ -1,17 +1,15 @@
 # backend/plans.py
-from fastapi import APIRouter, Request, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException
 from datetime import date
 from dateutil.relativedelta import relativedelta
-from .database import get_db
+from .database import get_async_db
 from . import models, deps
 
 router = APIRouter()
 
 
 @router.get("/me")
-async def me(request: Request, db: Session = Depends(get_db)):
-    user = deps.get_current_user(request, db)
+async def me(user=Depends(deps.current_user)):
     if not user:
         raise HTTPException(status_code=401, detail="Usuário não autenticado")
     return {
@@ -23,12 +21,11 @@ async def me(request: Request, db: Session = Depends(get_db)):
 
 
 @router.post("/assinatura/{plano_id}")
-async def criar_assinatura(plano_id: int, request: Request, db: Session = Depends(get_db)):
-    user = deps.get_current_user(request, db)
+async def criar_assinatura(plano_id: int, user=Depends(deps.current_user), db=Depends(get_async_db)):
     if not user:
         raise HTTPException(status_code=401, detail="Usuário não autenticado")
 
-    plano = db.query(models.Plano).filter(models.Plano.id == plano_id).first()
+    plano = await db.get(models.Plano, plano_id)
     if not plano:
         raise HTTPException(status_code=404, detail="Plano não encontrado")
 
@@ -37,9 +34,10 @@ async def criar_assinatura(plano_id: int, request: Request, db: Session = Depend
     assinatura = models.Assinatura(
         user_id=user.id,
         plano_id=plano.id,
+        data_inicio=date.today(),  # idade da pendência (cron_jobs encerra as antigas)
         status="pendente",
         txid=txid,
     )
     db.add(assinatura)
-    db.commit()
+    await db.commit()
     return {"txid": txid, "valor": plano.preco, "mensagem": "Assinatura criada (mock PIX)"}
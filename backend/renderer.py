@@ -0,0 +1,109 @@
+# backend/renderer.py
+"""
+Rasterização única do projeto (PyMuPDF, em processo).
+
+Renderiza direto em tons de cinza na resolução final e binariza a partir do
+buffer do pixmap — sem subprocesso do poppler, sem PPM em disco e sem passar
+por uma imagem RGB do PIL.
+"""
+import math
+from io import BytesIO
+
+import fitz
+import numpy as np
+from PIL import Image, features
+
+from .zpl_encoder import pack_array
+
+DPI_PRINTER = 203  # padrão Zebra
+THRESHOLD = 180    # limiar binarização
+
+PREVIEW_DPI = 100
+PREVIEW_MAX_SIZE = (600, 900)     # largura x altura máximas do preview (px)
+PREVIEW_SIZE_LIMIT = 2000         # teto absoluto pedido pelo cliente
+PREVIEW_FORMATS = ("png", "webp")
+
+
+def open_pdf(source):
+    """Abre o PDF a partir dos bytes do upload ou de um caminho em disco (ValueError se inválido)."""
+    try:
+        if isinstance(source, (bytes, bytearray)):
+            doc = fitz.open(stream=source, filetype="pdf")
+        else:
+            doc = fitz.open(source, filetype="pdf")
+    except (fitz.FileDataError, RuntimeError) as e:
+        # a mensagem do MuPDF para arquivo em disco traz o caminho da pasta temporária
+        detail = e if isinstance(source, (bytes, bytearray)) else "não foi possível abrir o arquivo"
+        raise ValueError(f"PDF inválido ou corrompido: {detail}") from e
+    if doc.page_count == 0:
+        doc.close()
+        raise ValueError("PDF sem páginas")
+    return doc
+
+
+def render_gray(page, dpi: int = DPI_PRINTER):
+    """Pixmap em cinza (1 byte por pixel, sem alpha) na resolução pedida."""
+    zoom = dpi / 72
+    return page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), colorspace=fitz.csGRAY, alpha=False)
+
+
+def gray_array(pix):
+    """Visão numpy (linhas x colunas) sobre as amostras do pixmap, sem cópia."""
+    rows = np.frombuffer(pix.samples_mv, dtype=np.uint8).reshape(pix.height, pix.stride)
+    return rows[:, :pix.width]
+
+
+def threshold_pixmap(pix, threshold: int = THRESHOLD):
+    """Binariza (preto = abaixo do limiar) e empacota: (data, bytes_per_row, rows)."""
+    return pack_array(gray_array(pix) < threshold)
+
+
+def pixmap_to_image(pix) -> Image.Image:
+    """Pixmap cinza -> imagem PIL modo "L" (para PNG/preview)."""
+    return Image.frombytes("L", (pix.width, pix.height), pix.samples)
+
+
+def iter_gray_pages(doc, dpi: int = DPI_PRINTER):
+    """Renderiza as páginas uma a uma; cada pixmap pode ser descartado após o uso."""
+    for page in doc:
+        yield render_gray(page, dpi)
+
+
+def render_fitted(page, max_width: int, max_height: int, dpi: int = PREVIEW_DPI):
+    """Renderiza em cinza no menor zoom entre o dpi pedido e o que cabe em max_width x max_height."""
+    zoom = min(dpi / 72, max_width / page.rect.width, max_height / page.rect.height)
+    pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), colorspace=fitz.csGRAY, alpha=False)
+    return pixmap_to_image(pix)
+
+
+def render_preview(doc, page_index: int, max_size=PREVIEW_MAX_SIZE, dpi: int = PREVIEW_DPI):
+    """Preview de uma única página (as demais não são renderizadas)."""
+    return render_fitted(doc[page_index], max_size[0], max_size[1], dpi)
+
+
+def render_thumbnail_grid(doc, first: int, count: int, max_size=PREVIEW_MAX_SIZE, dpi: int = PREVIEW_DPI):
+    """Grade com miniaturas de `count` páginas a partir de `first`, dentro de max_size."""
+    pages = list(range(first, min(first + count, doc.page_count)))
+    cols = math.ceil(math.sqrt(len(pages)))
+    rows = math.ceil(len(pages) / cols)
+    cell_w, cell_h = max_size[0] // cols, max_size[1] // rows
+
+    grid = Image.new("L", (cell_w * cols, cell_h * rows), 255)
+    for n, page_index in enumerate(pages):
+        thumb = render_fitted(doc[page_index], cell_w - 4, cell_h - 4, dpi)
+        x = (n % cols) * cell_w + (cell_w - thumb.width) // 2
+        y = (n // cols) * cell_h + (cell_h - thumb.height) // 2
+        grid.paste(thumb, (x, y))
+    return grid
+
+
+def encode_image(img: Image.Image, fmt: str) -> bytes:
+    """PNG/WebP com os ajustes mais rápidos do encoder."""
+    buf = BytesIO()
+    if fmt == "webp":
+        if not features.check("webp"):
+            raise ValueError("WebP não suportado neste servidor")
+        img.save(buf, format="WEBP", quality=80, method=0)
+    else:
+        img.save(buf, format="PNG", compress_level=1)
+    return buf.getvalue()
@@ -0,0 +1,33 @@
+# backend/scratch.py
+"""
+Arquivos temporários por requisição.
+
+Cada conversão ganha a própria pasta (tempfile.mkdtemp), com nomes fixos lá
+dentro — nada de caminho compartilhado nem do nome de arquivo enviado pelo
+cliente — e a pasta é apagada assim que a resposta fica pronta.
+"""
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+SCRATCH_ROOT = os.getenv("LABEL_SCRATCH_DIR") or None  # None = pasta temporária do sistema
+UPLOAD_CHUNK = 1024 * 1024
+
+
+def make_scratch_dir() -> Path:
+    if SCRATCH_ROOT:
+        Path(SCRATCH_ROOT).mkdir(parents=True, exist_ok=True)
+    return Path(tempfile.mkdtemp(prefix="labelconvert-", dir=SCRATCH_ROOT))
+
+
+def remove_scratch_dir(path: Path):
+    shutil.rmtree(path, ignore_errors=True)
+
+
+def save_upload(upload, path: Path) -> int:
+    """Copia o upload para o disco em blocos de UPLOAD_CHUNK; devolve o tamanho gravado."""
+    upload.file.seek(0)
+    with path.open("wb") as f:
+        shutil.copyfileobj(upload.file, f, UPLOAD_CHUNK)
+        return f.tell()
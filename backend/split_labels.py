@@ -1,50 +1,45 @@
-from PyPDF2 import PdfReader, PdfWriter
-from PyPDF2.generic import RectangleObject
+from pathlib import Path
 
-def split_pdf_labels(input_pdf, output_pdf, width_mm=100, height_mm=150):
-    """Divide páginas com várias etiquetas em 1 etiqueta por página (formato 100x150mm)"""
-    reader = PdfReader(input_pdf)
-    writer = PdfWriter()
+import fitz
 
-    # Conversão de mm para pontos (1 pt = 1/72 inch, 25.4 mm por inch)
-    width_pt = width_mm * 72 / 25.4
-    height_pt = height_mm * 72 / 25.4
+from .layouts import get_layout, detect_layout, page_rects, page_content_boxes, slot_is_empty
 
-    for page_number, page in enumerate(reader.pages):
-        # Pega as dimensões da página original
-        original_width = float(page.mediabox.width)
-        original_height = float(page.mediabox.height)
+MM = 72 / 25.4
 
-        # Assumindo 4 etiquetas (2 colunas x 2 linhas)
-        cols = 2
-        rows = 2
-        label_width = original_width / cols
-        label_height = original_height / rows
 
-        for row in range(rows):
-            for col in range(cols):
-                x0 = col * label_width
-                y0 = original_height - (row + 1) * label_height
-                x1 = x0 + label_width
-                y1 = y0 + label_height
+def split_pdf_labels(input_pdf, output_pdf, width_mm=100, height_mm=150, layout="auto"):
+    """
+    Divide páginas com várias etiquetas em 1 etiqueta por página (formato 100x150mm).
+    O layout vem de layouts.py ("auto" detecta por página); recortes vazios são pulados.
+    """
+    width_pt = width_mm * MM
+    height_pt = height_mm * MM
 
-                # Cria recorte
-                page.cropbox = RectangleObject((x0, y0, x1, y1))
+    src = fitz.open(input_pdf)
+    out = fitz.open()
+    for page in src:
+        chosen = detect_layout(page) if layout == "auto" else get_layout(layout)
+        boxes = page_content_boxes(page)
+        kept = 0
+        for rect in page_rects(page, chosen):
+            if slot_is_empty(rect, boxes, page):
+                continue
+            new_page = out.new_page(width=width_pt, height=height_pt)
+            new_page.show_pdf_page(new_page.rect, src, page.number, clip=rect)
+            kept += 1
 
-                # Adiciona nova página com tamanho 100x150 mm
-                new_page = page
-                new_page.mediabox = RectangleObject((0, 0, width_pt, height_pt))
-                writer.add_page(new_page)
+        print(f"Página {page.number + 1} processada com {kept} etiquetas ({chosen.name})")
 
-        print(f"Página {page_number+1} processada com {cols*rows} etiquetas")
-
-    with open(output_pdf, "wb") as f:
-        writer.write(f)
+    out.save(output_pdf, garbage=1, deflate=True)
+    out.close()
+    src.close()
 
     print(f"✅ Novo PDF salvo em: {output_pdf}")
 
+
 # --- Exemplo de uso:
-split_pdf_labels(
-    input_pdf=r"C:\Projetos\labelconvertv2\backend\exemplo.pdf",
-    output_pdf=r"C:\Projetos\labelconvertv2\backend\etiquetas_1porpagina.pdf"
-)
+if __name__ == "__main__":
+    split_pdf_labels(
+        input_pdf=Path(r"C:\Projetos\labelconvertv2\backend\exemplo.pdf"),
+        output_pdf=Path(r"C:\Projetos\labelconvertv2\backend\etiquetas_1porpagina.pdf"),
+    )
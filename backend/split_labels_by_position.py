@@ -1,51 +1,38 @@
-from PyPDF2 import PdfReader, PdfWriter
-from PyPDF2.generic import RectangleObject
 from pathlib import Path
 
-def split_pdf_by_position(input_pdf, output_pdf, cols=2, rows=2, width_mm=100, height_mm=150):
-    """Divide cada página em recortes fixos por posição (colunas × linhas)."""
-    reader = PdfReader(input_pdf)
-    writer = PdfWriter()
-
-    # Conversão mm → pontos
-    mm_to_pt = lambda mm: mm * 72 / 25.4
-    label_width_pt = mm_to_pt(width_mm)
-    label_height_pt = mm_to_pt(height_mm)
-
-    for page_num, page in enumerate(reader.pages, start=1):
-        page_width = float(page.mediabox.width)
-        page_height = float(page.mediabox.height)
-
-        # Divide por coordenadas fixas
-        cell_width = page_width / cols
-        cell_height = page_height / rows
+import fitz
 
-        print(f"📄 Página {page_num}: {page_width:.0f}x{page_height:.0f}pt "
-              f"({cols}x{rows} = {cell_width:.0f}x{cell_height:.0f}pt cada)")
+from .layouts import grid_layout, page_rects
 
-        for row in range(rows):
-            for col in range(cols):
-                x0 = col * cell_width
-                x1 = (col + 1) * cell_width
-                y1 = page_height - row * cell_height
-                y0 = y1 - cell_height
+MM = 72 / 25.4
 
-                crop_box = RectangleObject((x0, y0, x1, y1))
 
-                # Cria uma cópia da página e aplica o recorte
-                new_page = page
-                new_page.cropbox = crop_box
-                new_page.mediabox = crop_box
-
-                # Cria uma nova página com tamanho 100x150mm
-                writer.add_page(new_page)
-
-                print(f"  → Etiqueta {row*cols + col + 1}: "
-                      f"x={x0:.0f}-{x1:.0f}, y={y0:.0f}-{y1:.0f}")
+def split_pdf_by_position(input_pdf, output_pdf, cols=2, rows=2, width_mm=100, height_mm=150):
+    """Divide cada página em recortes fixos por posição (colunas × linhas, ordem de leitura)."""
+    layout = grid_layout(cols, rows)
+    label_width_pt = width_mm * MM
+    label_height_pt = height_mm * MM
+
+    src = fitz.open(input_pdf)
+    out = fitz.open()
+    for page in src:
+        page_width, page_height = page.rect.width, page.rect.height
+        print(f"📄 Página {page.number + 1}: {page_width:.0f}x{page_height:.0f}pt "
+              f"({cols}x{rows} = {page_width / cols:.0f}x{page_height / rows:.0f}pt cada)")
+
+        # retângulos calculados uma vez por tamanho de página (cache em layouts.py)
+        for n, rect in enumerate(page_rects(page, layout), start=1):
+            # nova página com tamanho 100x150mm
+            new_page = out.new_page(width=label_width_pt, height=label_height_pt)
+            new_page.show_pdf_page(new_page.rect, src, page.number, clip=rect)
+
+            print(f"  → Etiqueta {n}: "
+                  f"x={rect.x0:.0f}-{rect.x1:.0f}, y={rect.y0:.0f}-{rect.y1:.0f}")
 
     # Grava o PDF final
-    with open(output_pdf, "wb") as f:
-        writer.write(f)
+    out.save(output_pdf, garbage=1, deflate=True)
+    out.close()
+    src.close()
 
     print(f"\n✅ Novo PDF gerado: {output_pdf}")
 
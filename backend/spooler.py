@@ -0,0 +1,585 @@
+# backend/spooler.py
+"""
+Spooler de impressão: ZPL direto para as impressoras (TCP "raw", porta 9100),
+sem o navegador no meio.
+
+- cada impressora registrada tem uma fila de jobs e uma thread que a atende,
+  com uma conexão TCP persistente (reaberta sob demanda, fechada depois de
+  LABEL_SPOOL_IDLE_SECONDS ocioso: a impressora atende uma conexão por vez, e
+  a ociosa bloquearia os outros) — abrir uma conexão por etiqueta trava as
+  impressoras do depósito
+- as etiquetas de um job vão em lotes (até LABEL_SPOOL_BATCH_LABELS etiquetas
+  ou LABEL_SPOOL_BATCH_KB por sendall), uma atrás da outra na mesma conexão
+- confirmação e controle de fluxo: depois de cada lote o spooler pede o status
+  (~HS, Zebra) e espera a resposta — chegou resposta, o lote chegou. O status
+  diz quantos formatos estão na memória da impressora, buffer cheio, pausa e
+  falta de papel: com a impressora atrasada (LABEL_SPOOL_MAX_BUFFERED formatos
+  ou mais) ou parada, o próximo lote espera (até LABEL_SPOOL_PAUSE_TIMEOUT).
+  Sem confirmação (LABEL_SPOOL_CONFIRM=0, impressoras que não respondem ~HS) o
+  único freio é a janela TCP, e uma conexão derrubada pode engolir lotes inteiros
+- impressora que nunca respondeu ao ~HS (emulações de ZPL) tem a confirmação
+  desligada no primeiro silêncio, sem reenviar nada
+- falha no sendall: reconecta e reenvia o lote, até LABEL_SPOOL_RETRIES vezes
+  com espera crescente. A porta 9100 não diz até onde o lote chegou, então
+  parte dele pode sair repetida (no máximo um lote)
+- falha na confirmação (o sendall já foi): o lote nunca é reenviado — reconecta
+  só para consultar o status e segue; as etiquetas do lote ficam listadas em
+  "unconfirmed" no job (conferir/reimprimir). Se nem o status responder, o job
+  falha, com labels_sent contando o que já foi entregue
+- a fila de cada impressora é limitada (cheia = SpoolerBusy, HTTP 429)
+
+Registro em memória, por processo: impressoras de LABEL_PRINTERS
+("nome=host:porta,...") ao subir, compartilhadas por todos os usuários, e
+pelas rotas /printers — só administradores (LABEL_ADMIN_EMAILS, deps.py), só
+para endereços em LABEL_PRINTER_NETWORKS e portas em LABEL_PRINTER_PORTS
+(conferidos de novo a cada conexão, contra DNS que muda de endereço), com
+dono opcional. Sem isso, qualquer conta mandaria bytes arbitrários para
+qualquer host:porta da rede interna a partir do servidor.
+Cada usuário só vê as impressoras compartilhadas e as suas (sem host/porta,
+que ficam para os administradores) e só os próprios jobs.
+Com vários workers do uvicorn, cada um tem o seu spooler.
+
+Variáveis de ambiente:
+- LABEL_PRINTERS: impressoras registradas ao subir (porta padrão 9100)
+- LABEL_PRINTER_NETWORKS: redes (CIDR, separadas por vírgula) aceitas no
+  POST /printers; vazio (padrão) = só LABEL_PRINTERS
+- LABEL_PRINTER_PORTS: portas aceitas no POST /printers (padrão 9100)
+- LABEL_SPOOL_QUEUE: jobs na fila de cada impressora (padrão 100)
+- LABEL_SPOOL_BATCH_LABELS / LABEL_SPOOL_BATCH_KB: tamanho do lote (padrão 50 / 256)
+- LABEL_SPOOL_RETRIES: novas tentativas por lote (padrão 3)
+- LABEL_SPOOL_CONNECT_TIMEOUT / LABEL_SPOOL_SEND_TIMEOUT: segundos (padrão 5 / 60)
+- LABEL_SPOOL_IDLE_SECONDS: conexão ociosa fechada depois disso (padrão 15)
+- LABEL_SPOOL_CONFIRM: 0 desliga a confirmação por ~HS
+- LABEL_SPOOL_STATUS_TIMEOUT: segundos esperando a resposta do ~HS (padrão 5)
+- LABEL_SPOOL_MAX_BUFFERED: formatos na memória da impressora antes de esperar (padrão 20)
+- LABEL_SPOOL_PAUSE_TIMEOUT: segundos esperando impressora pausada/sem papel antes de falhar o job (padrão 300)
+"""
+import ipaddress
+import logging
+import os
+import queue
+import re
+import select
+import socket
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+
+from fastapi import APIRouter, Depends, Form, HTTPException
+from fastapi.concurrency import run_in_threadpool
+
+from .deps import is_admin, require_admin, require_user
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PORT = 9100
+SPOOL_QUEUE = int(os.getenv("LABEL_SPOOL_QUEUE", "100"))
+BATCH_LABELS = int(os.getenv("LABEL_SPOOL_BATCH_LABELS", "50"))
+BATCH_BYTES = int(os.getenv("LABEL_SPOOL_BATCH_KB", "256")) * 1024
+RETRIES = int(os.getenv("LABEL_SPOOL_RETRIES", "3"))
+RETRY_BACKOFF = 0.5
+CONNECT_TIMEOUT = float(os.getenv("LABEL_SPOOL_CONNECT_TIMEOUT", "5"))
+SEND_TIMEOUT = float(os.getenv("LABEL_SPOOL_SEND_TIMEOUT", "60"))
+IDLE_SECONDS = float(os.getenv("LABEL_SPOOL_IDLE_SECONDS", "15"))
+CONFIRM = os.getenv("LABEL_SPOOL_CONFIRM", "1") != "0"
+STATUS_TIMEOUT = float(os.getenv("LABEL_SPOOL_STATUS_TIMEOUT", "5"))
+MAX_BUFFERED = int(os.getenv("LABEL_SPOOL_MAX_BUFFERED", "20"))
+PAUSE_TIMEOUT = float(os.getenv("LABEL_SPOOL_PAUSE_TIMEOUT", "300"))
+STATUS_POLL = 0.5
+PRINTER_NETWORKS = [ipaddress.ip_network(net.strip(), strict=False)
+                    for net in os.getenv("LABEL_PRINTER_NETWORKS", "").split(",") if net.strip()]
+PRINTER_PORTS = {int(port) for port in os.getenv("LABEL_PRINTER_PORTS", str(DEFAULT_PORT)).split(",") if port.strip()}
+JOB_HISTORY = 1000
+
+HOST_STATUS_QUERY = b"~HS"
+STX, ETX = b"\x02", b"\x03"
+
+ZPL_LABEL_PATTERN = re.compile(r"\^XA.*?\^XZ", flags=re.DOTALL | re.IGNORECASE)
+PRINTER_NAME_PATTERN = re.compile(r"^[\w.-]{1,64}$")
+
+router = APIRouter()
+
+
+class SpoolerBusy(Exception):
+    """Fila da impressora cheia (HTTP 429)."""
+
+
+def split_labels(zpl: str):
+    """Etiquetas (^XA...^XZ) de um texto ZPL, na ordem; o que estiver fora dos blocos é ignorado."""
+    return ZPL_LABEL_PATTERN.findall(zpl)
+
+
+def iter_batches(labels, max_labels: int, max_bytes: int):
+    """(bytes, quantidade de etiquetas) em lotes de até max_labels etiquetas / max_bytes (ao menos uma)."""
+    batch, size = [], 0
+    for label in labels:
+        data = label.encode("utf-8")
+        if batch and (len(batch) >= max_labels or size + len(data) > max_bytes):
+            yield b"".join(batch), len(batch)
+            batch, size = [], 0
+        batch.append(data)
+        size += len(data)
+    if batch:
+        yield b"".join(batch), len(batch)
+
+
+def parse_host_status(raw: bytes) -> dict:
+    """
+    Resposta do ~HS (três linhas STX...ETX) -> campos usados no controle de fluxo.
+    Linha 1: aaa,b,c,dddd,eee,f,... (b sem papel, c pausada, eee formatos no buffer, f buffer cheio);
+    linha 2: mmm,n,o,... (o cabeça aberta).
+    """
+    lines = [chunk.split(ETX)[0].decode("ascii", "replace").split(",") for chunk in raw.split(STX)[1:]]
+    if len(lines) < 2 or len(lines[0]) < 6 or len(lines[1]) < 3:
+        raise ValueError(f"resposta ~HS inválida: {raw[:80]!r}")
+    first, second = lines[0], lines[1]
+    return {
+        "paper_out": first[1] == "1",
+        "paused": first[2] == "1",
+        "formats_buffered": int(first[4] or 0),
+        "buffer_full": first[5] == "1",
+        "head_open": second[2] == "1",
+    }
+
+
+def allowed_address(host: str, port: int):
+    """
+    (ip, porta) para conectar numa impressora registrada pela API: a porta tem de
+    estar em LABEL_PRINTER_PORTS e todos os endereços do host em LABEL_PRINTER_NETWORKS.
+    ValueError caso contrário.
+    """
+    if port not in PRINTER_PORTS:
+        raise ValueError(f"Porta {port} não permitida (LABEL_PRINTER_PORTS)")
+    if not PRINTER_NETWORKS:
+        raise ValueError("Cadastro de impressoras pela API desligado (LABEL_PRINTER_NETWORKS vazio)")
+    try:
+        infos = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+    except OSError as e:
+        raise ValueError(f"Host não encontrado: {host} ({e})")
+    addresses = {ipaddress.ip_address(info[4][0]) for info in infos}
+    if not addresses or any(not any(ip in net for net in PRINTER_NETWORKS) for ip in addresses):
+        raise ValueError(f"Endereço fora das redes permitidas (LABEL_PRINTER_NETWORKS): {host}")
+    return str(min(addresses, key=str)), port
+
+
+def printer_ready(status: dict) -> bool:
+    return not (status["paper_out"] or status["paused"] or status["head_open"] or status["buffer_full"]
+                or status["formats_buffered"] >= MAX_BUFFERED)
+
+
+class PrintJob:
+    def __init__(self, printer: str, labels, owner: str = None):
+        self.id = uuid.uuid4().hex
+        self.printer = printer
+        self.owner = owner  # e-mail de quem mandou (só ele e os administradores veem o job)
+        self.labels = labels
+        self.status = "queued"  # queued | printing | done | error
+        self.labels_sent = 0
+        self.bytes_sent = 0
+        self.unconfirmed = []  # [(primeira, última)] etiquetas (1..n) de lotes sem confirmação
+        self.error = None
+        self.created_at = datetime.utcnow()
+        self.started_at = None
+        self.finished_at = None
+
+    def to_dict(self) -> dict:
+        seconds = (self.finished_at - self.started_at).total_seconds() if self.started_at and self.finished_at else None
+        return {
+            "id": self.id,
+            "printer": self.printer,
+            "status": self.status,
+            "labels_total": len(self.labels),
+            "labels_sent": self.labels_sent,
+            "bytes_sent": self.bytes_sent,
+            "unconfirmed": [list(r) for r in self.unconfirmed],
+            "error": self.error,
+            "created_at": self.created_at.isoformat(),
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "labels_per_second": round(self.labels_sent / seconds, 1) if seconds else None,
+        }
+
+
+class Printer:
+    """
+    Uma impressora: fila de jobs + thread com a conexão persistente.
+    owner: e-mail do único usuário que pode usá-la (None = todos);
+    restricted: endereço conferido com allowed_address a cada conexão (cadastro pela API).
+    """
+
+    def __init__(self, name: str, host: str, port: int = DEFAULT_PORT, queue_size: int = SPOOL_QUEUE,
+                 owner: str = None, restricted: bool = False):
+        self.name = name
+        self.host = host
+        self.port = port
+        self.owner = owner
+        self.restricted = restricted
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._sock = None
+        self._lock = threading.Lock()
+        self._status = None  # último ~HS
+        self.confirm = CONFIRM
+        self._answered = False  # já respondeu algum ~HS (suporta confirmação)
+        self._stopping = threading.Event()
+        self._stats = {"jobs_done": 0, "jobs_failed": 0, "labels_sent": 0, "bytes_sent": 0,
+                       "connects": 0, "send_errors": 0, "confirm_errors": 0, "waits": 0, "busy_seconds": 0.0}
+        self._thread = threading.Thread(target=self._loop, name=f"spool-{name}", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        """
+        Pede para a thread parar sem bloquear (é chamada de rotas async): o job em
+        andamento para antes do próximo lote e os que estavam na fila falham.
+        """
+        self._stopping.set()
+        try:
+            self._queue.put_nowait(None)  # acorda a thread ociosa
+        except queue.Full:
+            pass  # ocupada: vê o evento no próximo lote
+
+    def _check_stopping(self):
+        if self._stopping.is_set():
+            raise ConnectionAbortedError("impressora removida")
+
+    def put(self, job: PrintJob):
+        try:
+            self._queue.put_nowait(job)
+        except queue.Full:
+            raise SpoolerBusy(f"Fila da impressora {self.name} cheia")
+
+    def visible_to(self, user) -> bool:
+        return is_admin(user) or self.owner is None or self.owner == (user.email or "").lower()
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+        busy = stats.pop("busy_seconds")
+        return {
+            "name": self.name,
+            "host": self.host,
+            "port": self.port,
+            "owner": self.owner,
+            "connected": self._sock is not None,
+            "queued": self._queue.qsize(),
+            "status": self._status,
+            "confirm": self.confirm,
+            **stats,
+            "labels_per_second": round(stats["labels_sent"] / busy, 1) if busy else None,
+        }
+
+    def _count(self, **deltas):
+        with self._lock:
+            for key, delta in deltas.items():
+                self._stats[key] += delta
+
+    # ------------------------------
+    # CONEXÃO
+    # ------------------------------
+
+    def _connect(self):
+        address = allowed_address(self.host, self.port) if self.restricted else (self.host, self.port)
+        sock = socket.create_connection(address, timeout=CONNECT_TIMEOUT)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+        # o ~HS é pequeno e vem logo depois do lote: sem Nagle ele não espera o ACK
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        sock.settimeout(SEND_TIMEOUT)
+        self._sock = sock
+        self._count(connects=1)
+
+    def _close(self):
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            finally:
+                self._sock = None
+
+    def _peer_closed(self) -> bool:
+        """A impressora fechou a conexão ociosa? (sem isso o primeiro sendall "funciona" e o lote se perde)"""
+        readable, _, _ = select.select([self._sock], [], [], 0)
+        if not readable:
+            return False
+        try:
+            # legível: recv não bloqueia. Impressoras só mandam algo se perguntadas (~HS); aqui é descartado
+            return self._sock.recv(4096) == b""
+        except OSError:
+            return True
+
+    def _query_status(self) -> dict:
+        """Manda ~HS e lê as três linhas da resposta (timeout = LABEL_SPOOL_STATUS_TIMEOUT)."""
+        self._sock.sendall(HOST_STATUS_QUERY)
+        self._sock.settimeout(STATUS_TIMEOUT)
+        try:
+            raw = b""
+            while raw.count(ETX) < 3:
+                chunk = self._sock.recv(1024)
+                if not chunk:
+                    raise ConnectionError("conexão fechada pela impressora")
+                raw += chunk
+        finally:
+            self._sock.settimeout(SEND_TIMEOUT)
+        self._status = parse_host_status(raw)
+        self._answered = True
+        return self._status
+
+    def _retry(self, action):
+        """Executa action() numa conexão aberta, reconectando e repetindo em caso de erro."""
+        for attempt in range(RETRIES + 1):
+            try:
+                if self._sock is not None and self._peer_closed():
+                    self._close()
+                if self._sock is None:
+                    self._connect()
+                return action()
+            except (OSError, ValueError) as e:
+                self._close()
+                self._count(send_errors=1)
+                if attempt == RETRIES:
+                    raise ConnectionError(f"{e.__class__.__name__}: {e}") from e
+                logger.warning("⚠️  Impressora %s: %s — nova tentativa (%d/%d)", self.name, e, attempt + 1, RETRIES)
+                time.sleep(RETRY_BACKOFF * 2 ** attempt)
+
+    def _send(self, data: bytes):
+        """Entrega um lote ao TCP; só um sendall que falhou é reenviado (reconectando)."""
+        self._retry(lambda: self._sock.sendall(data))
+
+    def _poll_status(self) -> dict:
+        """Só consulta o status (~HS), reconectando se preciso; nunca manda etiquetas."""
+        return self._retry(self._query_status)
+
+    def _confirm(self, job: PrintJob, first: int, last: int):
+        """
+        ~HS depois de um lote (etiquetas first..last) já entregue ao TCP; devolve o
+        status ou None (sem confirmação). O lote não é reenviado aqui em nenhum caso.
+        """
+        try:
+            return self._query_status()
+        except (OSError, ValueError) as e:
+            self._count(confirm_errors=1)
+            if not self._answered:
+                self.confirm = False
+                logger.warning("⚠️  Impressora %s não respondeu ao ~HS (%s): confirmação desligada", self.name, e)
+                return None
+            job.unconfirmed.append((first, last))
+            logger.warning("⚠️  Impressora %s sem resposta ao ~HS (%s): etiquetas %d-%d sem confirmação, "
+                           "reconectando só para o status", self.name, e, first, last)
+            self._close()
+            return self._poll_status()
+
+    def _wait_ready(self, status: dict):
+        """Segura o próximo lote enquanto a impressora está atrasada, pausada ou sem papel."""
+        deadline = time.monotonic() + PAUSE_TIMEOUT
+        while not printer_ready(status):
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"impressora não ficou pronta em {PAUSE_TIMEOUT:.0f}s: {status}")
+            self._count(waits=1)
+            self._stopping.wait(STATUS_POLL)
+            self._check_stopping()
+            status = self._poll_status()
+
+    # ------------------------------
+    # FILA
+    # ------------------------------
+
+    def _loop(self):
+        while not self._stopping.is_set():
+            try:
+                job = self._queue.get(timeout=IDLE_SECONDS)
+            except queue.Empty:
+                self._close()
+                continue
+            if job is None:
+                break
+            self._print(job)
+        self._close()
+        self._drain()
+
+    def _drain(self):
+        """Falha os jobs que ficaram na fila de uma impressora removida."""
+        while True:
+            try:
+                job = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            if job is not None:
+                job.status = "error"
+                job.error = "impressora removida"
+                job.finished_at = datetime.utcnow()
+                self._count(jobs_failed=1)
+
+    def _print(self, job: PrintJob):
+        job.status = "printing"
+        job.started_at = datetime.utcnow()
+        t0 = time.perf_counter()
+        try:
+            for data, count in iter_batches(job.labels, BATCH_LABELS, BATCH_BYTES):
+                self._check_stopping()
+                self._send(data)
+                job.labels_sent += count
+                job.bytes_sent += len(data)
+                self._count(labels_sent=count, bytes_sent=len(data))
+                status = self._confirm(job, job.labels_sent - count + 1, job.labels_sent) if self.confirm else None
+                if status is not None:
+                    self._wait_ready(status)
+            job.status = "done"
+            self._count(jobs_done=1)
+        except OSError as e:
+            job.status = "error"
+            job.error = f"{e.__class__.__name__}: {e}"
+            self._count(jobs_failed=1)
+            logger.error("❌ Impressão %s em %s falhou: %s", job.id, self.name, e)
+        finally:
+            job.finished_at = datetime.utcnow()
+            self._count(busy_seconds=time.perf_counter() - t0)
+        logger.info("🖨️  %s: %d/%d etiquetas (%s)", self.name, job.labels_sent, len(job.labels), job.status)
+
+
+class Spooler:
+    """Impressoras registradas e histórico dos últimos JOB_HISTORY jobs."""
+
+    def __init__(self):
+        self._printers = {}
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def register(self, name: str, host: str, port: int = DEFAULT_PORT, owner: str = None,
+                 restricted: bool = False) -> Printer:
+        """Registra (ou substitui) uma impressora; restricted = cadastro pela API (ver allowed_address)."""
+        if not PRINTER_NAME_PATTERN.match(name):
+            raise ValueError("Nome de impressora inválido (letras, números, . _ -)")
+        if not 0 < port < 65536:
+            raise ValueError("Porta inválida")
+        if restricted:
+            allowed_address(host, port)
+        printer = Printer(name, host, port, owner=owner, restricted=restricted)
+        with self._lock:
+            old = self._printers.pop(name, None)
+            self._printers[name] = printer
+        if old:
+            old.stop()
+        printer.start()
+        logger.info("🖨️  Impressora registrada: %s (%s:%d)", name, host, port)
+        return printer
+
+    def remove(self, name: str) -> bool:
+        with self._lock:
+            printer = self._printers.pop(name, None)
+        if printer:
+            printer.stop()
+        return printer is not None
+
+    def get(self, name: str):
+        with self._lock:
+            return self._printers.get(name)
+
+    def printers(self):
+        with self._lock:
+            return list(self._printers.values())
+
+    def submit(self, name: str, labels, owner: str = None) -> PrintJob:
+        """Enfileira as etiquetas (lista de ZPL ^XA...^XZ); KeyError sem a impressora, SpoolerBusy com a fila cheia."""
+        printer = self.get(name)
+        if printer is None:
+            raise KeyError(name)
+        job = PrintJob(name, list(labels), owner)
+        printer.put(job)
+        with self._lock:
+            self._jobs[job.id] = job
+            while len(self._jobs) > JOB_HISTORY:
+                self._jobs.popitem(last=False)
+        return job
+
+    def job(self, job_id: str):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def start(self, config: str = None):
+        """Registra as impressoras de LABEL_PRINTERS ("nome=host[:porta],...")."""
+        for entry in filter(None, (config if config is not None else os.getenv("LABEL_PRINTERS", "")).split(",")):
+            name, _, address = entry.strip().partition("=")
+            host, _, port = address.partition(":")
+            try:
+                self.register(name, host, int(port or DEFAULT_PORT))
+            except ValueError as e:
+                logger.warning("⚠️  LABEL_PRINTERS: %s ignorada (%s)", entry, e)
+
+    def stop(self):
+        with self._lock:
+            printers, self._printers = list(self._printers.values()), {}
+        for printer in printers:
+            printer.stop()
+
+
+spooler = Spooler()
+
+
+def printer_for(name: str, user) -> Printer:
+    """Impressora que o usuário pode usar; 404 se não existe ou é de outro dono."""
+    printer = spooler.get(name)
+    if printer is None or not printer.visible_to(user):
+        raise HTTPException(status_code=404, detail=f"Impressora não registrada: {name}")
+    return printer
+
+
+def submit_or_error(name: str, labels, user) -> PrintJob:
+    """spooler.submit em nome do usuário, com os erros já como HTTPException (404 / 400 / 429)."""
+    printer_for(name, user)
+    if not labels:
+        raise HTTPException(status_code=400, detail="Nenhuma etiqueta ZPL (^XA...^XZ) para imprimir")
+    try:
+        return spooler.submit(name, labels, owner=user.email)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Impressora não registrada: {name}")
+    except SpoolerBusy as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "30"})
+
+
+# ------------------------------
+# ROTAS
+# ------------------------------
+
+@router.get("/printers")
+async def list_printers(user=Depends(require_user)):
+    """
+    Impressoras que o usuário pode usar, com fila, conexão e vazão (etiquetas/s
+    enquanto imprimindo); host, porta e dono só para administradores.
+    """
+    admin = is_admin(user)
+    printers = []
+    for printer in spooler.printers():
+        if not printer.visible_to(user):
+            continue
+        stats = printer.stats()
+        if not admin:
+            for key in ("host", "port", "owner"):
+                stats.pop(key)
+        printers.append(stats)
+    return {"printers": printers}
+
+
+@router.post("/printers", status_code=201)
+async def register_printer(name: str = Form(...), host: str = Form(...), port: int = Form(DEFAULT_PORT),
+                           owner: str = Form(""), user=Depends(require_admin)):
+    """Cadastra uma impressora (administradores); owner vazio = todos os usuários podem usar."""
+    try:
+        printer = await run_in_threadpool(spooler.register, name, host, port, owner.strip().lower() or None, True)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return printer.stats()
+
+
+@router.delete("/printers/{name}")
+async def remove_printer(name: str, user=Depends(require_admin)):
+    if not spooler.remove(name):
+        raise HTTPException(status_code=404, detail=f"Impressora não registrada: {name}")
+    return {"removed": name}
+
+
+@router.get("/print_jobs/{job_id}")
+async def print_job_status(job_id: str, user=Depends(require_user)):
+    job = spooler.job(job_id)
+    if job is None or not (job.owner == user.email or is_admin(user)):
+        raise HTTPException(status_code=404, detail="Impressão não encontrada (ou fora do histórico)")
+    return job.to_dict()
@@ -0,0 +1,133 @@
+# backend/tasks.py
+"""
+Funções executadas nos processos do pool (workers.py).
+
+Ficam num módulo próprio, importável sem subir o app: com o start method "spawn"
+cada processo importa só este módulo (e o que ele usa), nunca o main.py.
+Argumentos e retornos atravessam processos via pickle — só bytes, str e listas/dicts.
+"""
+import time
+from io import BytesIO
+from pathlib import Path
+
+from .database import SessionLocal
+from . import models
+from .checkpoint import Checkpoint, checkpoint_lock
+from .label_generator import generate_batch_pdf, generate_checkpointed_pdf, generate_combined_pdf
+from .metrics import span
+from .renderer import DPI_PRINTER, open_pdf, render_gray, threshold_pixmap, render_preview, render_thumbnail_grid, encode_image
+from .zpl_encoder import zpl_label, zpl_size_stats
+
+
+def pixmap_to_zpl(pix, compression: str = "none"):
+    """Pixmap cinza (renderer) -> (zpl, bytes_per_row, rows), binarizado direto do buffer."""
+    data, bytes_per_row, height = threshold_pixmap(pix)
+    return zpl_label(data, bytes_per_row, height, compression), bytes_per_row, height
+
+
+def zpl_page_range(pdf_path: str, start: int, stop: int, compression: str = "none"):
+    """
+    Converte as páginas [start, stop) do PDF em ZPL. Recebe o caminho do upload
+    (pasta temporária), não os bytes: cada faixa abre o arquivo sem copiar o PDF
+    inteiro pelo pickle.
+    Devolve [(zpl, stats)] na ordem das páginas; stats numerado pela página (1-based).
+    """
+    with span("pdf_open"):
+        doc = open_pdf(pdf_path)
+    out = []
+    try:
+        for index in range(start, min(stop, doc.page_count)):
+            with span("rasterise"):
+                pix = render_gray(doc[index], DPI_PRINTER)
+            with span("zpl_encode"):
+                zpl, bytes_per_row, height = pixmap_to_zpl(pix, compression)
+            del pix
+            out.append((zpl, zpl_size_stats(index + 1, zpl, bytes_per_row, height)))
+    finally:
+        doc.close()
+    return out
+
+
+def preview_image(content: bytes, page: int, grid: int, max_size, fmt: str) -> bytes:
+    """Preview (página 1-based ou grade de miniaturas) já codificado em PNG/WebP."""
+    with span("pdf_open"):
+        doc = open_pdf(content)
+    try:
+        if page > doc.page_count:
+            raise ValueError(f"PDF tem só {doc.page_count} página(s)")
+        with span("rasterise"):
+            if grid:
+                img = render_thumbnail_grid(doc, page - 1, grid, max_size)
+            else:
+                img = render_preview(doc, page - 1, max_size)
+    finally:
+        doc.close()
+    with span("image_encode"):
+        return encode_image(img, fmt)
+
+
+def generate_labels(pdf_path: str, xlsx_path: str):
+    """
+    Gera o PDF final em memória (sem gravar a saída em disco).
+    Devolve (bytes do PDF, resumo com labels_total, labels_matched e empty_slots).
+    """
+    buf = BytesIO()
+    summary = {}
+    generate_combined_pdf(Path(pdf_path), Path(xlsx_path), buf, progress=lambda **fields: summary.update(fields))
+    return buf.getvalue(), summary
+
+
+def generate_batch_labels(pdf_paths, xlsx_paths, sort_by: str = "none"):
+    """Lote de vários PDFs/Excel numa única saída em memória; mesmo retorno do generate_labels."""
+    buf = BytesIO()
+    summary = {}
+    generate_batch_pdf([Path(p) for p in pdf_paths], [Path(p) for p in xlsx_paths], buf, sort_by=sort_by,
+                       progress=lambda **fields: summary.update(fields))
+    return buf.getvalue(), summary
+
+
+class JobProgress:
+    """
+    Callback de progresso do generate_combined_pdf que grava no registro do job.
+    Grava no máximo a cada `interval` segundos, e sempre que a etapa muda.
+    """
+
+    def __init__(self, job_id: str, interval: float = 0.5):
+        self.job_id = job_id
+        self.interval = interval
+        self.fields = {}
+        self._last = 0.0
+
+    def __call__(self, **fields):
+        stage_changed = "stage" in fields and fields["stage"] != self.fields.get("stage")
+        self.fields.update(fields)
+        if stage_changed or time.monotonic() - self._last >= self.interval:
+            self.flush()
+
+    def flush(self):
+        if not self.fields:
+            return
+        db = SessionLocal()
+        try:
+            db.query(models.Job).filter(models.Job.id == self.job_id).update(dict(self.fields))
+            db.commit()
+        finally:
+            db.close()
+        self._last = time.monotonic()
+
+
+def run_label_job(job_id: str, pdf_path: str, xlsx_path: str, output_path: str, checkpoint_key: str = None) -> int:
+    """
+    Gera o PDF de um job (POST /jobs), registrando o progresso no banco.
+    Com checkpoint_key, grava/retoma o checkpoint dessas entradas (checkpoint.py).
+    """
+    progress = JobProgress(job_id)
+    if checkpoint_key:
+        # a trava vem antes de ler o manifesto: outro processo pode estar no meio da mesma pasta
+        with checkpoint_lock(checkpoint_key):
+            labels = generate_checkpointed_pdf(Path(pdf_path), Path(xlsx_path), Path(output_path),
+                                               Checkpoint(checkpoint_key), progress=progress)
+    else:
+        labels = len(generate_combined_pdf(Path(pdf_path), Path(xlsx_path), Path(output_path), progress=progress))
+    progress.flush()
+    return labels
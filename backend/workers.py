@@ -0,0 +1,187 @@
+# backend/workers.py
+"""
+Camada de execução para o trabalho pesado de CPU (geração de etiquetas, ZPL, preview).
+
+As rotas continuam async, mas o processamento roda num ProcessPoolExecutor
+(start method "spawn"), então um PDF grande não trava o event loop — /login e
+/dashboard seguem respondendo. Concorrência limitada: no máximo
+LABEL_MAX_PENDING requisições pesadas ao mesmo tempo (rodando + na fila);
+acima disso o pool recusa com PoolBusy (a rota responde 429 + Retry-After).
+Os jobs em segundo plano (jobs.py) ocupam as mesmas vagas, mas esperam uma
+vaga livre em vez de serem recusados.
+
+Variáveis de ambiente:
+- LABEL_WORKERS: processos do pool (0 = uma thread só, sem processos; útil em dev)
+- LABEL_MAX_PENDING: requisições pesadas aceitas ao mesmo tempo
+- LABEL_ZPL_CHUNK_PAGES: páginas por tarefa ao dividir um PDF entre os workers
+- LABEL_RETRY_AFTER: segundos sugeridos no Retry-After do 429
+"""
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+
+from .metrics import merge_spans, run_traced, setup_logging
+
+LABEL_WORKERS = int(os.getenv("LABEL_WORKERS", str(max(1, min(4, (os.cpu_count() or 2) - 1)))))
+LABEL_MAX_PENDING = int(os.getenv("LABEL_MAX_PENDING", str(max(LABEL_WORKERS, 1) * 4)))
+ZPL_CHUNK_PAGES = int(os.getenv("LABEL_ZPL_CHUNK_PAGES", "8"))
+RETRY_AFTER = int(os.getenv("LABEL_RETRY_AFTER", "5"))
+
+# True dentro de um processo do pool (ver _init_worker): quem roda aqui não sobe processos próprios
+IN_POOL_WORKER = False
+
+
+def _init_worker():
+    global IN_POOL_WORKER
+    IN_POOL_WORKER = True
+    setup_logging()
+
+
+class PoolBusy(Exception):
+    """Fila cheia: a requisição deve ser recusada (HTTP 429)."""
+
+    def __init__(self, pending: int, retry_after: int):
+        super().__init__(f"Servidor ocupado: {pending} conversões em andamento")
+        self.pending = pending
+        self.retry_after = retry_after
+
+
+class Lease:
+    """Vaga reservada no pool; release() é idempotente."""
+
+    def __init__(self, pool, position: int):
+        self.pool = pool
+        self.position = position
+        self._released = False
+
+    def release(self):
+        if not self._released:
+            self._released = True
+            self.pool._release()
+
+
+class WorkerPool:
+    def __init__(self, workers: int, max_pending: int):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor = None
+        self._lock = threading.Lock()
+        self._freed = threading.Condition(self._lock)  # avisa quem espera vaga (acquire com timeout)
+        self._pending = 0
+        self._stats = {"accepted": 0, "rejected": 0, "tasks": 0}
+
+    @property
+    def executor(self):
+        # criado na primeira tarefa: importar o módulo não sobe processos
+        with self._lock:
+            if self._executor is None:
+                if self.workers > 0:
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.workers,
+                        mp_context=multiprocessing.get_context("spawn"),
+                        initializer=_init_worker,
+                    )
+                else:
+                    # PyMuPDF não é thread-safe: no modo sem processos, uma thread só
+                    self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="label-worker")
+            return self._executor
+
+    # ---------- backpressure ----------
+
+    def acquire(self, timeout: float = 0) -> Lease:
+        """
+        Reserva uma vaga; PoolBusy se a fila estiver cheia. position = requisições à frente.
+        Com timeout (threads fora do event loop, ex.: jobs), espera até timeout segundos
+        por uma vaga antes do PoolBusy — que aí não conta como recusa.
+        """
+        with self._lock:
+            if timeout:
+                if not self._freed.wait_for(lambda: self._pending < self.max_pending, timeout):
+                    raise PoolBusy(self._pending, RETRY_AFTER)
+            elif self._pending >= self.max_pending:
+                self._stats["rejected"] += 1
+                raise PoolBusy(self._pending, RETRY_AFTER)
+            position = max(0, self._pending - max(self.workers, 1) + 1)
+            self._pending += 1
+            self._stats["accepted"] += 1
+        return Lease(self, position)
+
+    def _release(self):
+        with self._lock:
+            self._pending -= 1
+            self._freed.notify()
+
+    # ---------- execução ----------
+
+    async def submit(self, fn, *args):
+        """
+        Roda fn(*args) no pool sem reservar vaga (use dentro de um Lease).
+        Os spans medidos no worker entram nas métricas da requisição atual.
+        """
+        with self._lock:
+            self._stats["tasks"] += 1
+        loop = asyncio.get_running_loop()
+        result, spans = await loop.run_in_executor(self.executor, partial(run_traced, fn, *args))
+        merge_spans(spans)
+        return result
+
+    def call(self, fn, *args):
+        """Versão bloqueante de submit (threads fora do event loop): devolve (resultado, spans)."""
+        with self._lock:
+            self._stats["tasks"] += 1
+        return self.executor.submit(run_traced, fn, *args).result()
+
+    async def run(self, fn, *args):
+        """Reserva vaga, roda fn(*args) no pool e libera a vaga."""
+        lease = self.acquire()
+        try:
+            return await self.submit(fn, *args)
+        finally:
+            lease.release()
+
+    async def map_ordered(self, fn, arg_list, window: int = None):
+        """
+        Gera fn(*args) para cada args de arg_list, na ordem, mantendo no máximo
+        `window` tarefas em voo (padrão: nº de workers) — memória limitada no stream.
+        """
+        window = window or max(self.workers, 1)
+        arg_list = list(arg_list)
+        in_flight = []
+        next_index = 0
+        try:
+            while next_index < len(arg_list) or in_flight:
+                while next_index < len(arg_list) and len(in_flight) < window:
+                    in_flight.append(asyncio.ensure_future(self.submit(fn, *arg_list[next_index])))
+                    next_index += 1
+                yield await in_flight.pop(0)
+        finally:
+            for fut in in_flight:
+                fut.cancel()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "mode": "process" if self.workers > 0 else "thread",
+                "max_pending": self.max_pending,
+                "pending": self._pending,
+                **self._stats,
+            }
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+
+def page_ranges(page_count: int, chunk_pages: int = ZPL_CHUNK_PAGES):
+    """Divide [0, page_count) em faixas de chunk_pages páginas: [(start, stop)]."""
+    chunk_pages = max(1, chunk_pages)
+    return [(start, min(start + chunk_pages, page_count)) for start in range(0, page_count, chunk_pages)]
+
+
+pool = WorkerPool(LABEL_WORKERS, LABEL_MAX_PENDING)
@@ -0,0 +1,139 @@
+# backend/zpl_encoder.py
+"""
+Codificador ^GFA compartilhado (main.py e pdf_to_zpl.py).
+
+Trabalha sobre o buffer de 1 bit já empacotado (Image.tobytes() de uma imagem
+modo "1" ou np.packbits) e gera o hex com bytes.hex() — nada de laço por pixel.
+Convenção ZPL: bit 1 = ponto preto, bits de preenchimento no fim da linha = 0.
+Também gera as formas comprimidas do campo (ASCII da Zebra e :Z64:).
+"""
+import base64
+import binascii
+import re
+import zlib
+
+import numpy as np
+from PIL import Image, ImageChops
+
+# "none" = hex puro; "ascii" = compressão ASCII da Zebra (contagens G–Y/g–z, "," "!" ":");
+# "z64" = zlib + base64 com CRC (:Z64:...:crc)
+COMPRESSION_MODES = ("none", "ascii", "z64")
+
+# contagens de repetição da compressão ASCII: G..Y = 1..19, g..z = 20..400 (de 20 em 20)
+_LOW_COUNTS = "GHIJKLMNOPQRSTUVWXY"
+_HIGH_COUNTS = "ghijklmnopqrstuvwxyz"
+_RUN_PATTERN = re.compile(r"(.)\1+")
+
+
+def pack_image(img: Image.Image):
+    """
+    Empacota uma imagem modo "1" com 1 = preto.
+    Devolve (data, bytes_per_row, rows).
+    """
+    if img.mode != "1":
+        raise ValueError("A imagem deve estar em modo 1-bit ('1')")
+    # no modo "1" do PIL o bit 1 é branco; invertido, vira a convenção da Zebra
+    data = ImageChops.invert(img).tobytes()
+    width, height = img.size
+    return data, (width + 7) // 8, height
+
+
+def pack_array(black) -> tuple:
+    """
+    Empacota uma matriz booleana (linhas x colunas, True = preto).
+    Devolve (data, bytes_per_row, rows).
+    """
+    black = np.asarray(black, dtype=bool)
+    packed = np.packbits(black, axis=1)
+    return packed.tobytes(), packed.shape[1], packed.shape[0]
+
+
+def hex_payload(data: bytes) -> str:
+    """Bytes empacotados -> hex ASCII maiúsculo do ^GFA."""
+    return data.hex().upper()
+
+
+def _repeat_count(n: int) -> str:
+    out = []
+    while n >= 400:
+        out.append("z")
+        n -= 400
+    if n >= 20:
+        out.append(_HIGH_COUNTS[n // 20 - 1])
+        n %= 20
+    if n:
+        out.append(_LOW_COUNTS[n - 1])
+    return "".join(out)
+
+
+def _encode_run(match) -> str:
+    run = match.group(0)
+    return _repeat_count(len(run)) + run[0]
+
+
+def ascii_compress(data: bytes, bytes_per_row: int) -> str:
+    """
+    Compressão ASCII da Zebra sobre o hex de cada linha:
+    ":" repete a linha anterior, "," completa a linha com 0 e "!" com F,
+    e sequências do mesmo caractere viram contagem + caractere.
+    """
+    hex_data = hex_payload(data)
+    row_chars = bytes_per_row * 2
+    out = []
+    previous = None
+    for start in range(0, len(hex_data), row_chars):
+        row = hex_data[start:start + row_chars]
+        if row == previous:
+            out.append(":")
+            continue
+        previous = row
+
+        body = row.rstrip("0")
+        if len(body) < len(row):
+            out.append(_RUN_PATTERN.sub(_encode_run, body) + ",")
+            continue
+        body = row.rstrip("F")
+        if len(body) < len(row):
+            out.append(_RUN_PATTERN.sub(_encode_run, body) + "!")
+            continue
+        out.append(_RUN_PATTERN.sub(_encode_run, row))
+    return "".join(out)
+
+
+def z64_encode(data: bytes) -> str:
+    """:Z64: = zlib + base64, seguido do CRC-16 (CCITT) do texto base64."""
+    b64 = base64.b64encode(zlib.compress(data)).decode("ascii")
+    crc = binascii.crc_hqx(b64.encode("ascii"), 0)
+    return f":Z64:{b64}:{crc:04x}"
+
+
+def gfa_payload(data: bytes, bytes_per_row: int, compression: str = "none") -> str:
+    """Dados do campo ^GFA no modo de compressão pedido."""
+    if compression == "none":
+        return hex_payload(data)
+    if compression == "ascii":
+        return ascii_compress(data, bytes_per_row)
+    if compression == "z64":
+        return z64_encode(data)
+    raise ValueError(f"Compressão inválida: {compression} (use {', '.join(COMPRESSION_MODES)})")
+
+
+def zpl_label(data: bytes, bytes_per_row: int, rows: int, compression: str = "none") -> str:
+    """Etiqueta ZPL completa (^XA ... ^XZ) com a imagem inteira num ^GFA."""
+    total_bytes = bytes_per_row * rows
+    payload = gfa_payload(data, bytes_per_row, compression)
+    return f"^XA\n^FO0,0^GFA,{total_bytes},{total_bytes},{bytes_per_row},{payload}^XZ"
+
+
+def zpl_size_stats(index: int, zpl: str, bytes_per_row: int, rows: int) -> dict:
+    """Tamanho da etiqueta comparado à mesma etiqueta em hex puro."""
+    total_bytes = bytes_per_row * rows
+    header = f"^XA\n^FO0,0^GFA,{total_bytes},{total_bytes},{bytes_per_row},^XZ"
+    raw_size = len(header) + 2 * total_bytes
+    size = len(zpl)
+    return {
+        "label": index,
+        "raw_bytes": raw_size,
+        "bytes": size,
+        "ratio": round(raw_size / size, 1) if size else 0.0,
+    }